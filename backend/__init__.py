@@ -32,9 +32,9 @@ def create_app(config=None):
         r"/*": {
             "origins": ["http://localhost:3001"],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept"],
+            "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "If-None-Match", "If-Match", "Idempotency-Key"],
             "supports_credentials": True,
-            "expose_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Content-Type", "Authorization", "Retry-After", "ETag", "Last-Modified", "Idempotent-Replayed"],
             "max_age": 600,  # Cache preflight requests for 10 minutes
             "send_wildcard": False,
             "automatic_options": True
@@ -44,18 +44,28 @@ def create_app(config=None):
     with app.app_context():
         # Import models to ensure they are registered with SQLAlchemy
         from backend.models import User, Donation, Testimonial, SuccessStory, Appointment
+        from backend.utils.auth import register_jwt_callbacks
+        
+        # Resolve JWT identities through the cached user loader
+        register_jwt_callbacks(jwt)
         
         # Import blueprints
         from backend.api.v1.auth import auth_bp
         from backend.api.v1.therapist import therapist_bp
         from backend.api.v1.appointment import appointment_bp
         from backend.api.v1.donation import donation_bp
+        from backend.api.v1.metrics import metrics_bp
         
         # Register blueprints
         app.register_blueprint(auth_bp, url_prefix='/api/v1/auth')
         app.register_blueprint(therapist_bp, url_prefix='/api/v1/therapist')
         app.register_blueprint(appointment_bp, url_prefix='/api/v1')
         app.register_blueprint(donation_bp, url_prefix='/api/v1/donation')
+        app.register_blueprint(metrics_bp, url_prefix='/api/v1/metrics')
+        
+        # Register CLI commands
+        from backend.commands import register_commands
+        register_commands(app)
         
         # Root route
         @app.route('/')
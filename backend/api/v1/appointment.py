@@ -1,16 +1,80 @@
 """Appointment endpoints"""
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required, verify_jwt_in_request, current_user
+import os
+import json
+import queue
 import logging
+import threading
 from datetime import datetime
 import traceback
+from sqlalchemy import tuple_, update, case
+from sqlalchemy.orm import joinedload
 
 from backend.models import User, Appointment, db
+from backend.models.appointment import ACTIVE_STATUSES, CHANGE_SEQUENCE, TOMBSTONE_STATUSES
+from backend.models.change_sequence import allocate_sequence
+from backend.services.booking import (
+    book_appointment, book_series, series_occurrences, hold_slot, confirm_hold, release_hold,
+    SlotUnavailable, SeriesConflict, HoldNotFound
+)
+from backend.services.appointment_events import (
+    EVENT_FIELDS, appointment_event, stage_appointment_events, subscribe, broker
+)
+from backend.utils import service_unavailable
+from backend.utils.auth import create_stream_token, load_stream_token
+from backend.utils.pagination import encode_cursor, decode_cursor, parse_limit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+APPOINTMENT_STATUSES = ('pending', 'accepted', 'declined', 'completed', 'cancelled')
+UPDATABLE_STATUSES = ('accepted', 'declined')
+MAX_BATCH_SIZE = 500
+# Longest bookable slot, in minutes
+MAX_DURATION_MINUTES = int(os.getenv('APPOINTMENT_MAX_DURATION', 480))
+
+# Server-sent events: heartbeat interval in seconds and client reconnect delay
+STREAM_HEARTBEAT = int(os.getenv('APPOINTMENT_STREAM_HEARTBEAT', 25))
+STREAM_RETRY_MS = 3000
+# Seconds a stream token may be used to connect; open streams outlive it
+STREAM_TOKEN_TTL = int(os.getenv('APPOINTMENT_STREAM_TOKEN_TTL', 60))
+# Each open stream holds a worker thread; keep this below the gunicorn thread count (gunicorn.conf.py)
+STREAM_MAX = int(os.getenv('APPOINTMENT_STREAM_MAX', 24))
+open_streams = threading.BoundedSemaphore(STREAM_MAX)
+
+def parse_appointment_filters(args):
+    """Parse ?from=, ?to= and ?status= into (start, end, statuses), raising ValueError if malformed"""
+    bounds = []
+    for name in ('from', 'to'):
+        value = args.get(name)
+        try:
+            bounds.append(datetime.fromisoformat(value).replace(tzinfo=None) if value else None)
+        except ValueError as e:
+            raise ValueError(f'Invalid {name}: {value}') from e
+    
+    statuses = [status.strip() for status in args.get('status', '').split(',') if status.strip()]
+    for status in statuses:
+        if status not in APPOINTMENT_STATUSES:
+            raise ValueError(f'Invalid status: {status}')
+    return bounds[0], bounds[1], statuses
+
+def parse_slot(data):
+    """Parse the requested start time and duration, raising ValueError if malformed"""
+    try:
+        start = datetime.fromisoformat(data['date']).replace(tzinfo=None)
+        duration = int(data['duration'])
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid date or duration') from e
+    if duration <= 0:
+        raise ValueError('Invalid date or duration')
+    if duration > MAX_DURATION_MINUTES:
+        raise ValueError(f'duration must be at most {MAX_DURATION_MINUTES} minutes')
+    return start, duration
+
 def init_appointment_routes(bp):
     @bp.route('/appointments', methods=['GET', 'OPTIONS'])
     def get_appointments():
@@ -23,28 +87,45 @@ def init_appointment_routes(bp):
             response.headers.add('Access-Control-Allow-Credentials', 'true')
             return response, 200
 
+        # Verify JWT token and resolve the current user from its claims
+        verify_jwt_in_request()
+        user = current_user
+
         try:
-            # Verify JWT token
-            verify_jwt_in_request()
-            
-            # Get current user
-            current_user_email = get_jwt_identity()
-            logger.info(f"Processing request for user: {current_user_email}")
+            logger.info(f"Processing request for user: {user.email} with role: {user.role}")
             
-            user = User.query.filter_by(email=current_user_email).first()
-            if not user:
-                logger.error(f"User not found: {current_user_email}")
-                return jsonify({'error': 'User not found'}), 404
+            try:
+                start, end, statuses = parse_appointment_filters(request.args)
+                limit = parse_limit(request.args.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+                cursor = decode_cursor(request.args.get('cursor'))
+                if cursor and len(cursor) != 2:
+                    raise ValueError('Invalid cursor')
+                after = (datetime.fromisoformat(cursor[0]), int(cursor[1])) if cursor else None
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': str(e)}), 400
             
-            logger.info(f"User role: {user.role}")
+            # Load both participants with each appointment rather than once per row in to_dict()
+            query = Appointment.query.options(joinedload(Appointment.patient), joinedload(Appointment.therapist))
             
-            # Get appointments based on user role
+            # Get appointments based on user role; each branch is served by a (participant, date) index
             if user.role == 'therapist':
-                appointments = Appointment.query.filter_by(therapist_id=user.id).all()
-                logger.info(f"Found {len(appointments)} appointments for therapist {user.id}")
+                query = query.filter(Appointment.therapist_id == user.id)
             else:
-                appointments = Appointment.query.filter_by(patient_id=user.id).all()
-                logger.info(f"Found {len(appointments)} appointments for patient {user.id}")
+                query = query.filter(Appointment.patient_id == user.id)
+            if start:
+                query = query.filter(Appointment.date >= start)
+            if end:
+                query = query.filter(Appointment.date < end)
+            if statuses:
+                query = query.filter(Appointment.status.in_(statuses))
+            if after:
+                query = query.filter(tuple_(Appointment.date, Appointment.id) > after)
+            
+            # Fetch one extra row to know whether another page exists
+            appointments = query.order_by(Appointment.date, Appointment.id).limit(limit + 1).all()
+            has_more = len(appointments) > limit
+            appointments = appointments[:limit]
+            logger.info(f"Found {len(appointments)} appointments for {user.role} {user.id}")
             
             # Convert appointments to dict
             appointment_list = []
@@ -56,8 +137,11 @@ def init_appointment_routes(bp):
                     logger.error(f"Error converting appointment to dict: {str(e)}")
                     logger.error(traceback.format_exc())
             
+            last = appointments[-1] if appointments else None
             response = jsonify({
-                'appointments': appointment_list
+                'appointments': appointment_list,
+                'next_cursor': encode_cursor([last.date.isoformat(), last.id]) if has_more else None,
+                'limit': limit
             })
             response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3001')
             response.headers.add('Access-Control-Allow-Credentials', 'true')
@@ -79,14 +163,12 @@ def init_appointment_routes(bp):
             response.headers.add('Access-Control-Allow-Credentials', 'true')
             return response, 200
 
+        # Verify JWT token
+        verify_jwt_in_request()
+        patient = current_user
+
         try:
-            # Verify JWT token
-            verify_jwt_in_request()
-            
-            current_user_email = get_jwt_identity()
-            patient = User.query.filter_by(email=current_user_email).first()
-            
-            if not patient or patient.role != 'patient':
+            if patient.role != 'patient':
                 return jsonify({'error': 'Only patients can create appointments'}), 403
             
             data = request.get_json()
@@ -100,17 +182,48 @@ def init_appointment_routes(bp):
             if not therapist:
                 return jsonify({'error': 'Therapist not found'}), 404
             
-            # Create appointment
-            appointment = Appointment(
-                therapist_id=data['therapist_id'],
-                patient_id=patient.id,
-                date=datetime.fromisoformat(data['date']),
-                duration=data['duration'],
-                notes=data.get('notes')
-            )
+            try:
+                start, duration = parse_slot(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            db.session.add(appointment)
-            db.session.commit()
+            # A recurrence rule books the whole series in one transaction
+            recurrence = data.get('recurrence')
+            if recurrence:
+                try:
+                    starts = series_occurrences(
+                        start, recurrence.get('frequency'), recurrence.get('count'), duration
+                    )
+                except (ValueError, AttributeError) as e:
+                    return jsonify({'error': str(e) if isinstance(e, ValueError) else 'Invalid recurrence'}), 400
+                
+                try:
+                    appointments, conflicts = book_series(
+                        therapist.id, patient.id, starts, duration,
+                        notes=data.get('notes'), skip_conflicts=bool(data.get('skip_conflicts'))
+                    )
+                except SeriesConflict as e:
+                    return jsonify({
+                        'error': str(e),
+                        'conflicts': [conflict.isoformat() for conflict in e.conflicts]
+                    }), 409
+                except SlotUnavailable as e:
+                    return jsonify({'error': str(e)}), 409
+                
+                return jsonify({
+                    'message': f'{len(appointments)} appointments created successfully',
+                    'series_id': appointments[0].series_id,
+                    'appointments': [appointment.to_dict() for appointment in appointments],
+                    'conflicts': [conflict.isoformat() for conflict in conflicts]
+                }), 201
+            
+            # Create appointment unless the therapist already has an overlapping session
+            try:
+                appointment = book_appointment(
+                    therapist.id, patient.id, start, duration, notes=data.get('notes')
+                )
+            except SlotUnavailable as e:
+                return jsonify({'error': str(e)}), 409
             
             return jsonify({
                 'message': 'Appointment created successfully',
@@ -127,24 +240,27 @@ def init_appointment_routes(bp):
     def update_appointment_status(appointment_id):
         """Update appointment status (accept/decline)"""
         try:
-            current_user_email = get_jwt_identity()
-            user = User.query.filter_by(email=current_user_email).first()
+            user = current_user
             
-            if not user or user.role != 'therapist':
+            if user.role != 'therapist':
                 return jsonify({'error': 'Only therapists can update appointment status'}), 403
             
             appointment = Appointment.query.filter_by(
                 id=appointment_id,
                 therapist_id=user.id
-            ).first()
+            ).with_for_update().first()
             
             if not appointment:
                 return jsonify({'error': 'Appointment not found'}), 404
             
             data = request.get_json()
-            if 'status' not in data or data['status'] not in ['accepted', 'declined']:
+            if 'status' not in data or data['status'] not in UPDATABLE_STATUSES:
                 return jsonify({'error': 'Invalid status'}), 400
             
+            # Reviving a declined or cancelled appointment could double-book its slot
+            if appointment.status != 'pending':
+                return jsonify({'error': f'Cannot update a {appointment.status} appointment'}), 400
+            
             appointment.status = data['status']
             db.session.commit()
             
@@ -158,6 +274,300 @@ def init_appointment_routes(bp):
             db.session.rollback()
             return jsonify({'error': 'Failed to update appointment status'}), 500
 
+    @bp.route('/appointments/status', methods=['PUT'])
+    @jwt_required()
+    def update_appointment_statuses():
+        """Accept or decline several appointments in one transaction"""
+        try:
+            user = current_user
+            
+            if user.role != 'therapist':
+                return jsonify({'error': 'Only therapists can update appointment status'}), 403
+            
+            data = request.get_json(silent=True) or {}
+            updates = data.get('updates')
+            if not isinstance(updates, list) or not updates:
+                return jsonify({'error': 'updates must be a non-empty list'}), 400
+            if len(updates) > MAX_BATCH_SIZE:
+                return jsonify({'error': f'At most {MAX_BATCH_SIZE} updates per request'}), 400
+            
+            # Validate the payload; the last entry wins if an id is repeated
+            results = {}
+            requested = {}
+            for item in updates:
+                appointment_id = item.get('id') if isinstance(item, dict) else None
+                if not isinstance(appointment_id, int):
+                    return jsonify({'error': 'Each update needs an integer id'}), 400
+                if item.get('status') not in UPDATABLE_STATUSES:
+                    results[appointment_id] = {'id': appointment_id, 'result': 'invalid_status'}
+                    requested.pop(appointment_id, None)
+                else:
+                    results.pop(appointment_id, None)
+                    requested[appointment_id] = item['status']
+            
+            # One ownership query for the whole batch
+            owned = {}
+            if requested:
+                owned = {
+                    row.id: row for row in db.session.query(
+                        *[getattr(Appointment, field) for field in EVENT_FIELDS]
+                    ).filter(
+                        Appointment.id.in_(requested),
+                        Appointment.therapist_id == user.id
+                    ).with_for_update()
+                }
+            
+            # Only pending appointments can be accepted or declined
+            changes = {
+                appointment_id: status for appointment_id, status in requested.items()
+                if appointment_id in owned and owned[appointment_id].status == 'pending'
+            }
+            if changes:
+                # The bulk UPDATE bypasses the mapper hooks, so bump the change sequence here
+                last_seq = allocate_sequence(db.session.connection(), CHANGE_SEQUENCE, len(changes))
+                sequence = {
+                    appointment_id: last_seq - len(changes) + 1 + position
+                    for position, appointment_id in enumerate(changes)
+                }
+                db.session.execute(
+                    update(Appointment)
+                    .where(
+                        Appointment.id.in_(changes), Appointment.therapist_id == user.id,
+                        Appointment.status == 'pending'
+                    )
+                    .values(
+                        status=case(changes, value=Appointment.id),
+                        change_seq=case(sequence, value=Appointment.id),
+                        updated_at=datetime.utcnow()
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                # ...and stage the notifications
+                stage_appointment_events(db.session, [
+                    dict(appointment_event(owned[appointment_id]), status=status, change_seq=sequence[appointment_id])
+                    for appointment_id, status in changes.items()
+                ])
+            db.session.commit()
+            
+            for appointment_id in requested:
+                if appointment_id in changes:
+                    results[appointment_id] = {'id': appointment_id, 'result': 'updated', 'status': changes[appointment_id]}
+                elif appointment_id in owned:
+                    results[appointment_id] = {'id': appointment_id, 'result': 'not_pending', 'status': owned[appointment_id].status}
+                else:
+                    results[appointment_id] = {'id': appointment_id, 'result': 'not_found'}
+            
+            return jsonify({
+                'message': f'Updated {len(changes)} appointments',
+                'results': list(results.values())
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"Error updating appointment statuses: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Failed to update appointment statuses'}), 500
+
+    @bp.route('/appointments/sync', methods=['GET'])
+    @jwt_required()
+    def sync_appointments():
+        """Return appointments written after a change cursor, with tombstones for cancellations"""
+        try:
+            user = current_user
+            
+            try:
+                cursor = int(request.args.get('cursor') or 0)
+                if cursor < 0:
+                    raise ValueError
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            try:
+                limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            participant = Appointment.therapist_id if user.role == 'therapist' else Appointment.patient_id
+            rows = (
+                Appointment.query
+                .options(joinedload(Appointment.patient), joinedload(Appointment.therapist))
+                .filter(participant == user.id, Appointment.change_seq > cursor)
+                .order_by(Appointment.change_seq)
+                .limit(limit + 1)
+                .all()
+            )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            changes = []
+            tombstones = []
+            for appointment in rows:
+                if appointment.status in TOMBSTONE_STATUSES:
+                    tombstones.append({
+                        'id': appointment.id,
+                        'status': appointment.status,
+                        'change_seq': appointment.change_seq
+                    })
+                else:
+                    changes.append(appointment.to_dict())
+            
+            return jsonify({
+                'changes': changes,
+                'tombstones': tombstones,
+                'cursor': str(rows[-1].change_seq if rows else cursor),
+                'has_more': has_more
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"Error syncing appointments: {str(e)}")
+            return jsonify({'error': 'Failed to sync appointments'}), 500
+
+    @bp.route('/appointments/<int:appointment_id>/cancel', methods=['POST'])
+    @jwt_required()
+    def cancel_appointment(appointment_id):
+        """Cancel a pending or accepted appointment as either participant"""
+        try:
+            user = current_user
+            
+            appointment = Appointment.query.filter(
+                Appointment.id == appointment_id,
+                (Appointment.patient_id == user.id) | (Appointment.therapist_id == user.id)
+            ).first()
+            if not appointment:
+                return jsonify({'error': 'Appointment not found'}), 404
+            if appointment.status not in ACTIVE_STATUSES:
+                return jsonify({'error': f'Cannot cancel a {appointment.status} appointment'}), 400
+            
+            appointment.status = 'cancelled'
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Appointment cancelled successfully',
+                'appointment': appointment.to_dict()
+            }), 200
+            
+        except Exception as e:
+            logger.error(f"Error cancelling appointment: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Failed to cancel appointment'}), 500
+
+    @bp.route('/appointments/stream/token', methods=['POST'])
+    @jwt_required()
+    def create_stream_token_for_user():
+        """Issue a short-lived token for opening the appointment stream"""
+        return jsonify({'token': create_stream_token(current_user), 'expires_in': STREAM_TOKEN_TTL}), 200
+
+    @bp.route('/appointments/stream', methods=['GET'])
+    def stream_appointments():
+        """Push appointment changes for the current user as server-sent events"""
+        # EventSource cannot set headers, so it passes a stream token from POST /appointments/stream/token
+        user = load_stream_token(request.args.get('token', ''), STREAM_TOKEN_TTL)
+        if user is None:
+            return jsonify({'error': 'Invalid or expired stream token'}), 401
+        user_id = user.id
+        if not open_streams.acquire(blocking=False):
+            return service_unavailable('Too many open appointment streams', STREAM_RETRY_MS // 1000)
+        try:
+            subscription = subscribe(user_id)
+        except Exception:
+            open_streams.release()
+            raise
+        
+        def generate():
+            yield f'retry: {STREAM_RETRY_MS}\n\n'
+            while True:
+                try:
+                    data = subscription.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Comment lines keep proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: appointment\ndata: {json.dumps(data)}\n\n'
+        
+        def close():
+            broker.unsubscribe(user_id, subscription)
+            open_streams.release()
+        
+        response = Response(generate(), mimetype='text/event-stream')
+        # Runs even when the client goes away before the first chunk is sent
+        response.call_on_close(close)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @bp.route('/appointments/holds', methods=['POST'])
+    @jwt_required()
+    def create_hold():
+        """Reserve a slot for a few minutes while the patient confirms"""
+        try:
+            patient = current_user
+            
+            if patient.role != 'patient':
+                return jsonify({'error': 'Only patients can hold appointments'}), 403
+            
+            data = request.get_json()
+            if not data or not all(field in data for field in ['therapist_id', 'date', 'duration']):
+                return jsonify({'error': 'Missing required fields'}), 400
+            
+            try:
+                start, duration = parse_slot(data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            therapist = User.query.filter_by(id=data['therapist_id'], role='therapist').first()
+            if not therapist:
+                return jsonify({'error': 'Therapist not found'}), 404
+            
+            try:
+                hold = hold_slot(therapist.id, patient.id, start, duration)
+            except SlotUnavailable as e:
+                return jsonify({'error': str(e)}), 409
+            
+            return jsonify({
+                'message': 'Slot held successfully',
+                'hold': hold.to_dict()
+            }), 201
+            
+        except Exception as e:
+            logger.error(f"Error holding appointment slot: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Failed to hold appointment slot'}), 500
+
+    @bp.route('/appointments/holds/<int:hold_id>/confirm', methods=['POST'])
+    @jwt_required()
+    def confirm_appointment_hold(hold_id):
+        """Convert a held slot into an appointment"""
+        try:
+            data = request.get_json(silent=True) or {}
+            try:
+                appointment = confirm_hold(hold_id, current_user.id, notes=data.get('notes'))
+            except HoldNotFound as e:
+                return jsonify({'error': str(e)}), 404
+            except SlotUnavailable as e:
+                return jsonify({'error': str(e)}), 409
+            
+            return jsonify({
+                'message': 'Appointment created successfully',
+                'appointment': appointment.to_dict()
+            }), 201
+            
+        except Exception as e:
+            logger.error(f"Error confirming appointment hold: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Failed to confirm appointment hold'}), 500
+
+    @bp.route('/appointments/holds/<int:hold_id>', methods=['DELETE'])
+    @jwt_required()
+    def delete_hold(hold_id):
+        """Release a held slot before it expires"""
+        try:
+            if not release_hold(hold_id, current_user.id):
+                return jsonify({'error': 'Hold not found'}), 404
+            return jsonify({'message': 'Hold released successfully'}), 200
+            
+        except Exception as e:
+            logger.error(f"Error releasing appointment hold: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': 'Failed to release appointment hold'}), 500
+
 # Initialize routes with the appointment blueprint
 appointment_bp = Blueprint('appointment', __name__)
 init_appointment_routes(appointment_bp) 
\ No newline at end of file
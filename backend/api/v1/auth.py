@@ -1,13 +1,15 @@
 """Authentication endpoints"""
 from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 import os
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
 import logging
 
 from backend.models import User, db
+from backend.services.password_service import password_hasher, HashingQueueFull
+from backend.utils import service_unavailable
+from backend.utils.auth import create_user_token
 
 # Load environment variables
 load_dotenv()
@@ -43,7 +45,7 @@ def init_auth_routes(bp):
             new_user = User(
                 name=data['name'],
                 email=data['email'],
-                password_hash=generate_password_hash(data['password']),
+                password_hash=password_hasher.hash_password(data['password']),
                 role='patient'  # Default role is patient
             )
             
@@ -53,10 +55,7 @@ def init_auth_routes(bp):
                 logger.info(f"Successfully created new user with email: {data['email']}")
                 
                 # Create access token
-                access_token = create_access_token(
-                    identity=new_user.email,
-                    expires_delta=timedelta(days=1)
-                )
+                access_token = create_user_token(new_user)
                 
                 return jsonify({
                     'user': {
@@ -73,6 +72,8 @@ def init_auth_routes(bp):
                 logger.error(f"Database error during user creation: {str(e)}")
                 return jsonify({'error': 'Failed to create user: Database error'}), 500
                 
+        except HashingQueueFull as e:
+            return service_unavailable('Server is busy, please retry shortly', e.retry_after)
         except Exception as e:
             logger.error(f"Unexpected error in registration: {str(e)}")
             return jsonify({'error': f'Registration failed: {str(e)}'}), 500
@@ -88,14 +89,16 @@ def init_auth_routes(bp):
         # Find user by email
         user = User.query.filter_by(email=data['email']).first()
         
-        if not user or not check_password_hash(user.password_hash, data['password']):
+        try:
+            valid = user is not None and password_hasher.verify_password(user.password_hash, data['password'])
+        except HashingQueueFull as e:
+            return service_unavailable('Server is busy, please retry shortly', e.retry_after)
+
+        if not valid:
             return jsonify({'error': 'Invalid email or password'}), 401
             
         # Create access token
-        access_token = create_access_token(
-            identity=user.email,
-            expires_delta=timedelta(days=1)
-        )
+        access_token = create_user_token(user)
         
         return jsonify({
             'user': {
@@ -111,16 +114,10 @@ def init_auth_routes(bp):
     @jwt_required()
     def get_current_user():
         """Get current user endpoint"""
-        current_user_email = get_jwt_identity()
-        user = User.query.filter_by(email=current_user_email).first()
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
         return jsonify({
-            'email': user.email,
-            'name': user.name,
-            'role': user.role,
+            'email': current_user.email,
+            'name': current_user.name,
+            'role': current_user.role,
             'is_authenticated': True
         }), 200
 
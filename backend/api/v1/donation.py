@@ -1,10 +1,27 @@
 """Donation endpoints"""
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
+import os
 import logging
+import time
+import hashlib
+import stripe
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy.exc import IntegrityError
 
 from backend.models import User, Donation, db
+from backend.models.donation import to_minor_units
+from backend.services.donation_export import export_rows, iter_csv
+from backend.services.donation_rollups import campaign_progress
+from backend.services.donation_status import listen, waiters
+from backend.services.donation_summary import donation_summary
 from backend.services.stripe_service import StripePaymentService
+from backend.services.stripe_webhooks import OPEN_STATUSES, record_event, webhook_processor
+from backend.utils import service_unavailable
+from backend.utils.cache import TTLCache
+from backend.utils.idempotency import IdempotencyCache, IdempotencyKeyInUse, IdempotencyKeyReused
+from backend.utils.pagination import encode_cursor, decode_cursor, parse_limit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,20 +30,122 @@ logger = logging.getLogger(__name__)
 # Initialize services
 stripe_service = StripePaymentService()
 
+# Responses to recent donation requests, replayed for a repeated Idempotency-Key
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+idempotent_donations = IdempotencyCache(
+    maxsize=int(os.getenv('DONATION_IDEMPOTENCY_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('DONATION_IDEMPOTENCY_TTL', 3600)),
+    wait=stripe_service.timeout[0] + stripe_service.timeout[1]
+)
+
+# Campaign progress is public and read on every page view; each worker reuses it briefly
+campaign_cache = TTLCache(maxsize=1, ttl=int(os.getenv('DONATION_CAMPAIGN_CACHE_SECONDS', 5)))
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_SUMMARY_MONTHS = 120
+
+# Upper bound for ?wait= on the status endpoint, below common proxy read timeouts
+MAX_STATUS_WAIT = int(os.getenv('DONATION_STATUS_MAX_WAIT', 30))
+
+
+def parse_amount(value):
+    """Parse a positive donation amount into integer minor units, raising ValueError if invalid"""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError) as e:
+        raise ValueError('Invalid amount') from e
+    if not amount.is_finite() or to_minor_units(amount) <= 0:
+        raise ValueError('Amount must be positive')
+    return to_minor_units(amount)
+
+
+def parse_export_filters(args):
+    """Parse ?from=, ?to= and ?status= for exports, raising ValueError if malformed"""
+    bounds = []
+    for name in ('from', 'to'):
+        value = args.get(name)
+        try:
+            bounds.append(datetime.fromisoformat(value).replace(tzinfo=None) if value else None)
+        except ValueError as e:
+            raise ValueError(f'Invalid {name}: {value}') from e
+    return bounds[0], bounds[1], args.get('status') or None
+
+
+def donation_dict(donation):
+    return {
+        'id': donation.id,
+        'amount': donation.amount,
+        'amount_minor': donation.amount_minor,
+        'status': donation.status,
+        'transaction_id': donation.transaction_id,
+        'created_at': donation.created_at.isoformat() if donation.created_at else None
+    }
+
+
+def stripe_idempotency_key(user_id, idempotency_key):
+    """Fixed-length Stripe key for a client's key
+
+    Stripe scopes idempotency keys per account, so the user is folded in; the
+    digest keeps any accepted client key within Stripe's 255-character limit.
+    """
+    digest = hashlib.sha256(f'{user_id}:{idempotency_key}'.encode()).hexdigest()
+    return f'donation-{digest}'
+
+
+def _create_checkout(user, amount_minor, idempotency_key=None):
+    """Open a Stripe checkout session and record its pending donation"""
+    checkout_result = stripe_service.create_checkout_session(
+        amount_minor=amount_minor,
+        donation_id=str(user.id),
+        idempotency_key=stripe_idempotency_key(user.id, idempotency_key) if idempotency_key else None
+    )
+
+    if checkout_result.get('retry_after'):
+        return service_unavailable(checkout_result['error'], checkout_result['retry_after']), 503
+    if not checkout_result['success']:
+        logger.error(f"Failed to create Stripe session: {checkout_result.get('error')}")
+        return jsonify({
+            'error': checkout_result.get('error', 'Failed to create payment session')
+        }), 400
+
+    # Create donation record
+    donation = Donation(
+        amount_minor=amount_minor,
+        user_id=user.id,
+        status='pending',
+        transaction_id=checkout_result['session_id']
+    )
+
+    try:
+        db.session.add(donation)
+        db.session.commit()
+        logger.info(f"Created donation record for user {user.id} with amount {donation.amount}")
+    except IntegrityError:
+        # Stripe replayed a session another worker already recorded
+        db.session.rollback()
+        logger.info(f"Donation for checkout session {checkout_result['session_id']} already recorded")
+    except Exception as e:
+        logger.error(f"Database error creating donation: {str(e)}")
+        db.session.rollback()
+        # Continue anyway since we have the checkout URL
+
+    return jsonify({
+        'amount': amount_minor / 100,
+        'amount_minor': amount_minor,
+        'user_id': user.id,
+        'checkout_url': checkout_result['url']
+    }), 200
+
+
 def init_donation_routes(bp):
     @bp.route('/donation/', methods=['POST'])
     @jwt_required()
     def create_donation():
-        """Create a new donation"""
+        """Create a new donation, replaying the original response for a repeated Idempotency-Key"""
         try:
             data = request.get_json()
-            current_user_email = get_jwt_identity()
-            
-            # Get user from database
-            user = User.query.filter_by(email=current_user_email).first()
-            if not user:
-                logger.error(f"User not found for email: {current_user_email}")
-                return jsonify({'error': 'User not found'}), 404
+            user = current_user
             
             # Validate request data
             if not data or 'amount' not in data:
@@ -34,47 +153,40 @@ def init_donation_routes(bp):
                 return jsonify({'error': 'Amount is required'}), 400
             
             try:
-                amount = float(data['amount'])
-                if amount <= 0:
-                    raise ValueError("Amount must be positive")
+                amount_minor = parse_amount(data['amount'])
             except ValueError as e:
                 logger.error(f"Invalid amount format: {data.get('amount')}")
                 return jsonify({'error': 'Invalid amount format. Amount must be a positive number'}), 400
-                
-            # Create Stripe checkout session
-            checkout_result = stripe_service.create_checkout_session(
-                amount=amount,
-                donation_id=str(user.id)
-            )
-            
-            if not checkout_result['success']:
-                logger.error(f"Failed to create Stripe session: {checkout_result.get('error')}")
+
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if idempotency_key is None:
+                return _create_checkout(user, amount_minor)
+            if not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
                 return jsonify({
-                    'error': checkout_result.get('error', 'Failed to create payment session')
+                    'error': f'Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters'
                 }), 400
-            
-            # Create donation record
-            donation = Donation(
-                amount=amount,
-                user_id=user.id,
-                status='pending',
-                transaction_id=checkout_result['session_id']
-            )
-            
+
+            cache_key = (user.id, idempotency_key)
             try:
-                db.session.add(donation)
-                db.session.commit()
-                logger.info(f"Created donation record for user {user.id} with amount {amount}")
-            except Exception as e:
-                logger.error(f"Database error creating donation: {str(e)}")
-                db.session.rollback()
-                # Continue anyway since we have the checkout URL
-                
-            return jsonify({
-                'amount': amount,
-                'user_id': user.id,
-                'checkout_url': checkout_result['url']
-            }), 200
+                replayed = idempotent_donations.claim(cache_key, amount_minor)
+            except IdempotencyKeyInUse:
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+            except IdempotencyKeyReused:
+                return jsonify({'error': 'Idempotency-Key was already used with a different amount'}), 422
+            if replayed is not None:
+                logger.info(f"Replaying donation response for user {user.id}")
+                response = jsonify(replayed)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response, 200
+
+            body = None
+            try:
+                response, status = _create_checkout(user, amount_minor, idempotency_key)
+                if status == 200:
+                    body = response.get_json()
+                return response, status
+            finally:
+                idempotent_donations.release(cache_key, amount_minor, body)
             
         except Exception as e:
             logger.error(f"Unexpected error in create_donation: {str(e)}")
@@ -82,53 +194,170 @@ def init_donation_routes(bp):
 
     @bp.route('/donation/webhook', methods=['POST'])
     def stripe_webhook():
-        """Handle Stripe webhook events"""
+        """Verify a Stripe webhook, store it in the inbox and process it in the background"""
         signature = request.headers.get('stripe-signature')
         if not signature:
             logger.error("Missing Stripe signature in webhook request")
             return jsonify({'error': 'No signature provided'}), 400
-            
-        success, message = stripe_service.handle_webhook(
-            payload=request.get_data(),
-            signature=signature
-        )
         
-        if not success:
-            logger.error(f"Webhook processing failed: {message}")
-            return jsonify({'error': message}), 400
-            
-        logger.info("Successfully processed webhook")
+        payload = request.get_data()
+        try:
+            event = stripe_service.construct_event(payload, signature)
+        except stripe.error.SignatureVerificationError as e:
+            logger.error(f"Invalid webhook signature: {str(e)}")
+            return jsonify({'error': 'Invalid signature'}), 400
+        except ValueError as e:
+            logger.error(f"Webhook verification failed: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            created = record_event(event, payload)
+        except Exception as e:
+            logger.error(f"Error storing webhook event: {str(e)}")
+            db.session.rollback()
+            # Non-2xx makes Stripe retry delivery later
+            return jsonify({'error': 'Failed to store event'}), 500
+        
+        if created:
+            webhook_processor.submit(current_app._get_current_object())
+        
+        logger.info(f"Received webhook event {event['id']} ({event['type']})")
         return jsonify({
-            'status': 'success',
-            'message': message
+            'status': 'received' if created else 'duplicate'
         }), 200
 
     @bp.route('/donation/', methods=['GET'])
     @jwt_required()
     def get_donations():
-        """Get all donations for the current user"""
+        """Get a page of the current user's donations, newest first"""
         try:
-            current_user_email = get_jwt_identity()
-            user = User.query.filter_by(email=current_user_email).first()
-            
-            if not user:
-                logger.error(f"User not found for email: {current_user_email}")
-                return jsonify({'error': 'User not found'}), 404
-            
-            donations = Donation.query.filter_by(user_id=user.id).all()
+            try:
+                limit = parse_limit(request.args.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+                cursor = decode_cursor(request.args.get('cursor'))
+                if cursor and len(cursor) != 1:
+                    raise ValueError('Invalid cursor')
+                before = int(cursor[0]) if cursor else None
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': str(e)}), 400
+
+            query = Donation.query.filter(Donation.user_id == current_user.id)
+            if request.args.get('status'):
+                query = query.filter(Donation.status == request.args['status'])
+            if before:
+                query = query.filter(Donation.id < before)
+
+            # Fetch one extra row to know whether another page exists
+            donations = query.order_by(Donation.id.desc()).limit(limit + 1).all()
+            has_more = len(donations) > limit
+            donations = donations[:limit]
             return jsonify({
-                'donations': [{
-                    'id': d.id,
-                    'amount': d.amount,
-                    'status': d.status,
-                    'transaction_id': d.transaction_id
-                } for d in donations]
+                'donations': [donation_dict(d) for d in donations],
+                'next_cursor': encode_cursor([donations[-1].id]) if has_more else None,
+                'limit': limit
             }), 200
             
         except Exception as e:
             logger.error(f"Error fetching donations: {str(e)}")
             return jsonify({'error': 'Failed to fetch donations'}), 500
 
+    @bp.route('/donation/summary', methods=['GET'])
+    @jwt_required()
+    def get_donation_summary():
+        """Total, count, last donation and monthly totals of the current user's completed donations"""
+        try:
+            months = int(request.args.get('months', 12))
+            if not 1 <= months <= MAX_SUMMARY_MONTHS:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': f'months must be between 1 and {MAX_SUMMARY_MONTHS}'}), 400
+
+        try:
+            return jsonify(donation_summary(current_user.id, months=months)), 200
+        except Exception as e:
+            logger.error(f"Error computing donation summary: {str(e)}")
+            return jsonify({'error': 'Failed to fetch donation summary'}), 500
+
+    @bp.route('/donation/campaign', methods=['GET'])
+    def get_campaign_progress():
+        """Platform donation totals against the campaign goal, served from the rollups"""
+        try:
+            progress = campaign_cache.get('progress')
+            if progress is None:
+                progress = campaign_progress()
+                campaign_cache.set('progress', progress)
+            response = jsonify(progress)
+            response.headers['Cache-Control'] = f'public, max-age={campaign_cache.ttl}'
+            return response, 200
+        except Exception as e:
+            logger.error(f"Error fetching campaign progress: {str(e)}")
+            return jsonify({'error': 'Failed to fetch campaign progress'}), 500
+
+    @bp.route('/donation/export', methods=['GET'])
+    @jwt_required()
+    def export_donations():
+        """Stream donations as CSV for admins, one batch of rows at a time"""
+        if current_user.role != 'admin':
+            return jsonify({'error': 'Admin privileges required'}), 403
+        try:
+            start, end, status = parse_export_filters(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        logger.info(f"Admin {current_user.id} exporting donations from={start} to={end} status={status}")
+        response = Response(
+            stream_with_context(iter_csv(export_rows(start, end, status))), mimetype='text/csv'
+        )
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename=donations-{datetime.utcnow():%Y%m%d%H%M%S}.csv'
+        )
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @bp.route('/donation/status/<session_id>', methods=['GET'])
+    @jwt_required()
+    def get_donation_status(session_id):
+        """Status of the current user's donation for a checkout session
+
+        With ?wait=N the request blocks for up to N seconds until the status differs
+        from ?status= (or, without it, leaves pending/processing). The thread sleeps
+        on an event set when the change commits instead of polling the database.
+        """
+        try:
+            wait = float(request.args.get('wait', 0))
+            if not 0 <= wait <= MAX_STATUS_WAIT:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': f'wait must be between 0 and {MAX_STATUS_WAIT} seconds'}), 400
+        seen = request.args.get('status')
+        user_id = current_user.id
+
+        def unchanged(donation):
+            return donation.status == seen if seen else donation.status in OPEN_STATUSES
+
+        # Register before the first read so a change committed in between still wakes us
+        waiter = listen(session_id) if wait else None
+        try:
+            deadline = time.monotonic() + wait
+            while True:
+                donation = Donation.query.filter_by(transaction_id=session_id, user_id=user_id).first()
+                if donation is None:
+                    return jsonify({'error': 'Donation not found'}), 404
+                remaining = deadline - time.monotonic()
+                if not waiter or remaining <= 0 or not unchanged(donation):
+                    break
+                # Hand the connection back to the pool while sleeping
+                db.session.close()
+                waiter.wait(remaining)
+                waiter.clear()
+
+            return jsonify(dict(donation_dict(donation), final=donation.status not in OPEN_STATUSES)), 200
+        except Exception as e:
+            logger.error(f"Error fetching donation status: {str(e)}")
+            return jsonify({'error': 'Failed to fetch donation status'}), 500
+        finally:
+            if waiter:
+                waiters.unregister(session_id, waiter)
+
 # Initialize routes with the donation blueprint
 donation_bp = Blueprint('donation', __name__)
 init_donation_routes(donation_bp) 
\ No newline at end of file
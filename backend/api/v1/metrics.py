@@ -0,0 +1,32 @@
+"""Operational metrics endpoints"""
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, current_user
+import os
+import logging
+
+from backend.api.v1 import donation as donation_api
+from backend.services.password_service import password_hasher
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def init_metrics_routes(bp):
+    @bp.route('/', methods=['GET'])
+    @jwt_required()
+    def get_metrics():
+        """Pool and latency metrics of the worker serving the request, for admins
+
+        Each worker keeps its own counters, so pid identifies which one answered.
+        """
+        if current_user.role != 'admin':
+            return jsonify({'error': 'Admin privileges required'}), 403
+        return jsonify({
+            'pid': os.getpid(),
+            'password_hashing': password_hasher.stats(),
+            'stripe': donation_api.stripe_service.stats()
+        }), 200
+
+# Initialize routes with the metrics blueprint
+metrics_bp = Blueprint('metrics', __name__)
+init_metrics_routes(metrics_bp)
@@ -1,16 +1,97 @@
 """Therapist endpoints"""
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from flask_jwt_extended import jwt_required, current_user
 import logging
-from werkzeug.security import generate_password_hash
-from datetime import timedelta
+from sqlalchemy import func
+from sqlalchemy.orm.exc import StaleDataError
 
-from backend.models import User, db
+from backend.models import User, TherapistLanguage, TherapistQualification, db
+from backend.services.password_service import password_hasher, HashingQueueFull
+from backend.services.therapist_index import therapist_index, valid_cursor, INDEX_FIELDS, SORT_FIELDS
+from backend.services.therapist_search import search_therapists
+from backend.services.availability import parse_availability_filter, available_therapist_ids
+from backend.utils import service_unavailable
+from backend.utils.auth import create_user_token
+from backend.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from backend.utils.conditional import (
+    version_etag, collection_etag, not_modified, precondition_failed, with_validators
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Page size limits for the therapist directory
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Accepted values for ?sort=
+SORT_OPTIONS = ('id',) + SORT_FIELDS + tuple(f'-{field}' for field in SORT_FIELDS)
+
+# Columns that can be requested through ?fields=
+THERAPIST_FIELDS = {
+    'id': User.id,
+    'email': User.email,
+    'name': User.name,
+    'role': User.role,
+    'specialization': User.specialization,
+    'bio': User.bio,
+    'years_of_experience': User.years_of_experience,
+    'hourly_rate': User.hourly_rate,
+    'availability': User.availability,
+    'profile_image': User.profile_image,
+    'qualifications': User.qualifications,
+    'languages': User.languages,
+    'is_verified': User.is_verified
+}
+
+def parse_fields(value):
+    """Parse a comma separated ?fields= list, defaulting to every therapist field"""
+    if not value:
+        return list(THERAPIST_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in THERAPIST_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return ['id'] + [field for field in fields if field != 'id']
+
+def filter_therapists(query, specialization=None, min_experience=None, max_rate=None,
+                      language=None, qualification=None, therapist_ids=None):
+    """Apply the directory filters to a query over verified therapists"""
+    query = query.filter(User.role == 'therapist', User.is_verified.is_(True))
+    if therapist_ids is not None:
+        query = query.filter(User.id.in_(therapist_ids))
+    if specialization:
+        query = query.filter(User.specialization == specialization)
+    if min_experience:
+        query = query.filter(User.years_of_experience >= min_experience)
+    if max_rate:
+        query = query.filter(User.hourly_rate <= max_rate)
+    if language:
+        query = query.filter(User.id.in_(
+            db.session.query(TherapistLanguage.user_id)
+            .filter(TherapistLanguage.name_key == language.strip().lower())
+        ))
+    if qualification:
+        query = query.filter(User.id.in_(
+            db.session.query(TherapistQualification.user_id)
+            .filter(TherapistQualification.name_key == qualification.strip().lower())
+        ))
+    return query
+
+def project_records(records, fields):
+    """Shape index records to the requested fields, reading missing columns in one query"""
+    missing = [field for field in fields if field not in INDEX_FIELDS and field != 'role']
+    if missing and records:
+        columns = [User.id] + [THERAPIST_FIELDS[field] for field in missing]
+        rows = db.session.query(*columns).filter(User.id.in_([r['id'] for r in records])).all()
+        extra = {row.id: row._mapping for row in rows}
+        for record in records:
+            record.update({field: extra.get(record['id'], {}).get(field) for field in missing})
+    for record in records:
+        record['role'] = 'therapist'
+    return [{field: record[field] for field in fields} for record in records]
+
 def init_therapist_routes(bp):
     @bp.route('/register', methods=['POST'])
     def register_therapist():
@@ -43,7 +124,7 @@ def init_therapist_routes(bp):
             new_therapist = User(
                 name=data['name'],
                 email=data['email'],
-                password_hash=generate_password_hash(data['password']),
+                password_hash=password_hasher.hash_password(data['password']),
                 role='therapist',
                 specialization=data['specialization'],
                 bio=data['bio'],
@@ -61,10 +142,7 @@ def init_therapist_routes(bp):
             logger.info(f"Successfully created new therapist with email: {data['email']}")
             
             # Create access token
-            access_token = create_access_token(
-                identity=new_therapist.email,
-                expires_delta=timedelta(days=1)
-            )
+            access_token = create_user_token(new_therapist)
             
             return jsonify({
                 'message': 'Therapist registered successfully',
@@ -73,6 +151,8 @@ def init_therapist_routes(bp):
                 'token_type': 'bearer'
             }), 201
             
+        except HashingQueueFull as e:
+            return service_unavailable('Server is busy, please retry shortly', e.retry_after)
         except Exception as e:
             logger.error(f"Error registering therapist: {str(e)}")
             db.session.rollback()
@@ -80,31 +160,121 @@ def init_therapist_routes(bp):
 
     @bp.route('/therapists', methods=['GET'])
     def get_therapists():
-        """Get list of all verified therapists"""
+        """Get a page of verified therapists"""
         try:
             # Get query parameters for filtering
-            specialization = request.args.get('specialization')
-            min_experience = request.args.get('min_experience', type=int)
-            max_rate = request.args.get('max_rate', type=float)
-            language = request.args.get('language')
-            
-            # Base query
-            query = User.query.filter_by(role='therapist', is_verified=True)
-            
-            # Apply filters
-            if specialization:
-                query = query.filter(User.specialization == specialization)
-            if min_experience:
-                query = query.filter(User.years_of_experience >= min_experience)
-            if max_rate:
-                query = query.filter(User.hourly_rate <= max_rate)
-            if language:
-                query = query.filter(User.languages.contains([language]))
-            
-            therapists = query.all()
-            return jsonify({
-                'therapists': [t.to_dict() for t in therapists]
-            }), 200
+            filters = {
+                'specialization': request.args.get('specialization'),
+                'min_experience': request.args.get('min_experience', type=int),
+                'max_rate': request.args.get('max_rate', type=float),
+                'language': request.args.get('language'),
+                'qualification': request.args.get('qualification')
+            }
+            search_text = (request.args.get('q') or '').strip()
+            sort = request.args.get('sort', 'id')
+            with_facets = request.args.get('facets', '').lower() in ('1', 'true')
+            
+            # Pagination and sparse fieldset parameters
+            try:
+                limit = parse_limit(request.args.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+                cursor = decode_cursor(request.args.get('cursor'))
+                fields = parse_fields(request.args.get('fields'))
+                if sort not in SORT_OPTIONS:
+                    raise ValueError(f'Invalid sort: {sort}')
+                availability = parse_availability_filter(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # Free/busy depends on bookings, so the matching ids also feed the ETag
+            etag_extra = None
+            if availability is not None:
+                filters['therapist_ids'] = available_therapist_ids(availability)
+                etag_extra = sorted(filters['therapist_ids'])
+            
+            # Select only the requested columns; id is always needed for the cursor
+            columns = [User.id] + [THERAPIST_FIELDS[field] for field in fields if field != 'id']
+            
+            if search_text:
+                # Relevance-ranked full-text search, paged by offset
+                if sort != 'id':
+                    return jsonify({'error': 'Search results are ordered by relevance'}), 400
+                try:
+                    offset = int(cursor[0]) if cursor else 0
+                    if offset < 0:
+                        raise ValueError('Invalid cursor')
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'Invalid cursor'}), 400
+                dialect = db.engine.dialect.name
+                count, last_modified = search_therapists(
+                    filter_therapists(db.session.query(func.count(User.id), func.max(User.updated_at)), **filters),
+                    search_text, dialect
+                ).order_by(None).one()
+                etag = collection_etag(request.args, count, last_modified, etag_extra)
+                cached = not_modified(etag, last_modified)
+                if cached:
+                    return cached
+                
+                query = search_therapists(filter_therapists(db.session.query(*columns), **filters), search_text, dialect)
+                rows = query.offset(offset).limit(limit + 1).all()
+                response = jsonify({
+                    'therapists': [dict(row._mapping) for row in rows[:limit]],
+                    'next_cursor': encode_cursor([offset + limit]) if len(rows) > limit else None,
+                    'limit': limit
+                })
+                return with_validators(response, etag, last_modified), 200
+            
+            if therapist_index.enabled:
+                # Filter, sort and page in memory, then load only the missing columns
+                try:
+                    page = therapist_index.search(filters, sort=sort, cursor=cursor, limit=limit, facets=with_facets)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                etag = collection_etag(request.args, page['total'], page['last_modified'], etag_extra)
+                cached = not_modified(etag, page['last_modified'])
+                if cached:
+                    return cached
+                
+                therapists = project_records(page['records'], fields)
+                body = {
+                    'therapists': therapists,
+                    'next_cursor': encode_cursor(page['next_cursor']) if page['next_cursor'] else None,
+                    'limit': limit,
+                    'total': page['total']
+                }
+                if with_facets:
+                    body['facets'] = page['facets']
+                return with_validators(jsonify(body), etag, page['last_modified']), 200
+            
+            if sort != 'id':
+                return jsonify({'error': 'Sorting requires the therapist directory index'}), 400
+            if cursor and not valid_cursor(cursor, sort):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            
+            count, last_modified = filter_therapists(
+                db.session.query(func.count(User.id), func.max(User.updated_at)), **filters
+            ).one()
+            etag = collection_etag(request.args, count, last_modified, etag_extra)
+            cached = not_modified(etag, last_modified)
+            if cached:
+                return cached
+            
+            query = filter_therapists(db.session.query(*columns), **filters)
+            
+            # Keyset pagination on the primary key
+            if cursor:
+                query = query.filter(User.id > cursor[0])
+            rows = query.order_by(User.id).limit(limit + 1).all()
+            
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            therapists = [dict(row._mapping) for row in rows]
+            
+            response = jsonify({
+                'therapists': therapists,
+                'next_cursor': encode_cursor([rows[-1].id]) if has_more else None,
+                'limit': limit
+            })
+            return with_validators(response, etag, last_modified), 200
             
         except Exception as e:
             logger.error(f"Error fetching therapists: {str(e)}")
@@ -114,12 +284,21 @@ def init_therapist_routes(bp):
     def get_therapist(therapist_id):
         """Get therapist details"""
         try:
-            therapist = User.query.filter_by(id=therapist_id, role='therapist').first()
+            # Probe the row version first so unchanged profiles skip loading and serializing
+            state = db.session.query(User.version, User.updated_at).filter_by(
+                id=therapist_id, role='therapist'
+            ).first()
             
-            if not therapist:
+            if not state:
                 return jsonify({'error': 'Therapist not found'}), 404
-                
-            return jsonify(therapist.to_dict()), 200
+            
+            etag = version_etag(therapist_id, state.version)
+            cached = not_modified(etag, state.updated_at)
+            if cached:
+                return cached
+            
+            therapist = db.session.get(User, therapist_id)
+            return with_validators(jsonify(therapist.to_dict()), etag, therapist.updated_at), 200
             
         except Exception as e:
             logger.error(f"Error fetching therapist: {str(e)}")
@@ -130,14 +309,24 @@ def init_therapist_routes(bp):
     def therapist_profile():
         """Get or update therapist profile"""
         try:
-            current_user_email = get_jwt_identity()
-            therapist = User.query.filter_by(email=current_user_email, role='therapist').first()
+            if current_user.role != 'therapist':
+                return jsonify({'error': 'Therapist not found'}), 404
             
+            therapist = db.session.get(User, current_user.id)
             if not therapist:
                 return jsonify({'error': 'Therapist not found'}), 404
             
+            etag = version_etag(therapist.id, therapist.version)
             if request.method == 'GET':
-                return jsonify(therapist.to_dict()), 200
+                cached = not_modified(etag, therapist.updated_at)
+                if cached:
+                    return cached
+                return with_validators(jsonify(therapist.to_dict()), etag, therapist.updated_at), 200
+            
+            # Reject edits based on a stale copy of the profile
+            failed = precondition_failed(etag)
+            if failed:
+                return failed
             
             # Update profile
             data = request.get_json()
@@ -151,11 +340,16 @@ def init_therapist_routes(bp):
                     setattr(therapist, field, data[field])
             
             db.session.commit()
-            return jsonify({
+            response = jsonify({
                 'message': 'Profile updated successfully',
                 'therapist': therapist.to_dict()
-            }), 200
+            })
+            return with_validators(response, version_etag(therapist.id, therapist.version), therapist.updated_at), 200
             
+        except StaleDataError:
+            # Another request updated the row between our read and write
+            db.session.rollback()
+            return jsonify({'error': 'Resource has been modified'}), 412
         except Exception as e:
             logger.error(f"Error managing therapist profile: {str(e)}")
             db.session.rollback()
@@ -1,11 +1,127 @@
 # backend/commands.py
+import click
 from flask.cli import with_appcontext
 from backend.extensions import db
 
+@click.command('init-db')
 @with_appcontext
 def init_db():
+    """Create all database tables"""
     db.create_all()
     print("Database tables created successfully!")
 
+@click.command('reap-holds')
+@click.option('--batch-size', type=int, default=None, help='Holds deleted per statement')
+@with_appcontext
+def reap_holds(batch_size):
+    """Delete expired appointment slot holds"""
+    from backend.services.booking import reap_expired_holds
+    removed = reap_expired_holds(batch_size=batch_size)
+    print(f"Removed {removed} expired holds")
+
+@click.command('send-reminders')
+@click.option('--once', is_flag=True, help='Send the reminders due now and exit')
+@click.option('--sink', default=None, help="'log', 'file:<path>' or 'module:attribute'")
+@with_appcontext
+def send_reminders(once, sink):
+    """Run the appointment reminder worker"""
+    from backend.services.reminders import ReminderScheduler, load_sink
+    scheduler = ReminderScheduler(load_sink(sink))
+    if once:
+        print(f"Sent {scheduler.run_once()} reminders")
+    else:
+        scheduler.run()
+
+@click.command('process-stripe-events')
+@with_appcontext
+def process_stripe_events():
+    """Apply any Stripe webhook events still waiting in the inbox"""
+    from backend.services.stripe_webhooks import webhook_processor
+    print(f"Processed {webhook_processor.drain()} Stripe events")
+
+@click.command('reconcile-donations')
+@click.option('--older-than', type=int, default=None, help='Minutes a donation must have been pending')
+@click.option('--concurrency', type=int, default=None, help='Parallel Stripe list requests')
+@click.option('--page-size', type=int, default=100, help='Sessions per Stripe page')
+@click.option('--batch-size', type=int, default=None, help='Pending donations read and updated at a time')
+@with_appcontext
+def reconcile_donations(older_than, concurrency, page_size, batch_size):
+    """Update stale pending donations from their Stripe checkout sessions"""
+    from datetime import timedelta
+    from backend.services.donation_reconciliation import reconcile_pending_donations
+    summary = reconcile_pending_donations(
+        older_than=timedelta(minutes=older_than) if older_than else None,
+        concurrency=concurrency,
+        page_size=page_size,
+        batch_size=batch_size
+    )
+    failed = summary.pop('failed_slices', 0)
+    print(f"Reconciled donations: {summary or 'nothing to update'}")
+    if failed:
+        print(f"{failed} Stripe listings failed; their donations stay pending until the next run")
+
+@click.command('rebuild-donation-rollups')
+@with_appcontext
+def rebuild_donation_rollups():
+    """Recompute the donation rollups from the donations table"""
+    from backend.services.donation_rollups import rebuild_donation_rollups as rebuild
+    print(f"Wrote {rebuild()} donation rollup rows")
+
+@click.command('export-donations')
+@click.option('--output', type=click.File('w'), default='-', help='CSV file to write (default: stdout)')
+@click.option('--from', 'start', type=click.DateTime(), default=None, help='Only donations created on or after')
+@click.option('--to', 'end', type=click.DateTime(), default=None, help='Only donations created before')
+@click.option('--status', default=None, help='Only donations with this status')
+@with_appcontext
+def export_donations(output, start, end, status):
+    """Write the donations table as CSV without loading it into memory"""
+    from backend.services.donation_export import export_rows, iter_csv
+    for chunk in iter_csv(export_rows(start, end, status)):
+        output.write(chunk)
+
+@click.command('generate-receipts')
+@click.option('--year', type=int, required=True, help='Tax year to issue receipts for')
+@click.option('--output', type=click.Path(dir_okay=False), required=True, help='Zip file to write')
+@click.option('--workers', type=int, default=None, help='Rendering processes')
+@with_appcontext
+def generate_receipts(year, output, workers):
+    """Render year-end donation receipts for every donor into a zip"""
+    from backend.services.donation_export import generate_receipts as generate
+    print(f"Wrote {generate(year, output, workers=workers)} receipts to {output}")
+
+@click.command('create-admin')
+@click.option('--email', required=True, help='Account to create, or existing patient account to promote')
+@click.option('--name', default=None, help='Display name for a new account')
+@with_appcontext
+def create_admin(email, name):
+    """Create an admin account, or give an existing patient account the admin role"""
+    from backend.models import User
+    from backend.services.password_service import password_hasher
+    user = User.query.filter_by(email=email).first()
+    if user:
+        if user.role == 'therapist':
+            raise click.ClickException(f"{email} is a therapist; use a separate account for administration")
+        user.role = 'admin'
+        db.session.commit()
+        print(f"{email} is now an admin")
+        return
+    password = click.prompt('Password', hide_input=True, confirmation_prompt=True)
+    db.session.add(User(
+        name=name or email.split('@')[0],
+        email=email,
+        password_hash=password_hasher.hash_password(password),
+        role='admin'
+    ))
+    db.session.commit()
+    print(f"Created admin {email}")
+
 def register_commands(app):
-    app.cli.add_command(init_db, name="init-db")
+    app.cli.add_command(init_db)
+    app.cli.add_command(reap_holds)
+    app.cli.add_command(send_reminders)
+    app.cli.add_command(process_stripe_events)
+    app.cli.add_command(reconcile_donations)
+    app.cli.add_command(rebuild_donation_rollups)
+    app.cli.add_command(export_donations)
+    app.cli.add_command(generate_receipts)
+    app.cli.add_command(create_admin)
@@ -0,0 +1,42 @@
+"""Gunicorn settings: gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+Appointment streams (/api/v1/appointments/stream) stay open for as long as a
+page is, so the default sync worker, which serves one request at a time, would
+be pinned by a single tab. gthread workers serve each connection on a thread;
+APPOINTMENT_STREAM_MAX caps the threads streams may take in one worker and
+should stay below GUNICORN_THREADS so ordinary requests still get served.
+"""
+import os
+import multiprocessing
+
+from gunicorn.glogging import Logger
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# The gthread timeout is the worker heartbeat, not a per-request limit, so open streams are unaffected
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+errorlog = '-'
+
+# Paths whose query string carries a credential (the stream token) and is never logged
+UNLOGGED_QUERY_PATHS = ('/api/v1/appointments/stream',)
+
+
+class AccessLogger(Logger):
+    """Access log that drops the query string of UNLOGGED_QUERY_PATHS"""
+
+    def atoms(self, resp, req, environ, request_time):
+        atoms = super().atoms(resp, req, environ, request_time)
+        if environ.get('PATH_INFO') in UNLOGGED_QUERY_PATHS:
+            atoms['q'] = ''
+            atoms['r'] = f"{environ['REQUEST_METHOD']} {environ['PATH_INFO']} {environ['SERVER_PROTOCOL']}"
+        return atoms
+
+
+logger_class = AccessLogger
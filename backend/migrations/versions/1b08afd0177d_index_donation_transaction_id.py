@@ -0,0 +1,29 @@
+"""Add unique index on donations.transaction_id and donation timestamps
+
+Revision ID: 1b08afd0177d
+Revises: 25eb902d766f
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b08afd0177d'
+down_revision = '25eb902d766f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        # Fails if duplicate session ids already exist; those rows need manual cleanup first
+        batch_op.create_index('ix_donations_transaction_id', ['transaction_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('ix_donations_transaction_id')
+        batch_op.drop_column('created_at')
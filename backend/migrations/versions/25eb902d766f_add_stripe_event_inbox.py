@@ -0,0 +1,40 @@
+"""Add Stripe webhook event inbox
+
+Revision ID: 25eb902d766f
+Revises: 3ee257f7760d
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '25eb902d766f'
+down_revision = '3ee257f7760d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stripe_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(length=255), nullable=False),
+        sa.Column('type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id')
+    )
+    op.create_index(
+        'ix_stripe_events_processed_at_received_at', 'stripe_events', ['processed_at', 'received_at']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_stripe_events_processed_at_received_at', table_name='stripe_events')
+    op.drop_table('stripe_events')
@@ -0,0 +1,26 @@
+"""Add composite participant/date indexes to appointments
+
+Revision ID: 2987a3fa1aff
+Revises: b41e9c07d2a5
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2987a3fa1aff'
+down_revision = 'b41e9c07d2a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appointments_therapist_id_date', 'appointments', ['therapist_id', 'date'])
+    op.create_index('ix_appointments_patient_id_date', 'appointments', ['patient_id', 'date'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_patient_id_date', table_name='appointments')
+    op.drop_index('ix_appointments_therapist_id_date', table_name='appointments')
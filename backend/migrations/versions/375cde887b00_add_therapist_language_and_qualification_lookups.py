@@ -0,0 +1,83 @@
+"""Add therapist language and qualification lookup tables
+
+Revision ID: 375cde887b00
+Revises: 8ac1330fabcf
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '375cde887b00'
+down_revision = '8ac1330fabcf'
+branch_labels = None
+depends_on = None
+
+
+LOOKUP_TABLES = (
+    ('therapist_languages', 'languages'),
+    ('therapist_qualifications', 'qualifications'),
+)
+
+
+def _normalized(values):
+    seen = set()
+    for value in values or []:
+        if not isinstance(value, str) or not value.strip():
+            continue
+        name = value.strip()[:100]
+        key = name.lower()
+        if key not in seen:
+            seen.add(key)
+            yield name, key
+
+
+def upgrade():
+    for table_name, _ in LOOKUP_TABLES:
+        op.create_table(
+            table_name,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('name_key', sa.String(length=100), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'name_key', name=f'uq_{table_name}_user_name')
+        )
+        op.create_index(f'ix_{table_name}_name_key_user_id', table_name, ['name_key', 'user_id'])
+
+    # Backfill the lookups from the existing JSON columns
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('role', sa.String),
+        sa.column('languages', sa.JSON),
+        sa.column('qualifications', sa.JSON)
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(users.c.id, users.c.languages, users.c.qualifications).where(users.c.role == 'therapist')
+    ).fetchall()
+
+    for table_name, column in LOOKUP_TABLES:
+        lookup = sa.table(
+            table_name,
+            sa.column('user_id', sa.Integer),
+            sa.column('name', sa.String),
+            sa.column('name_key', sa.String)
+        )
+        entries = [
+            {'user_id': row.id, 'name': name, 'name_key': key}
+            for row in rows
+            for name, key in _normalized(getattr(row, column))
+        ]
+        if entries:
+            op.bulk_insert(lookup, entries)
+
+
+def downgrade():
+    for table_name, _ in reversed(LOOKUP_TABLES):
+        op.drop_index(f'ix_{table_name}_name_key_user_id', table_name=table_name)
+        op.drop_table(table_name)
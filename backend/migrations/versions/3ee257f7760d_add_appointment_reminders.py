@@ -0,0 +1,35 @@
+"""Add appointment reminders and the upcoming-window index
+
+Revision ID: 3ee257f7760d
+Revises: e012381020eb
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3ee257f7760d'
+down_revision = 'e012381020eb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'appointment_reminders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('appointment_id', 'kind', name='uq_appointment_reminders_appointment_kind')
+    )
+    op.create_index('ix_appointments_status_date', 'appointments', ['status', 'date'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_status_date', table_name='appointments')
+    op.drop_table('appointment_reminders')
@@ -0,0 +1,35 @@
+"""Add donation rollups per period and status
+
+Revision ID: 5875f58e4c16
+Revises: 7644f4170c04
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5875f58e4c16'
+down_revision = '7644f4170c04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'donation_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total_minor', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period', 'period_start', 'status', name='uq_donation_rollups_period_status')
+    )
+    # Existing donations are backfilled with `flask rebuild-donation-rollups`
+
+
+def downgrade():
+    op.drop_table('donation_rollups')
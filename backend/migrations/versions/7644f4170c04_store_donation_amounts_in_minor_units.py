@@ -0,0 +1,34 @@
+"""Store donation amounts in integer minor units and index donations by user and status
+
+Revision ID: 7644f4170c04
+Revises: 1b08afd0177d
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7644f4170c04'
+down_revision = '1b08afd0177d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('donations', sa.Column('amount_minor', sa.Integer(), nullable=True))
+    op.execute('UPDATE donations SET amount_minor = CAST(ROUND(amount * 100) AS INTEGER)')
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.alter_column('amount_minor', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('amount')
+        batch_op.create_index('ix_donations_user_id_status', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.add_column('donations', sa.Column('amount', sa.Float(), nullable=True))
+    op.execute('UPDATE donations SET amount = amount_minor / 100.0')
+    with op.batch_alter_table('donations', schema=None) as batch_op:
+        batch_op.drop_index('ix_donations_user_id_status')
+        batch_op.alter_column('amount', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('amount_minor')
@@ -0,0 +1,41 @@
+"""Add appointment slot holds
+
+Revision ID: a68919e15d23
+Revises: c18996db1c7d
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a68919e15d23'
+down_revision = 'c18996db1c7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'appointment_holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.Column('ends_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['therapist_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['patient_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_appointment_holds_therapist_id_date', 'appointment_holds', ['therapist_id', 'date'])
+    op.create_index('ix_appointment_holds_expires_at', 'appointment_holds', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_appointment_holds_expires_at', table_name='appointment_holds')
+    op.drop_index('ix_appointment_holds_therapist_id_date', table_name='appointment_holds')
+    op.drop_table('appointment_holds')
@@ -0,0 +1,87 @@
+"""Add structured therapist availability and appointment end times
+
+Revision ID: b41e9c07d2a5
+Revises: f6304a879f60
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+from backend.models.therapist_availability import parse_availability
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41e9c07d2a5'
+down_revision = 'f6304a879f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    availability = op.create_table(
+        'therapist_availability',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.SmallInteger(), nullable=False),
+        sa.Column('start_minute', sa.SmallInteger(), nullable=False),
+        sa.Column('end_minute', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['therapist_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_therapist_availability_therapist_id', 'therapist_availability', ['therapist_id'])
+    op.create_index(
+        'ix_therapist_availability_slot', 'therapist_availability',
+        ['weekday', 'start_minute', 'end_minute', 'therapist_id']
+    )
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ends_at', sa.DateTime(), nullable=True))
+
+    connection = op.get_bind()
+
+    # Backfill weekly slots from the existing JSON column
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('role', sa.String),
+        sa.column('availability', sa.JSON)
+    )
+    rows = connection.execute(
+        sa.select(users.c.id, users.c.availability).where(users.c.role == 'therapist')
+    ).fetchall()
+    slots = [
+        {'therapist_id': row.id, 'weekday': weekday, 'start_minute': start, 'end_minute': end}
+        for row in rows
+        for weekday, start, end in parse_availability(row.availability)
+    ]
+    if slots:
+        op.bulk_insert(availability, slots)
+
+    # Backfill end times; date arithmetic differs per dialect so do it here
+    appointments = sa.table(
+        'appointments',
+        sa.column('id', sa.Integer),
+        sa.column('date', sa.DateTime),
+        sa.column('duration', sa.Integer),
+        sa.column('ends_at', sa.DateTime)
+    )
+    rows = connection.execute(
+        sa.select(appointments.c.id, appointments.c.date, appointments.c.duration)
+    ).fetchall()
+    for row in rows:
+        connection.execute(
+            appointments.update()
+            .where(appointments.c.id == row.id)
+            .values(ends_at=row.date + timedelta(minutes=row.duration))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_column('ends_at')
+
+    op.drop_index('ix_therapist_availability_slot', table_name='therapist_availability')
+    op.drop_index('ix_therapist_availability_therapist_id', table_name='therapist_availability')
+    op.drop_table('therapist_availability')
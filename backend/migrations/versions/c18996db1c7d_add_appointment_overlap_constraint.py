@@ -0,0 +1,60 @@
+"""Prevent overlapping active appointments per therapist on PostgreSQL
+
+Revision ID: c18996db1c7d
+Revises: 2987a3fa1aff
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c18996db1c7d'
+down_revision = '2987a3fa1aff'
+branch_labels = None
+depends_on = None
+
+
+# Active appointment pairs the constraint would reject; they must be resolved before it can be added
+OVERLAPPING_APPOINTMENTS = sa.text("""
+    SELECT a.therapist_id, a.id, a.date, b.id, b.date
+    FROM appointments a
+    JOIN appointments b ON b.therapist_id = a.therapist_id AND b.id > a.id
+        AND tsrange(a.date, a.ends_at) && tsrange(b.date, b.ends_at)
+    WHERE a.status IN ('pending', 'accepted') AND b.status IN ('pending', 'accepted')
+    ORDER BY a.therapist_id, a.date, b.date
+    LIMIT 100
+""")
+
+POSTGRESQL_UPGRADE = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE appointments ADD CONSTRAINT ex_appointments_therapist_overlap
+    EXCLUDE USING gist (therapist_id WITH =, tsrange(date, ends_at) WITH &&)
+    WHERE (status IN ('pending', 'accepted'))
+    """,
+)
+
+
+def upgrade():
+    # SQLite has no exclusion constraints; bookings are serialized in the application instead
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        overlaps = bind.execute(OVERLAPPING_APPOINTMENTS).fetchall()
+        if overlaps:
+            pairs = '\n'.join(
+                f'  therapist {therapist_id}: appointment {first_id} ({first_date}) overlaps {second_id} ({second_date})'
+                for therapist_id, first_id, first_date, second_id, second_date in overlaps
+            )
+            raise RuntimeError(
+                'Cannot add ex_appointments_therapist_overlap; decline or cancel one appointment of each '
+                f'overlapping pair and run the upgrade again (at most 100 pairs listed):\n{pairs}'
+            )
+        for statement in POSTGRESQL_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE appointments DROP CONSTRAINT IF EXISTS ex_appointments_therapist_overlap")
@@ -0,0 +1,28 @@
+"""Add series_id to appointments for recurring bookings
+
+Revision ID: c76578e5d69c
+Revises: a68919e15d23
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c76578e5d69c'
+down_revision = 'a68919e15d23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('series_id', sa.String(length=32), nullable=True))
+        batch_op.create_index('ix_appointments_series_id', ['series_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_series_id')
+        batch_op.drop_column('series_id')
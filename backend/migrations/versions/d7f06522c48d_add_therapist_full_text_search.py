@@ -0,0 +1,90 @@
+"""Add therapist full-text search index
+
+Revision ID: d7f06522c48d
+Revises: 375cde887b00
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f06522c48d'
+down_revision = '375cde887b00'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = (
+    """
+    CREATE VIRTUAL TABLE therapist_search USING fts5(
+        name, specialization, bio,
+        content='users', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER therapist_search_ai AFTER INSERT ON users
+    WHEN new.role = 'therapist' BEGIN
+        INSERT INTO therapist_search(rowid, name, specialization, bio)
+        VALUES (new.id, new.name, new.specialization, new.bio);
+    END
+    """,
+    """
+    CREATE TRIGGER therapist_search_ad AFTER DELETE ON users
+    WHEN old.role = 'therapist' BEGIN
+        INSERT INTO therapist_search(therapist_search, rowid, name, specialization, bio)
+        VALUES ('delete', old.id, old.name, old.specialization, old.bio);
+    END
+    """,
+    """
+    CREATE TRIGGER therapist_search_au AFTER UPDATE OF name, specialization, bio, role ON users
+    BEGIN
+        INSERT INTO therapist_search(therapist_search, rowid, name, specialization, bio)
+        SELECT 'delete', old.id, old.name, old.specialization, old.bio WHERE old.role = 'therapist';
+        INSERT INTO therapist_search(rowid, name, specialization, bio)
+        SELECT new.id, new.name, new.specialization, new.bio WHERE new.role = 'therapist';
+    END
+    """,
+    # Backfill existing therapists
+    """
+    INSERT INTO therapist_search(rowid, name, specialization, bio)
+    SELECT id, name, specialization, bio FROM users WHERE role = 'therapist'
+    """,
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS therapist_search_au",
+    "DROP TRIGGER IF EXISTS therapist_search_ad",
+    "DROP TRIGGER IF EXISTS therapist_search_ai",
+    "DROP TABLE IF EXISTS therapist_search",
+)
+
+# The generated column is computed for existing rows when it is added
+POSTGRESQL_UPGRADE = (
+    """
+    ALTER TABLE users ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(specialization, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(bio, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX ix_users_search_vector ON users USING gin (search_vector)",
+)
+
+POSTGRESQL_DOWNGRADE = (
+    "DROP INDEX IF EXISTS ix_users_search_vector",
+    "ALTER TABLE users DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def _run(statements_by_dialect):
+    for statement in statements_by_dialect.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def upgrade():
+    _run({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRESQL_UPGRADE})
+
+
+def downgrade():
+    _run({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRESQL_DOWNGRADE})
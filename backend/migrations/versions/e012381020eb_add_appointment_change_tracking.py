@@ -0,0 +1,49 @@
+"""Add change tracking to appointments for incremental sync
+
+Revision ID: e012381020eb
+Revises: c76578e5d69c
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e012381020eb'
+down_revision = 'c76578e5d69c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    change_sequences = op.create_table(
+        'change_sequences',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    # Existing rows are numbered in id order and the counter continues from there
+    op.execute("UPDATE appointments SET change_seq = id, updated_at = created_at")
+    connection = op.get_bind()
+    last = connection.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM appointments")).scalar()
+    op.bulk_insert(change_sequences, [{'name': 'appointments', 'value': last}])
+
+    op.create_index('ix_appointments_therapist_id_change_seq', 'appointments', ['therapist_id', 'change_seq'])
+    op.create_index('ix_appointments_patient_id_change_seq', 'appointments', ['patient_id', 'change_seq'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_patient_id_change_seq', table_name='appointments')
+    op.drop_index('ix_appointments_therapist_id_change_seq', table_name='appointments')
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_column('change_seq')
+        batch_op.drop_column('updated_at')
+
+    op.drop_table('change_sequences')
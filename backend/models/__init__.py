@@ -7,6 +7,14 @@ from backend.models.donation import Donation
 from backend.models.testimonial import Testimonial
 from backend.models.success_story import SuccessStory
 from backend.models.appointment import Appointment
+from backend.models.therapist_language import TherapistLanguage
+from backend.models.therapist_qualification import TherapistQualification
+from backend.models.therapist_availability import TherapistAvailability
+from backend.models.slot_hold import SlotHold
+from backend.models.change_sequence import ChangeSequence
+from backend.models.appointment_reminder import AppointmentReminder
+from backend.models.stripe_event import StripeEvent
+from backend.models.donation_rollup import DonationRollup
 
 # Make models available at package level
 __all__ = [
@@ -14,5 +22,13 @@ __all__ = [
     "Donation",
     "Testimonial",
     "SuccessStory",
-    "Appointment"
+    "Appointment",
+    "TherapistLanguage",
+    "TherapistQualification",
+    "TherapistAvailability",
+    "SlotHold",
+    "ChangeSequence",
+    "AppointmentReminder",
+    "StripeEvent",
+    "DonationRollup"
 ] 
\ No newline at end of file
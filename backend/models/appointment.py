@@ -1,9 +1,30 @@
 """Appointment model"""
 from backend.extensions import db
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy.orm import object_session
+from backend.models.change_sequence import allocate_sequence
+
+# Statuses that occupy a slot in the therapist's calendar
+ACTIVE_STATUSES = ('pending', 'accepted')
+
+# Statuses synced to clients as tombstones rather than live rows
+TOMBSTONE_STATUSES = ('declined', 'cancelled')
+
+# Counter in change_sequences that orders appointment writes for sync
+CHANGE_SEQUENCE = 'appointments'
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Calendar listings filter by participant and date range
+        db.Index('ix_appointments_therapist_id_date', 'therapist_id', 'date'),
+        db.Index('ix_appointments_patient_id_date', 'patient_id', 'date'),
+        # Incremental sync scans each participant's changes in sequence order
+        db.Index('ix_appointments_therapist_id_change_seq', 'therapist_id', 'change_seq'),
+        db.Index('ix_appointments_patient_id_change_seq', 'patient_id', 'change_seq'),
+        # The reminder worker scans accepted sessions in an upcoming time window
+        db.Index('ix_appointments_status_date', 'status', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     therapist_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -11,8 +32,12 @@ class Appointment(db.Model):
     date = db.Column(db.DateTime, nullable=False)
     duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
     status = db.Column(db.String(20), default='pending')  # pending, accepted, declined, completed, cancelled
+    ends_at = db.Column(db.DateTime)  # date + duration, stored for overlap queries
     notes = db.Column(db.Text)
+    series_id = db.Column(db.String(32), index=True)  # Shared by the occurrences of a recurring booking
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger)  # Bumped on every write; see allocate_sequence
     
     # Relationships
     therapist = db.relationship('User', foreign_keys=[therapist_id], backref='appointments_as_therapist')
@@ -30,10 +55,40 @@ class Appointment(db.Model):
             'duration': self.duration,
             'status': self.status,
             'notes': self.notes,
+            'series_id': self.series_id,
             'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'change_seq': self.change_seq,
             'patient': {
                 'id': self.patient.id,
                 'name': self.patient.name,
                 'email': self.patient.email
+            },
+            'therapist': {
+                'id': self.therapist.id,
+                'name': self.therapist.name
             }
-        } 
\ No newline at end of file
+        } 
+
+
+def appointment_end(start, duration):
+    """End time of a session starting at start and lasting duration minutes"""
+    return start + timedelta(minutes=int(duration))
+
+
+@db.event.listens_for(Appointment, 'before_insert')
+@db.event.listens_for(Appointment, 'before_update')
+def _set_ends_at(mapper, connection, target):
+    """Keep ends_at consistent with date and duration"""
+    if target.date is not None and target.duration is not None:
+        target.ends_at = appointment_end(target.date, target.duration)
+
+
+@db.event.listens_for(Appointment, 'before_insert')
+@db.event.listens_for(Appointment, 'before_update')
+def _bump_change_seq(mapper, connection, target):
+    """Give every written row the next value of the appointment change sequence"""
+    session = object_session(target)
+    if session is not None and not session.is_modified(target, include_collections=False):
+        return
+    target.change_seq = allocate_sequence(connection, CHANGE_SEQUENCE)
@@ -0,0 +1,18 @@
+"""Sent appointment reminder model"""
+from backend.extensions import db
+from datetime import datetime
+
+class AppointmentReminder(db.Model):
+    __tablename__ = 'appointment_reminders'
+    __table_args__ = (
+        # One reminder of each kind per appointment, however many workers race to send it
+        db.UniqueConstraint('appointment_id', 'kind', name='uq_appointment_reminders_appointment_kind'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # e.g. '60m' for a reminder an hour ahead
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AppointmentReminder {self.appointment_id}: {self.kind}>'
@@ -0,0 +1,33 @@
+"""Monotonic change counters used by incremental sync"""
+from backend.extensions import db
+
+class ChangeSequence(db.Model):
+    __tablename__ = 'change_sequences'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ChangeSequence {self.name}: {self.value}>'
+
+
+def allocate_sequence(connection, name, count=1):
+    """Reserve count consecutive values and return the last one
+
+    The UPDATE row-locks the counter until the surrounding transaction ends, so
+    values become visible to readers in the order they were handed out. That
+    ordering is what lets sync clients resume from a plain "change_seq > cursor"
+    without missing rows, and it is also a bottleneck: every appointment write
+    (booking, status change, cancellation) queues on this one row until the
+    writer commits. Allocate as late in the transaction as possible. A database
+    sequence would remove the lock, but values could then commit out of order
+    and readers would need a visibility horizon before trusting the cursor.
+    """
+    table = ChangeSequence.__table__
+    result = connection.execute(
+        table.update().where(table.c.name == name).values(value=table.c.value + count)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, value=count))
+        return count
+    return connection.execute(db.select(table.c.value).where(table.c.name == name)).scalar_one()
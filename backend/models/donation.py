@@ -1,17 +1,45 @@
 """Donation model"""
 from backend.extensions import db
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy.ext.hybrid import hybrid_property
+
+
+def to_minor_units(amount):
+    """Convert a currency amount to integer minor units (cents), rounding half up"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
 
 class Donation(db.Model):
     __tablename__ = 'donations'
+    __table_args__ = (
+        # Serves per-donor summaries and listings filtered to a status
+        db.Index('ix_donations_user_id_status', 'user_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    # active_history loads the values a write replaces; the rollup hooks in donation_rollup need them
+    amount_minor = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # Cents
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    status = db.Column(db.String(20), default='pending')
-    transaction_id = db.Column(db.String(100))
+    status = db.column_property(db.Column(db.String(20), default='pending'), active_history=True)
+    transaction_id = db.Column(db.String(100), unique=True, index=True)  # Stripe checkout session id
+    created_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     
     # Relationships
     user = db.relationship('User', backref='donations')
+
+    @hybrid_property
+    def amount(self):
+        """Amount in major units (dollars)"""
+        return self.amount_minor / 100 if self.amount_minor is not None else None
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_minor = to_minor_units(value)
+
+    @amount.expression
+    def amount(cls):
+        return cls.amount_minor / 100.0
     
     def __repr__(self):
-        return f'<Donation {self.id}: {self.amount}>' 
\ No newline at end of file
+        return f'<Donation {self.id}: {self.amount}>' 
@@ -0,0 +1,110 @@
+"""Donation totals per period and status, maintained alongside every donation write"""
+from datetime import date
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.extensions import db
+from backend.models.donation import Donation
+
+# period_start of the single all-time row per status
+ALL_TIME = date(1970, 1, 1)
+
+PERIODS = ('day', 'month', 'all')
+
+
+class DonationRollup(db.Model):
+    __tablename__ = 'donation_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', 'status', name='uq_donation_rollups_period_status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # day, month or all
+    period_start = db.Column(db.Date, nullable=False)  # First day of the period; ALL_TIME for all
+    status = db.Column(db.String(20), nullable=False)
+    total_minor = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DonationRollup {self.period} {self.period_start} {self.status}: {self.total_minor}>'
+
+
+def period_starts(created_at):
+    """The (period, period_start) buckets a donation created at created_at counts towards"""
+    if created_at is None:
+        # Legacy rows without a timestamp only count towards the all-time totals
+        return [('all', ALL_TIME)]
+    day = created_at.date()
+    return [('day', day), ('month', day.replace(day=1)), ('all', ALL_TIME)]
+
+
+def add_rollup_delta(deltas, created_at, status, amount_minor, sign):
+    """Accumulate +/- one donation into deltas keyed by (period, period_start, status)"""
+    if status is None or amount_minor is None:
+        return
+    for period, start in period_starts(created_at):
+        total, count = deltas.get((period, start, status), (0, 0))
+        deltas[(period, start, status)] = (total + sign * amount_minor, count + sign)
+
+
+def apply_rollup_deltas(connection, deltas):
+    """Add deltas to the rollup rows inside the caller's transaction
+
+    Keys are written in a fixed order so concurrent writers lock rows in the same order.
+    """
+    table = DonationRollup.__table__
+    dialect = connection.dialect.name
+    for (period, start, status), (total, count) in sorted(deltas.items()):
+        if total == 0 and count == 0:
+            continue
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+            connection.execute(
+                insert.values(period=period, period_start=start, status=status, total_minor=total, count=count)
+                .on_conflict_do_update(
+                    index_elements=['period', 'period_start', 'status'],
+                    set_={'total_minor': table.c.total_minor + total, 'count': table.c.count + count}
+                )
+            )
+            continue
+        result = connection.execute(
+            table.update()
+            .where(table.c.period == period, table.c.period_start == start, table.c.status == status)
+            .values(total_minor=table.c.total_minor + total, count=table.c.count + count)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                period=period, period_start=start, status=status, total_minor=total, count=count
+            ))
+
+
+def _previous(target, attribute):
+    history = inspect(target).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+@db.event.listens_for(Donation, 'after_insert')
+def _count_new_donation(mapper, connection, target):
+    deltas = {}
+    add_rollup_delta(deltas, target.created_at, target.status, target.amount_minor, 1)
+    apply_rollup_deltas(connection, deltas)
+
+
+@db.event.listens_for(Donation, 'after_update')
+def _move_updated_donation(mapper, connection, target):
+    """Move a donation between buckets when its status, amount or date changes"""
+    deltas = {}
+    add_rollup_delta(
+        deltas, _previous(target, 'created_at'), _previous(target, 'status'), _previous(target, 'amount_minor'), -1
+    )
+    add_rollup_delta(deltas, target.created_at, target.status, target.amount_minor, 1)
+    apply_rollup_deltas(connection, deltas)
+
+
+@db.event.listens_for(Donation, 'after_delete')
+def _uncount_deleted_donation(mapper, connection, target):
+    deltas = {}
+    add_rollup_delta(
+        deltas, _previous(target, 'created_at'), _previous(target, 'status'), _previous(target, 'amount_minor'), -1
+    )
+    apply_rollup_deltas(connection, deltas)
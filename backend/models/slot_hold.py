@@ -0,0 +1,32 @@
+"""Short-lived appointment slot hold model"""
+from backend.extensions import db
+from datetime import datetime
+
+class SlotHold(db.Model):
+    __tablename__ = 'appointment_holds'
+    __table_args__ = (
+        db.Index('ix_appointment_holds_therapist_id_date', 'therapist_id', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    therapist_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
+    ends_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SlotHold {self.id}: {self.therapist_id} {self.date} until {self.expires_at}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'therapist_id': self.therapist_id,
+            'patient_id': self.patient_id,
+            'date': self.date.isoformat(),
+            'duration': self.duration,
+            'expires_at': self.expires_at.isoformat(),
+            'created_at': self.created_at.isoformat()
+        }
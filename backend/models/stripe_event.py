@@ -0,0 +1,22 @@
+"""Stripe webhook inbox model"""
+from backend.extensions import db
+from datetime import datetime
+
+class StripeEvent(db.Model):
+    __tablename__ = 'stripe_events'
+    __table_args__ = (
+        # The worker drains unprocessed events oldest first
+        db.Index('ix_stripe_events_processed_at_received_at', 'processed_at', 'received_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(255), unique=True, nullable=False)  # Stripe's evt_... id, for dedup
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # Raw JSON body as received
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<StripeEvent {self.event_id}: {self.type}>'
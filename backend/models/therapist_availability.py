@@ -0,0 +1,93 @@
+"""Therapist weekly availability model"""
+import re
+from backend.extensions import db
+from backend.models.user import User
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MINUTES_PER_DAY = 24 * 60
+
+class TherapistAvailability(db.Model):
+    __tablename__ = 'therapist_availability'
+    __table_args__ = (
+        db.Index('ix_therapist_availability_slot', 'weekday', 'start_minute', 'end_minute', 'therapist_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    therapist_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    weekday = db.Column(db.SmallInteger, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_minute = db.Column(db.SmallInteger, nullable=False)  # Minutes after midnight
+    end_minute = db.Column(db.SmallInteger, nullable=False)  # Exclusive, up to 1440
+    
+    def __repr__(self):
+        return f'<TherapistAvailability {self.therapist_id}: {self.weekday} {self.start_minute}-{self.end_minute}>'
+
+
+def _parse_weekday(value):
+    if isinstance(value, int) and 0 <= value < 7:
+        return value
+    if isinstance(value, str):
+        key = value.strip().lower()
+        if key.isdigit() and int(key) < 7:
+            return int(key)
+        for index, name in enumerate(WEEKDAYS):
+            if len(key) >= 3 and name.startswith(key):
+                return index
+    return None
+
+
+def _parse_minute(value):
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})', value.strip()) if isinstance(value, str) else None
+    if not match:
+        return None
+    minute = int(match.group(1)) * 60 + int(match.group(2))
+    return minute if 0 <= minute <= MINUTES_PER_DAY else None
+
+
+def _parse_interval(value):
+    if isinstance(value, dict):
+        start, end = value.get('start'), value.get('end')
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        start, end = value
+    else:
+        return None
+    start, end = _parse_minute(start), _parse_minute(end)
+    if start is None or end is None or start >= end:
+        return None
+    return start, end
+
+
+def parse_availability(value):
+    """Normalize availability JSON into sorted (weekday, start_minute, end_minute) tuples
+
+    Accepts {"monday": [{"start": "09:00", "end": "17:00"}]} style mappings or
+    [{"day": "monday", "start": "09:00", "end": "17:00"}] style lists; anything
+    unrecognised is ignored.
+    """
+    entries = []
+    if isinstance(value, dict):
+        for day, intervals in value.items():
+            # A single interval may be given instead of a list of them
+            if not isinstance(intervals, list) or all(isinstance(v, str) for v in intervals):
+                intervals = [intervals]
+            entries.extend((day, interval) for interval in intervals)
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                entries.append((item.get('day', item.get('weekday')), item))
+
+    slots = set()
+    for day, interval in entries:
+        weekday = _parse_weekday(day)
+        bounds = _parse_interval(interval)
+        if weekday is not None and bounds:
+            slots.add((weekday,) + bounds)
+    return sorted(slots)
+
+
+@db.event.listens_for(User.availability, 'set')
+def _sync_availability(target, value, oldvalue, initiator):
+    """Keep the weekly availability rows in step with the JSON column"""
+    target.availability_slots = [
+        TherapistAvailability(weekday=weekday, start_minute=start, end_minute=end)
+        for weekday, start, end in parse_availability(value)
+    ]
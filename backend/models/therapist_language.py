@@ -0,0 +1,54 @@
+"""Therapist language lookup model"""
+from backend.extensions import db
+from backend.models.user import User
+
+class TherapistLanguage(db.Model):
+    __tablename__ = 'therapist_languages'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name_key', name='uq_therapist_languages_user_name'),
+        db.Index('ix_therapist_languages_name_key_user_id', 'name_key', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    name_key = db.Column(db.String(100), nullable=False)  # Lower-cased name used for lookups
+    
+    def __repr__(self):
+        return f'<TherapistLanguage {self.user_id}: {self.name}>'
+
+
+def normalized_entries(values):
+    """Yield (name, key) pairs for a JSON list, skipping blanks and duplicates"""
+    seen = set()
+    for value in values or []:
+        if not isinstance(value, str) or not value.strip():
+            continue
+        name = value.strip()[:100]
+        key = name.lower()
+        if key not in seen:
+            seen.add(key)
+            yield name, key
+
+
+def reconcile_entries(entries, values, factory):
+    """Update a lookup collection in place to match a JSON list
+
+    Rows whose key is still present are kept (their display name refreshed), so
+    re-saving an unchanged list writes nothing and never inserts a key that the
+    same flush has yet to delete.
+    """
+    wanted = dict((key, name) for name, key in normalized_entries(values))
+    for entry in list(entries):
+        if entry.name_key in wanted:
+            entry.name = wanted.pop(entry.name_key)
+        else:
+            entries.remove(entry)
+    for key, name in wanted.items():
+        entries.append(factory(name=name, name_key=key))
+
+
+@db.event.listens_for(User.languages, 'set')
+def _sync_languages(target, value, oldvalue, initiator):
+    """Keep the language lookup rows in step with the JSON column"""
+    reconcile_entries(target.language_entries, value, TherapistLanguage)
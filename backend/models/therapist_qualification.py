@@ -0,0 +1,25 @@
+"""Therapist qualification lookup model"""
+from backend.extensions import db
+from backend.models.user import User
+from backend.models.therapist_language import reconcile_entries
+
+class TherapistQualification(db.Model):
+    __tablename__ = 'therapist_qualifications'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name_key', name='uq_therapist_qualifications_user_name'),
+        db.Index('ix_therapist_qualifications_name_key_user_id', 'name_key', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    name_key = db.Column(db.String(100), nullable=False)  # Lower-cased name used for lookups
+    
+    def __repr__(self):
+        return f'<TherapistQualification {self.user_id}: {self.name}>'
+
+
+@db.event.listens_for(User.qualifications, 'set')
+def _sync_qualifications(target, value, oldvalue, initiator):
+    """Keep the qualification lookup rows in step with the JSON column"""
+    reconcile_entries(target.qualification_entries, value, TherapistQualification)
@@ -1,4 +1,5 @@
 """User model"""
+from datetime import datetime
 from backend.extensions import db
 from flask_login import UserMixin
 
@@ -9,7 +10,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), nullable=False, default='patient')  # 'patient' or 'therapist'
+    role = db.Column(db.String(20), nullable=False, default='patient')  # 'patient', 'therapist' or 'admin' (flask create-admin)
     
     # Therapist specific fields
     specialization = db.Column(db.String(100))
@@ -22,6 +23,17 @@ class User(UserMixin, db.Model):
     languages = db.Column(db.JSON)  # Store languages as JSON array
     is_verified = db.Column(db.Boolean, default=False)  # Verification status
     
+    # Row version (bumped on every update) and modification time, used for ETags
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Normalized lookups kept in sync with the languages/qualifications JSON columns
+    language_entries = db.relationship('TherapistLanguage', cascade='all, delete-orphan', lazy='select')
+    qualification_entries = db.relationship('TherapistQualification', cascade='all, delete-orphan', lazy='select')
+    availability_slots = db.relationship('TherapistAvailability', cascade='all, delete-orphan', lazy='select')
+    
+    __mapper_args__ = {'version_id_col': version}
+    
     def __repr__(self):
         return f'<User {self.email}>'
     
@@ -1,4 +1,5 @@
 """Services package"""
 from .stripe_service import StripePaymentService
+from .password_service import PasswordHashingService, HashingQueueFull, password_hasher
 
-__all__ = ['StripePaymentService'] 
\ No newline at end of file
+__all__ = ['StripePaymentService', 'PasswordHashingService', 'HashingQueueFull', 'password_hasher'] 
\ No newline at end of file
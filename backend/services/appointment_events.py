@@ -0,0 +1,246 @@
+"""Appointment change notifications for server-sent event streams"""
+import os
+import glob
+import json
+import queue
+import stat
+import socket
+import logging
+import tempfile
+import threading
+from dotenv import load_dotenv
+from blinker import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.models import Appointment
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fired once per committed appointment change with event=<dict>
+signals = Namespace()
+appointment_changed = signals.signal('appointment-changed')
+
+# Fields pushed to clients; relationships are left out so publishing never queries
+EVENT_FIELDS = ('id', 'therapist_id', 'patient_id', 'date', 'duration', 'status', 'series_id', 'change_seq')
+
+_SESSION_KEY = 'appointment_events'
+
+
+def appointment_event(appointment):
+    """Serializable snapshot of an appointment row"""
+    data = {field: getattr(appointment, field) for field in EVENT_FIELDS}
+    data['date'] = data['date'].isoformat() if data['date'] else None
+    return data
+
+
+class EventBroker:
+    """Fans appointment events out to per-user subscriber queues in this worker"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Register a new queue receiving the user's events"""
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues:
+                queues.discard(subscription)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish_local(self, data):
+        """Deliver an event to subscribers of both participants in this worker"""
+        with self._lock:
+            targets = [
+                subscription
+                for user_id in {data.get('therapist_id'), data.get('patient_id')}
+                for subscription in self._subscribers.get(user_id, ())
+            ]
+        for subscription in targets:
+            try:
+                subscription.put_nowait(data)
+            except queue.Full:
+                # A stalled client loses events rather than holding memory; it resyncs on reconnect
+                logger.warning("Dropping appointment event for a slow subscriber")
+
+
+def private_runtime_dir(name):
+    """Default relay directory: under $XDG_RUNTIME_DIR when set, else the temp dir, suffixed with our uid"""
+    base = os.getenv('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(base, f'mindwellness-{os.getuid()}-{name}')
+
+
+def ensure_private_directory(path):
+    """Create path with mode 0700, refusing an existing one another user owns or can write to"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f'{path} must be a directory owned by uid {os.getuid()} with mode 0700')
+
+
+class DatagramRelay:
+    """Relays events between workers over Unix datagram sockets in a shared directory
+
+    Every worker with subscribers binds <directory>/<pid>.sock; publishers send
+    each event to every socket but their own. Sockets whose worker has gone are
+    removed the first time a send to them fails. Any process that can write to
+    the directory can inject events, so the relay stays off unless it is a 0700
+    directory owned by this user.
+    """
+
+    def __init__(self, directory, on_event):
+        self.directory = directory
+        self.on_event = on_event
+        self._receiver = None
+        self._sender = None
+        self._path = None
+        self._pid = None
+        self._secure = None
+        self._lock = threading.Lock()
+
+    def _check_directory(self):
+        if self._secure is None:
+            try:
+                ensure_private_directory(self.directory)
+                self._secure = True
+            except OSError as e:
+                logger.error(f"Event relay disabled, workers will only see their own events: {str(e)}")
+                self._secure = False
+        return self._secure
+
+    def _ensure_sender(self):
+        if self._sender is None or self._pid != os.getpid():
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+            self._pid = os.getpid()
+            self._receiver = None
+        return self._sender
+
+    def start(self):
+        """Bind this worker's socket and start receiving, once per process"""
+        with self._lock:
+            self._ensure_sender()
+            if self._receiver is not None or not self._check_directory():
+                return
+            self._path = os.path.join(self.directory, f'{os.getpid()}.sock')
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(self._path)
+            self._receiver = receiver
+            threading.Thread(target=self._receive, args=(receiver,), daemon=True).start()
+            logger.info(f"Appointment event relay listening on {self._path}")
+
+    def _receive(self, receiver):
+        while True:
+            try:
+                payload = receiver.recv(65536)
+                self.on_event(json.loads(payload))
+            except OSError:
+                return
+            except ValueError:
+                logger.warning("Ignoring malformed appointment event datagram")
+
+    def broadcast(self, data):
+        """Send an event to every other worker's socket"""
+        payload = json.dumps(data).encode()
+        with self._lock:
+            if not self._check_directory():
+                return
+            sender = self._ensure_sender()
+            own_path = self._path if self._receiver is not None else None
+        for path in glob.glob(os.path.join(self.directory, '*.sock')):
+            if path == own_path:
+                continue
+            try:
+                sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning(f"Appointment event relay buffer full for {path}")
+
+    def stop(self):
+        with self._lock:
+            if self._receiver is not None:
+                self._receiver.close()
+                self._receiver = None
+                try:
+                    os.unlink(self._path)
+                except OSError:
+                    pass
+
+
+# Shared per-worker broker and cross-worker relay
+broker = EventBroker(queue_size=int(os.getenv('APPOINTMENT_EVENTS_QUEUE_SIZE', 100)))
+relay = None
+if hasattr(socket, 'AF_UNIX') and os.getenv('APPOINTMENT_EVENTS_RELAY', 'true').lower() != 'false':
+    relay = DatagramRelay(
+        os.getenv('APPOINTMENT_EVENTS_DIR') or private_runtime_dir('events'),
+        broker.publish_local
+    )
+
+
+def subscribe(user_id):
+    """Subscribe to a user's appointment events, joining the relay on first use"""
+    if relay is not None:
+        relay.start()
+    return broker.subscribe(user_id)
+
+
+@appointment_changed.connect
+def _deliver(sender, event=None, **kw):
+    broker.publish_local(event)
+    if relay is not None:
+        relay.broadcast(event)
+
+
+def stage_appointment_events(session, events):
+    """Queue events for writes that bypass the unit of work (bulk INSERT/UPDATE)"""
+    session.info.setdefault(_SESSION_KEY, []).extend(events)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_appointment_changes(session, flush_context):
+    """Snapshot appointments written in this flush"""
+    changed = [
+        appointment_event(obj) for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Appointment) and session.is_modified(obj)
+    ]
+    if changed:
+        stage_appointment_events(session, changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_appointment_changes(session):
+    """Notify subscribers once the changes are durable"""
+    events = session.info.pop(_SESSION_KEY, None)
+    for data in events or ():
+        try:
+            appointment_changed.send(None, event=data)
+        except Exception as e:
+            logger.error(f"Error publishing appointment event: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_appointment_changes(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,90 @@
+"""Therapist availability queries"""
+from datetime import datetime, timedelta
+import sqlalchemy as sa
+
+from backend.models import User, Appointment, SlotHold, TherapistAvailability, db
+from backend.models.appointment import ACTIVE_STATUSES, appointment_end
+from backend.models.therapist_availability import MINUTES_PER_DAY
+
+# Granularity of candidate start times inside an available_between window
+SLOT_MINUTES = 30
+MAX_WINDOW = timedelta(days=1)
+DEFAULT_DURATION = 60
+
+
+def free_at_clause(start, duration):
+    """Therapists whose weekly hours cover [start, start + duration) and who have no booking overlapping it"""
+    minute = start.hour * 60 + start.minute
+    if minute + duration > MINUTES_PER_DAY:
+        return sa.false()
+    end = appointment_end(start, duration)
+
+    covered = User.id.in_(
+        sa.select(TherapistAvailability.therapist_id).where(
+            TherapistAvailability.weekday == start.weekday(),
+            TherapistAvailability.start_minute <= minute,
+            TherapistAvailability.end_minute >= minute + duration
+        )
+    )
+    booked = sa.exists().where(
+        Appointment.therapist_id == User.id,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        Appointment.date < end,
+        Appointment.ends_at > start
+    )
+    held = sa.exists().where(
+        SlotHold.therapist_id == User.id,
+        SlotHold.expires_at > datetime.utcnow(),
+        SlotHold.date < end,
+        SlotHold.ends_at > start
+    )
+    return sa.and_(covered, ~booked, ~held)
+
+
+def free_between_clause(start, end, duration, step=SLOT_MINUTES):
+    """Therapists with at least one free slot of duration minutes starting inside [start, end)"""
+    slots = []
+    slot = start
+    while appointment_end(slot, duration) <= end:
+        slots.append(free_at_clause(slot, duration))
+        slot += timedelta(minutes=step)
+    return sa.or_(*slots) if slots else sa.false()
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value.strip()).replace(tzinfo=None, second=0, microsecond=0)
+    except (ValueError, AttributeError) as e:
+        raise ValueError(f'Invalid datetime: {value}') from e
+
+
+def parse_availability_filter(args):
+    """Build an availability clause from ?available_at= or ?available_between=, or None"""
+    available_at = args.get('available_at')
+    available_between = args.get('available_between')
+    if not available_at and not available_between:
+        return None
+
+    try:
+        duration = int(args.get('duration', DEFAULT_DURATION))
+    except ValueError as e:
+        raise ValueError('Invalid duration') from e
+    if not 0 < duration <= MINUTES_PER_DAY:
+        raise ValueError('Invalid duration')
+
+    if available_at:
+        return free_at_clause(_parse_datetime(available_at), duration)
+
+    bounds = available_between.split(',')
+    if len(bounds) != 2:
+        raise ValueError('available_between must be "start,end"')
+    start, end = (_parse_datetime(bound) for bound in bounds)
+    if end <= start or end - start > MAX_WINDOW:
+        raise ValueError('available_between must span at most one day')
+    return free_between_clause(start, end, duration)
+
+
+def available_therapist_ids(clause):
+    """Resolve an availability clause to the set of matching therapist ids"""
+    rows = db.session.query(User.id).filter(User.role == 'therapist', clause).all()
+    return {row.id for row in rows}
@@ -0,0 +1,356 @@
+"""Conflict-free appointment booking"""
+import os
+import uuid
+import bisect
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import Appointment, SlotHold, User, db
+from backend.models.appointment import ACTIVE_STATUSES, CHANGE_SEQUENCE, appointment_end
+from backend.models.change_sequence import allocate_sequence
+from backend.services.appointment_events import appointment_event, stage_appointment_events
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How long a held slot stays reserved for the patient, and how many expired holds to delete per statement
+HOLD_MINUTES = int(os.getenv('APPOINTMENT_HOLD_MINUTES', 10))
+REAP_BATCH_SIZE = int(os.getenv('APPOINTMENT_HOLD_REAP_BATCH', 500))
+
+# Recurrence rules for appointment series
+SERIES_INTERVALS = {
+    'weekly': timedelta(weeks=1),
+    'biweekly': timedelta(weeks=2)
+}
+MAX_OCCURRENCES = 52
+
+EXCLUSION_CONSTRAINT = 'ex_appointments_therapist_overlap'
+
+# First key of the PostgreSQL advisory locks serializing a therapist's bookings; the second is the therapist id
+BOOKING_LOCK_NAMESPACE = 7101
+
+POSTGRESQL_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    ALTER TABLE appointments ADD CONSTRAINT {EXCLUSION_CONSTRAINT}
+    EXCLUDE USING gist (therapist_id WITH =, tsrange(date, ends_at) WITH &&)
+    WHERE (status IN ('pending', 'accepted'))
+    """,
+)
+
+
+class SlotUnavailable(Exception):
+    """Raised when a booking overlaps an existing session"""
+
+    def __init__(self, conflict_id=None):
+        super().__init__('Therapist is not available at that time')
+        self.conflict_id = conflict_id
+
+
+class SeriesConflict(SlotUnavailable):
+    """Raised when occurrences of a series overlap existing sessions"""
+
+    def __init__(self, conflicts):
+        super().__init__()
+        self.conflicts = conflicts
+
+
+class HoldNotFound(Exception):
+    """Raised when a hold does not exist, belongs to someone else or has expired"""
+
+    def __init__(self):
+        super().__init__('Hold not found or expired')
+
+
+def install_booking_constraints(connection):
+    """Create database-enforced overlap protection where the dialect supports it"""
+    if connection.dialect.name == 'postgresql':
+        for statement in POSTGRESQL_DDL:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Appointment.__table__, 'after_create')
+def _create_booking_constraints(target, connection, **kw):
+    install_booking_constraints(connection)
+
+
+def conflicting_appointment(therapist_id, start, end, exclude_id=None):
+    """Id of an active appointment of the therapist overlapping [start, end), or None"""
+    query = db.session.query(Appointment.id).filter(
+        Appointment.therapist_id == therapist_id,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        Appointment.date < end,
+        Appointment.ends_at > start
+    )
+    if exclude_id is not None:
+        query = query.filter(Appointment.id != exclude_id)
+    return query.limit(1).scalar()
+
+
+def conflicting_hold(therapist_id, start, end, now, exclude_id=None):
+    """Id of an unexpired hold on the therapist overlapping [start, end), or None"""
+    query = db.session.query(SlotHold.id).filter(
+        SlotHold.therapist_id == therapist_id,
+        SlotHold.expires_at > now,
+        SlotHold.date < end,
+        SlotHold.ends_at > start
+    )
+    if exclude_id is not None:
+        query = query.filter(SlotHold.id != exclude_id)
+    return query.limit(1).scalar()
+
+
+def _check_slot(therapist_id, start, end, exclude_hold_id=None):
+    """Raise SlotUnavailable if the slot is booked or held by someone else"""
+    conflict_id = conflicting_appointment(therapist_id, start, end)
+    if conflict_id:
+        raise SlotUnavailable(conflict_id)
+    if conflicting_hold(therapist_id, start, end, datetime.utcnow(), exclude_hold_id):
+        raise SlotUnavailable()
+
+
+def _serialize_bookings(session, therapist_id=None):
+    """Make the check-and-insert atomic for a therapist's calendar
+
+    SQLite takes the write lock up front so concurrent bookings queue behind
+    each other instead of both passing the overlap check. Holds have no
+    exclusion constraint, so elsewhere bookings and holds for the same
+    therapist queue on a transaction-scoped lock: an advisory lock on
+    PostgreSQL, the therapist's user row otherwise. Without a therapist_id
+    only the SQLite lock is taken.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite':
+        dbapi_connection = connection.connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+    elif therapist_id is None:
+        return
+    elif connection.dialect.name == 'postgresql':
+        connection.execute(
+            sa.text('SELECT pg_advisory_xact_lock(:namespace, :therapist_id)'),
+            {'namespace': BOOKING_LOCK_NAMESPACE, 'therapist_id': therapist_id}
+        )
+    else:
+        connection.execute(
+            sa.select(User.id).where(User.id == therapist_id).with_for_update()
+        )
+
+
+def book_appointment(therapist_id, patient_id, start, duration, notes=None):
+    """Insert and commit an appointment, raising SlotUnavailable on overlap"""
+    end = appointment_end(start, duration)
+    try:
+        _serialize_bookings(db.session, therapist_id)
+        _check_slot(therapist_id, start, end)
+
+        appointment = Appointment(
+            therapist_id=therapist_id,
+            patient_id=patient_id,
+            date=start,
+            duration=duration,
+            notes=notes
+        )
+        db.session.add(appointment)
+        db.session.commit()
+        return appointment
+    except SlotUnavailable:
+        db.session.rollback()
+        raise
+    except IntegrityError as e:
+        db.session.rollback()
+        # Lost the race on PostgreSQL: the exclusion constraint rejected the insert
+        if EXCLUSION_CONSTRAINT in str(e.orig):
+            logger.info(f"Overlapping booking for therapist {therapist_id} rejected by constraint")
+            raise SlotUnavailable() from e
+        raise
+
+
+def series_occurrences(start, frequency, count, duration=None):
+    """Start times of a recurring series, raising ValueError for unsupported rules
+
+    Occurrences must end before the next one starts: the overlap check only
+    compares them with rows already stored, not with each other.
+    """
+    if frequency not in SERIES_INTERVALS:
+        raise ValueError(f'Invalid frequency: {frequency}')
+    if duration is not None and timedelta(minutes=duration) >= SERIES_INTERVALS[frequency]:
+        raise ValueError(f'duration must be shorter than the {frequency} interval')
+    if not isinstance(count, int) or not 1 <= count <= MAX_OCCURRENCES:
+        raise ValueError(f'count must be between 1 and {MAX_OCCURRENCES}')
+    return [start + SERIES_INTERVALS[frequency] * i for i in range(count)]
+
+
+def _busy_intervals(therapist_id, start, end, now):
+    """Sorted (start, end) of every booked or held interval of the therapist touching [start, end)"""
+    booked = sa.select(Appointment.date, Appointment.ends_at).where(
+        Appointment.therapist_id == therapist_id,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        Appointment.date < end,
+        Appointment.ends_at > start
+    )
+    held = sa.select(SlotHold.date, SlotHold.ends_at).where(
+        SlotHold.therapist_id == therapist_id,
+        SlotHold.expires_at > now,
+        SlotHold.date < end,
+        SlotHold.ends_at > start
+    )
+    return sorted(tuple(row) for row in db.session.execute(booked.union_all(held)))
+
+
+def _overlap_checker(busy):
+    """Build a test for whether [start, end) overlaps any of the sorted busy intervals"""
+    starts = [busy_start for busy_start, _ in busy]
+    # Latest end among the intervals starting at or before each position
+    latest_end = []
+    for _, busy_end in busy:
+        latest_end.append(max(busy_end, latest_end[-1]) if latest_end else busy_end)
+
+    def overlaps(start, end):
+        position = bisect.bisect_left(starts, end)
+        return position > 0 and latest_end[position - 1] > start
+    return overlaps
+
+
+def book_series(therapist_id, patient_id, starts, duration, notes=None, skip_conflicts=False):
+    """Insert a recurring series with one conflict query and one bulk insert
+
+    Returns (appointments, conflicts). Raises SeriesConflict listing the clashing
+    start times unless skip_conflicts is set, in which case only free occurrences
+    are booked.
+    """
+    occurrences = [(start, appointment_end(start, duration)) for start in starts]
+    try:
+        _serialize_bookings(db.session, therapist_id)
+        busy = _busy_intervals(therapist_id, occurrences[0][0], occurrences[-1][1], datetime.utcnow())
+        overlaps = _overlap_checker(busy)
+        conflicts = [start for start, end in occurrences if overlaps(start, end)]
+        if conflicts and (not skip_conflicts or len(conflicts) == len(occurrences)):
+            raise SeriesConflict(conflicts)
+
+        series_id = uuid.uuid4().hex
+        created_at = datetime.utcnow()
+        free = [(start, end) for start, end in occurrences if start not in conflicts]
+        # Bulk inserts skip the mapper hooks, so reserve the change sequence values here
+        last_seq = allocate_sequence(db.session.connection(), CHANGE_SEQUENCE, len(free))
+        rows = [
+            {
+                'therapist_id': therapist_id,
+                'patient_id': patient_id,
+                'date': start,
+                'duration': duration,
+                'ends_at': end,
+                'status': 'pending',
+                'notes': notes,
+                'series_id': series_id,
+                'created_at': created_at,
+                'updated_at': created_at,
+                'change_seq': last_seq - len(free) + 1 + position
+            }
+            for position, (start, end) in enumerate(free)
+        ]
+        appointments = db.session.scalars(sa.insert(Appointment).returning(Appointment), rows).all()
+        stage_appointment_events(db.session, [appointment_event(appointment) for appointment in appointments])
+        db.session.commit()
+        return appointments, conflicts
+    except SlotUnavailable:
+        db.session.rollback()
+        raise
+    except IntegrityError as e:
+        db.session.rollback()
+        if EXCLUSION_CONSTRAINT in str(e.orig):
+            raise SlotUnavailable() from e
+        raise
+
+
+def hold_slot(therapist_id, patient_id, start, duration, minutes=None):
+    """Reserve a slot for the patient for a few minutes, raising SlotUnavailable if taken"""
+    end = appointment_end(start, duration)
+    try:
+        _serialize_bookings(db.session, therapist_id)
+        _check_slot(therapist_id, start, end)
+
+        hold = SlotHold(
+            therapist_id=therapist_id,
+            patient_id=patient_id,
+            date=start,
+            duration=duration,
+            ends_at=end,
+            expires_at=datetime.utcnow() + timedelta(minutes=minutes or HOLD_MINUTES)
+        )
+        db.session.add(hold)
+        db.session.commit()
+        return hold
+    except SlotUnavailable:
+        db.session.rollback()
+        raise
+
+
+def confirm_hold(hold_id, patient_id, notes=None):
+    """Turn the patient's unexpired hold into an appointment"""
+    try:
+        _serialize_bookings(db.session)
+        hold = SlotHold.query.filter(
+            SlotHold.id == hold_id,
+            SlotHold.patient_id == patient_id,
+            SlotHold.expires_at > datetime.utcnow()
+        ).first()
+        if not hold:
+            raise HoldNotFound()
+        _serialize_bookings(db.session, hold.therapist_id)
+        # The hold kept others out; this only guards against bookings made before it existed
+        _check_slot(hold.therapist_id, hold.date, hold.ends_at, exclude_hold_id=hold.id)
+
+        appointment = Appointment(
+            therapist_id=hold.therapist_id,
+            patient_id=patient_id,
+            date=hold.date,
+            duration=hold.duration,
+            notes=notes
+        )
+        db.session.add(appointment)
+        db.session.delete(hold)
+        db.session.commit()
+        return appointment
+    except (HoldNotFound, SlotUnavailable):
+        db.session.rollback()
+        raise
+    except IntegrityError as e:
+        db.session.rollback()
+        if EXCLUSION_CONSTRAINT in str(e.orig):
+            raise SlotUnavailable() from e
+        raise
+
+
+def release_hold(hold_id, patient_id):
+    """Give up a hold early; returns False if the patient has no such hold"""
+    deleted = SlotHold.query.filter_by(id=hold_id, patient_id=patient_id).delete(synchronize_session=False)
+    db.session.commit()
+    return bool(deleted)
+
+
+def reap_expired_holds(batch_size=None, now=None):
+    """Delete expired holds in bounded batches, returning how many were removed"""
+    batch_size = batch_size or REAP_BATCH_SIZE
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        ids = [
+            row.id for row in
+            db.session.query(SlotHold.id).filter(SlotHold.expires_at <= now).limit(batch_size)
+        ]
+        if not ids:
+            break
+        SlotHold.query.filter(SlotHold.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(ids)
+    if removed:
+        logger.info(f"Reaped {removed} expired appointment holds")
+    return removed
@@ -0,0 +1,161 @@
+"""Streaming donation exports and year-end receipts"""
+import os
+import io
+import csv
+import logging
+import zipfile
+from collections import deque
+from datetime import datetime
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+from backend.models import Donation, User, db
+from backend.services.donation_summary import COUNTED_STATUS
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = (
+    'id', 'user_id', 'email', 'name', 'amount', 'amount_minor', 'status', 'transaction_id', 'created_at'
+)
+
+# Rows fetched per round trip; also the number of CSV rows per streamed chunk
+EXPORT_BATCH_SIZE = int(os.getenv('DONATION_EXPORT_BATCH_SIZE', 1000))
+
+# Leading characters that make spreadsheet applications evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def spreadsheet_safe(value):
+    """Quote free text that a spreadsheet would otherwise run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export_rows(start=None, end=None, status=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield export tuples in id order without loading the whole table
+
+    yield_per fetches batch_size rows at a time through a server-side cursor
+    where the driver supports one.
+    """
+    query = db.session.query(
+        Donation.id, Donation.user_id, User.email, User.name, Donation.amount_minor,
+        Donation.status, Donation.transaction_id, Donation.created_at
+    ).join(User, User.id == Donation.user_id)
+    if start:
+        query = query.filter(Donation.created_at >= start)
+    if end:
+        query = query.filter(Donation.created_at < end)
+    if status:
+        query = query.filter(Donation.status == status)
+
+    for donation_id, user_id, email, name, amount_minor, donation_status, transaction_id, created_at in (
+        query.order_by(Donation.id).execution_options(yield_per=batch_size)
+    ):
+        yield (
+            donation_id, user_id, spreadsheet_safe(email), spreadsheet_safe(name), f'{amount_minor / 100:.2f}',
+            amount_minor, spreadsheet_safe(donation_status), spreadsheet_safe(transaction_id),
+            created_at.isoformat() if created_at else ''
+        )
+
+
+def iter_csv(rows, chunk_rows=EXPORT_BATCH_SIZE):
+    """Encode rows as CSV text, yielding one chunk per chunk_rows rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 1
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def render_receipt(donor):
+    """Render one donor's year-end receipt; runs in a pool process, so it only sees plain data"""
+    lines = [
+        donor['organization'],
+        f"Tax ID: {donor['tax_id']}" if donor['tax_id'] else None,
+        '',
+        f"Donation receipt for {donor['year']}",
+        f"Donor: {donor['name']} <{donor['email']}>",
+        '',
+        f"{'Date':<12}{'Amount':>14}  Reference",
+    ]
+    for created_at, amount_minor, transaction_id in donor['donations']:
+        lines.append(f"{created_at[:10]:<12}{amount_minor / 100:>14,.2f}  {transaction_id or ''}")
+    lines += [
+        '',
+        f"{'Total':<12}{donor['total_minor'] / 100:>14,.2f}",
+        '',
+        'No goods or services were provided in exchange for these contributions.',
+    ]
+    text = '\n'.join(line for line in lines if line is not None) + '\n'
+    return f"receipt-{donor['year']}-{donor['user_id']}.txt", text.encode()
+
+
+def receipt_donors(year, batch_size=EXPORT_BATCH_SIZE):
+    """Yield one plain-data payload per donor with completed donations in year, streaming the rows"""
+    organization = os.getenv('RECEIPT_ORGANIZATION_NAME', 'Mind Wellness')
+    tax_id = os.getenv('RECEIPT_TAX_ID')
+    rows = db.session.query(
+        Donation.user_id, User.name, User.email, Donation.created_at, Donation.amount_minor, Donation.transaction_id
+    ).join(User, User.id == Donation.user_id).filter(
+        Donation.status == COUNTED_STATUS,
+        Donation.created_at >= datetime(year, 1, 1),
+        Donation.created_at < datetime(year + 1, 1, 1)
+    ).order_by(Donation.user_id, Donation.created_at, Donation.id).execution_options(yield_per=batch_size)
+
+    for user_id, donor_rows in groupby(rows, key=lambda row: row.user_id):
+        donor_rows = list(donor_rows)
+        yield {
+            'user_id': user_id,
+            'name': donor_rows[0].name,
+            'email': donor_rows[0].email,
+            'year': year,
+            'organization': organization,
+            'tax_id': tax_id,
+            'donations': [(row.created_at.isoformat(), row.amount_minor, row.transaction_id) for row in donor_rows],
+            'total_minor': sum(row.amount_minor for row in donor_rows)
+        }
+
+
+def generate_receipts(year, output, workers=None, max_pending=None):
+    """Render every donor's receipt for year across a process pool into a zip at output
+
+    At most max_pending receipts are queued or held at once; each finished
+    receipt is written into the archive in donor order before more are submitted.
+    Returns the number of receipts written.
+    """
+    workers = workers or int(os.getenv('RECEIPT_WORKERS', os.cpu_count() or 1))
+    max_pending = max_pending or workers * 4
+    written = 0
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def write_oldest():
+            filename, content = pending.popleft().result()
+            archive.writestr(filename, content)
+
+        for donor in receipt_donors(year):
+            pending.append(executor.submit(render_receipt, donor))
+            if len(pending) >= max_pending:
+                write_oldest()
+                written += 1
+        while pending:
+            write_oldest()
+            written += 1
+    logger.info(f"Wrote {written} donation receipts for {year}")
+    return written
@@ -0,0 +1,137 @@
+"""Reconcile pending donations against Stripe checkout sessions"""
+import os
+import logging
+import stripe
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy import case, or_, update
+
+from backend.models import Donation, db
+from backend.models.donation_rollup import add_rollup_delta, apply_rollup_deltas
+from backend.services.donation_status import stage_donation_status_changes
+from backend.services.stripe_service import StripePaymentService
+from backend.services.stripe_webhooks import OPEN_STATUSES
+from backend.utils.circuit_breaker import CircuitOpen
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Slack around the donation timestamps: sessions are created just before their donation rows
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def session_status(session):
+    """Donation status implied by a checkout session, or None while it is still open"""
+    if session.get('status') == 'complete':
+        return 'completed' if session.get('payment_status') in ('paid', 'no_payment_required') else 'processing'
+    if session.get('status') == 'expired':
+        return 'expired'
+    return None
+
+
+def _time_slices(start, end, count):
+    """Split [start, end] into count contiguous (gte, lt) unix-timestamp ranges"""
+    start = int(start.replace(tzinfo=timezone.utc).timestamp())
+    end = int(end.replace(tzinfo=timezone.utc).timestamp()) + 1
+    step = max(1, -(-(end - start) // count))
+    return [(low, min(low + step, end)) for low in range(start, end, step)]
+
+
+def _reconcile_batch(pending, oldest, cutoff, concurrency, page_size, stripe_service):
+    """Reconcile one batch of {session_id: donation_id}; returns ({donation_id: status}, failed slice count)"""
+    slices = _time_slices(oldest - CLOCK_SKEW, cutoff + CLOCK_SKEW, concurrency)
+
+    def scan(created):
+        try:
+            return [
+                (session['id'], session_status(session))
+                for session in stripe_service.iter_checkout_sessions(created, page_size)
+                if session['id'] in pending
+            ], None
+        except (CircuitOpen, stripe.error.StripeError) as e:
+            # Sessions found in other slices still apply; the rest are retried on the next run
+            logger.error(f"Error listing checkout sessions created in {created}: {str(e)}")
+            return [], e
+
+    statuses = {}
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='stripe-reconcile') as executor:
+        for found, error in executor.map(scan, slices):
+            failed += error is not None
+            statuses.update({session_id: status for session_id, status in found if status})
+
+    changes = {pending[session_id]: status for session_id, status in statuses.items()}
+    if changes:
+        # Lock the rows still open so the rollup deltas match what the UPDATE changes
+        rows = db.session.query(
+            Donation.id, Donation.status, Donation.amount_minor, Donation.created_at
+        ).filter(Donation.id.in_(changes), Donation.status.in_(OPEN_STATUSES)).with_for_update().all()
+        changes = {row.id: changes[row.id] for row in rows}
+
+    if changes:
+        db.session.execute(
+            update(Donation)
+            .where(Donation.id.in_(changes))
+            .values(status=case(changes, value=Donation.id))
+            .execution_options(synchronize_session=False)
+        )
+        # The bulk UPDATE bypasses the ORM hooks that maintain the rollups
+        deltas = {}
+        for row in rows:
+            add_rollup_delta(deltas, row.created_at, row.status, row.amount_minor, -1)
+            add_rollup_delta(deltas, row.created_at, changes[row.id], row.amount_minor, 1)
+        apply_rollup_deltas(db.session.connection(), deltas)
+        session_ids = {donation_id: session_id for session_id, donation_id in pending.items()}
+        stage_donation_status_changes(db.session, [session_ids[donation_id] for donation_id in changes])
+    db.session.commit()
+    return changes, failed
+
+
+def reconcile_pending_donations(older_than=None, concurrency=None, page_size=100, now=None, stripe_service=None,
+                                batch_size=None):
+    """Bring pending donations older than older_than in line with Stripe
+
+    Pending donations are read and updated batch_size at a time, each batch
+    scanning only the Stripe sessions created while its donations were.
+    Returns {status: count}, plus 'failed_slices' when some Stripe listings
+    failed; the donations they covered stay pending until the next run.
+    """
+    older_than = older_than or timedelta(minutes=int(os.getenv('DONATION_RECONCILE_AFTER_MINUTES', 30)))
+    concurrency = concurrency or int(os.getenv('DONATION_RECONCILE_CONCURRENCY', 4))
+    batch_size = batch_size or int(os.getenv('DONATION_RECONCILE_BATCH_SIZE', 1000))
+    cutoff = (now or datetime.utcnow()) - older_than
+    stripe_service = stripe_service or StripePaymentService(pool_size=concurrency)
+
+    summary = {}
+    checked = 0
+    failed = 0
+    last_id = 0
+    while True:
+        batch = db.session.query(Donation.id, Donation.transaction_id, Donation.created_at).filter(
+            Donation.id > last_id,
+            Donation.status.in_(OPEN_STATUSES),
+            Donation.transaction_id.isnot(None),
+            or_(Donation.created_at <= cutoff, Donation.created_at.is_(None))
+        ).order_by(Donation.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        checked += len(batch)
+
+        # Undated legacy rows fall back to the oldest session Stripe still lists for checkout (30 days)
+        oldest = min(row.created_at or cutoff - timedelta(days=30) for row in batch)
+        changes, batch_failed = _reconcile_batch(
+            {row.transaction_id: row.id for row in batch}, oldest, cutoff, concurrency, page_size, stripe_service
+        )
+        failed += batch_failed
+        for status in changes.values():
+            summary[status] = summary.get(status, 0) + 1
+
+    if failed:
+        summary['failed_slices'] = failed
+    logger.info(f"Reconciled {checked} pending donations: {summary}")
+    return summary
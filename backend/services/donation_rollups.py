@@ -0,0 +1,93 @@
+"""Platform-wide donation rollups and campaign progress"""
+import os
+import logging
+from datetime import date, datetime
+from dotenv import load_dotenv
+from sqlalchemy import func, insert, or_, text
+
+from backend.models import Donation, DonationRollup, db
+from backend.models.donation_rollup import ALL_TIME
+from backend.services.donation_summary import COUNTED_STATUS, month_bucket
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _as_date(value):
+    """Normalize a day or 'YYYY-MM' month value returned by the database to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value if len(value) > 7 else f'{value}-01')
+
+
+def rebuild_donation_rollups():
+    """Recompute every rollup row from the donations table; returns the number of rows written"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        # Block donation writes until commit so none is missed or counted twice
+        db.session.execute(text('LOCK TABLE donations IN SHARE MODE'))
+    db.session.query(DonationRollup).delete(synchronize_session=False)
+
+    rows = []
+    totals = (func.sum(Donation.amount_minor), func.count(Donation.id))
+    for period, bucket in (
+        ('day', func.date(Donation.created_at)),
+        ('month', month_bucket(Donation.created_at, dialect))
+    ):
+        grouped = db.session.query(bucket, Donation.status, *totals).filter(
+            Donation.created_at.isnot(None), Donation.status.isnot(None)
+        ).group_by(bucket, Donation.status)
+        rows += [
+            {'period': period, 'period_start': _as_date(start), 'status': status, 'total_minor': total, 'count': count}
+            for start, status, total, count in grouped
+        ]
+    rows += [
+        {'period': 'all', 'period_start': ALL_TIME, 'status': status, 'total_minor': total, 'count': count}
+        for status, total, count in db.session.query(Donation.status, *totals).filter(
+            Donation.status.isnot(None)
+        ).group_by(Donation.status)
+    ]
+
+    if rows:
+        db.session.execute(insert(DonationRollup), rows)
+    db.session.commit()
+    logger.info(f"Rebuilt {len(rows)} donation rollup rows")
+    return len(rows)
+
+
+def campaign_progress(today=None):
+    """Completed totals for today, this month and all time against the configured campaign goal
+
+    Reads at most three rollup rows, however many donations there are.
+    """
+    today = today or datetime.utcnow().date()
+    buckets = {('day', today): 'today', ('month', today.replace(day=1)): 'this_month', ('all', ALL_TIME): 'raised'}
+    found = db.session.query(
+        DonationRollup.period, DonationRollup.period_start, DonationRollup.total_minor, DonationRollup.count
+    ).filter(
+        DonationRollup.status == COUNTED_STATUS,
+        or_(*(
+            (DonationRollup.period == period) & (DonationRollup.period_start == start)
+            for period, start in buckets
+        ))
+    ).all()
+    totals = {buckets[(period, start)]: (total, count) for period, start, total, count in found}
+
+    raised_minor, donations = totals.get('raised', (0, 0))
+    goal_minor = int(os.getenv('DONATION_CAMPAIGN_GOAL_MINOR', 0)) or None
+    return {
+        'name': os.getenv('DONATION_CAMPAIGN_NAME', 'Mind Wellness'),
+        'raised_minor': raised_minor,
+        'raised': raised_minor / 100,
+        'donations': donations,
+        'today_minor': totals.get('today', (0, 0))[0],
+        'this_month_minor': totals.get('this_month', (0, 0))[0],
+        'goal_minor': goal_minor,
+        'goal': goal_minor / 100 if goal_minor else None,
+        'progress': round(min(raised_minor / goal_minor, 1.0), 4) if goal_minor else None
+    }
@@ -0,0 +1,101 @@
+"""Wake long-polling donation status requests when a donation's status changes"""
+import os
+import socket
+import logging
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from backend.models import Donation
+from backend.services.appointment_events import DatagramRelay, private_runtime_dir
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = 'donation_status_changes'
+
+
+class StatusWaiters:
+    """Threads in this worker waiting on checkout sessions, keyed by session id"""
+
+    def __init__(self):
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def register(self, session_id):
+        """Return an event that is set whenever the session's donation changes"""
+        waiter = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(session_id, set()).add(waiter)
+        return waiter
+
+    def unregister(self, session_id, waiter):
+        with self._lock:
+            waiters = self._waiters.get(session_id)
+            if waiters:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[session_id]
+
+    def notify(self, session_id):
+        with self._lock:
+            waiters = list(self._waiters.get(session_id, ()))
+        for waiter in waiters:
+            waiter.set()
+
+    def waiting_count(self):
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+# Shared per-worker registry; the relay wakes waiters whose webhook landed on another worker
+waiters = StatusWaiters()
+relay = None
+if hasattr(socket, 'AF_UNIX') and os.getenv('DONATION_EVENTS_RELAY', 'true').lower() != 'false':
+    relay = DatagramRelay(
+        os.getenv('DONATION_EVENTS_DIR') or private_runtime_dir('donations'),
+        lambda data: waiters.notify(data.get('session_id'))
+    )
+
+
+def listen(session_id):
+    """Register for changes to a checkout session's donation, joining the relay on first use"""
+    if relay is not None:
+        relay.start()
+    return waiters.register(session_id)
+
+
+def stage_donation_status_changes(session, session_ids):
+    """Queue wake-ups for writes that bypass the unit of work (bulk UPDATE)"""
+    session.info.setdefault(_SESSION_KEY, set()).update(session_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_donation_changes(session, flush_context):
+    changed = [
+        obj.transaction_id for obj in session.dirty
+        if isinstance(obj, Donation) and obj.transaction_id and inspect(obj).attrs.status.history.has_changes()
+    ]
+    if changed:
+        stage_donation_status_changes(session, changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_donation_waiters(session):
+    """Wake waiters once the new status is visible to their next read"""
+    for session_id in session.info.pop(_SESSION_KEY, None) or ():
+        try:
+            waiters.notify(session_id)
+            if relay is not None:
+                relay.broadcast({'session_id': session_id})
+        except Exception as e:
+            logger.error(f"Error waking donation status waiters: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_donation_changes(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,62 @@
+"""Per-donor donation aggregates computed in SQL"""
+from datetime import datetime
+from sqlalchemy import func
+
+from backend.models import Donation, db
+
+# Only settled donations count towards a donor's totals
+COUNTED_STATUS = 'completed'
+
+
+def month_bucket(column, dialect_name):
+    """SQL expression rendering a timestamp as its 'YYYY-MM' month"""
+    if dialect_name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    if dialect_name in ('mysql', 'mariadb'):
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def _months_back(now, months):
+    """First instant of the month months-1 before now's month"""
+    index = now.year * 12 + now.month - 1 - (months - 1)
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def donation_summary(user_id, months=12, now=None):
+    """Total, count, last donation and per-month totals for a donor's completed donations
+
+    Each part is a single aggregate over the donor's (user_id, status) index range.
+    """
+    counted = db.session.query(Donation).filter(
+        Donation.user_id == user_id, Donation.status == COUNTED_STATUS
+    )
+    total_minor, count = counted.with_entities(
+        func.coalesce(func.sum(Donation.amount_minor), 0), func.count(Donation.id)
+    ).one()
+    last = counted.order_by(Donation.created_at.desc().nullslast(), Donation.id.desc()).first()
+
+    month = month_bucket(Donation.created_at, db.engine.dialect.name).label('month')
+    monthly = counted.with_entities(
+        month, func.sum(Donation.amount_minor), func.count(Donation.id)
+    ).filter(
+        Donation.created_at >= _months_back(now or datetime.utcnow(), months)
+    ).group_by(month).order_by(month).all()
+
+    return {
+        'total_minor': total_minor,
+        'total': total_minor / 100,
+        'count': count,
+        'last_donation': {
+            'id': last.id,
+            'amount_minor': last.amount_minor,
+            'amount': last.amount,
+            'created_at': last.created_at.isoformat() if last.created_at else None
+        } if last else None,
+        'monthly': [{
+            'month': bucket,
+            'total_minor': month_total,
+            'total': month_total / 100,
+            'count': month_count
+        } for bucket, month_total, month_count in monthly]
+    }
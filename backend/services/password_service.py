@@ -0,0 +1,138 @@
+"""Password hashing service backed by a bounded process pool"""
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from backend.utils.metrics import Histogram
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class HashingQueueFull(Exception):
+    """Raised when the hashing queue cannot accept more work"""
+
+    def __init__(self, retry_after):
+        super().__init__('Password hashing queue is full')
+        self.retry_after = retry_after
+
+
+def _timed_call(fn, *args):
+    """Run fn in a pool process and report when it started and how long it took"""
+    started_at = time.time()
+    started = time.perf_counter()
+    result = fn(*args)
+    return started_at, time.perf_counter() - started, result
+
+
+class PasswordHashingService:
+    def __init__(self, max_workers=None, max_queue=None, retry_after=None, timeout=None):
+        """Initialize the hashing pool limits from arguments or environment"""
+        self.max_workers = max_workers or int(
+            os.getenv('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))
+        )
+        self.max_queue = max_queue if max_queue is not None else int(
+            os.getenv('PASSWORD_HASH_MAX_QUEUE', self.max_workers * 4)
+        )
+        self.retry_after = retry_after or int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))
+        self.timeout = timeout or float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+        # Slots cover both running and queued jobs; once exhausted we shed load
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+        self.queue_wait = Histogram()
+        self.hash_time = Histogram()
+        self.rejected = 0
+        self.timed_out = 0
+        self.in_flight = 0
+
+    def _get_executor(self):
+        """Return the process pool, recreating it after a fork (e.g. gunicorn workers)"""
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    self._executor_pid = pid
+                    logger.info(f"Started password hashing pool with {self.max_workers} workers in pid {pid}")
+        return self._executor
+
+    def _finished(self, future=None):
+        """Give back a job's slot once it has really stopped running"""
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        """Run a hashing function in the pool, shedding load when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning("Password hashing queue full, rejecting request")
+            raise HashingQueueFull(self.retry_after)
+
+        with self._lock:
+            self.in_flight += 1
+        enqueued_at = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, *args)
+        except Exception:
+            self._finished()
+            raise
+        # A job that times out keeps running in the pool, so its slot is only freed when it completes
+        future.add_done_callback(self._finished)
+
+        try:
+            started_at, elapsed, result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            logger.error(f"Password hashing timed out after {self.timeout}s")
+            raise HashingQueueFull(self.retry_after)
+
+        self.queue_wait.observe(max(started_at - enqueued_at, 0.0))
+        self.hash_time.observe(elapsed)
+        return result
+
+    def hash_password(self, password: str) -> str:
+        """Hash a password for storage"""
+        return self._run(generate_password_hash, password)
+
+    def verify_password(self, password_hash: str, password: str) -> bool:
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def stats(self) -> dict:
+        """Return queue depth, queue-wait and hash-time metrics for sizing the pool"""
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'queue_wait': self.queue_wait.snapshot(),
+            'hash_time': self.hash_time.snapshot()
+        }
+
+    def shutdown(self):
+        """Stop the process pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                self._executor_pid = None
+
+
+# Shared per-process hashing service used by the auth endpoints
+password_hasher = PasswordHashingService()
@@ -0,0 +1,166 @@
+"""Appointment reminder scheduling"""
+import os
+import json
+import time
+import heapq
+import logging
+import importlib
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import Appointment, AppointmentReminder, User, db
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Deliver reminders by writing them to the application log"""
+
+    def send(self, reminder):
+        logger.info(
+            f"Reminder: appointment {reminder['appointment_id']} at {reminder['date']} "
+            f"for {reminder['patient_email']} with {reminder['therapist_name']}"
+        )
+
+
+class FileSink:
+    """Deliver reminders by appending them as JSON lines to a local file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, reminder):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(reminder) + '\n')
+
+
+def load_sink(spec=None):
+    """Build a sink from 'log', 'file:<path>' or 'package.module:attribute'"""
+    spec = spec or os.getenv('REMINDER_SINK', 'log')
+    if spec == 'log':
+        return LogSink()
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    module_name, _, attribute = spec.partition(':')
+    sink = getattr(importlib.import_module(module_name), attribute)
+    return sink() if isinstance(sink, type) else sink
+
+
+class ReminderScheduler:
+    """Min-heap of upcoming reminders refilled from a sliding window of accepted appointments
+
+    Each refill is one range scan over (status, date) covering the next window;
+    each tick only pops the reminders that are due.
+    """
+
+    def __init__(self, sink, lead=None, window=None, refill_interval=None, retry_delay=60):
+        self.sink = sink
+        self.lead = lead or timedelta(minutes=int(os.getenv('REMINDER_LEAD_MINUTES', 60)))
+        self.window = window or timedelta(hours=int(os.getenv('REMINDER_WINDOW_HOURS', 24)))
+        self.refill_interval = refill_interval if refill_interval is not None else int(
+            os.getenv('REMINDER_REFILL_SECONDS', 60)
+        )
+        self.retry_delay = retry_delay
+        self.kind = f'{int(self.lead.total_seconds() // 60)}m'
+        self._heap = []
+        self._queued = set()
+        self._next_refill = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def refill(self, now):
+        """Queue unsent reminders for accepted appointments starting within the window"""
+        sent = db.session.query(AppointmentReminder.id).filter(
+            AppointmentReminder.appointment_id == Appointment.id,
+            AppointmentReminder.kind == self.kind
+        ).exists()
+        rows = db.session.query(Appointment.id, Appointment.date).filter(
+            Appointment.status == 'accepted',
+            Appointment.date > now,
+            Appointment.date <= now + self.window,
+            ~sent
+        ).all()
+
+        added = 0
+        for appointment_id, date in rows:
+            if appointment_id not in self._queued:
+                heapq.heappush(self._heap, (date - self.lead, appointment_id, date))
+                self._queued.add(appointment_id)
+                added += 1
+        db.session.commit()
+        if added:
+            logger.info(f"Queued {added} appointment reminders")
+        return added
+
+    def tick(self, now):
+        """Send every reminder that is due; returns how many were delivered"""
+        delivered = 0
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, appointment_id, date = heapq.heappop(self._heap)
+            self._queued.discard(appointment_id)
+            try:
+                if self._fire(appointment_id, date, now):
+                    delivered += 1
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error sending reminder for appointment {appointment_id}: {str(e)}")
+                if date > now:
+                    heapq.heappush(self._heap, (now + timedelta(seconds=self.retry_delay), appointment_id, date))
+                    self._queued.add(appointment_id)
+        return delivered
+
+    def _fire(self, appointment_id, date, now):
+        """Claim, deliver and record one reminder; False if it no longer applies"""
+        appointment = db.session.get(Appointment, appointment_id)
+        if (appointment is None or appointment.status != 'accepted' or
+                appointment.date != date or appointment.date <= now):
+            # Cancelled or rescheduled since it was queued; a refill picks up the new time
+            db.session.rollback()
+            return False
+
+        # The unique (appointment_id, kind) row is the claim: only one worker gets past the flush
+        db.session.add(AppointmentReminder(appointment_id=appointment_id, kind=self.kind))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+        patient = db.session.get(User, appointment.patient_id)
+        therapist = db.session.get(User, appointment.therapist_id)
+        self.sink.send({
+            'appointment_id': appointment_id,
+            'kind': self.kind,
+            'date': date.isoformat(),
+            'duration': appointment.duration,
+            'patient_email': patient.email,
+            'patient_name': patient.name,
+            'therapist_name': therapist.name
+        })
+        db.session.commit()
+        return True
+
+    def run_once(self, now=None):
+        """Refill if due, then send due reminders"""
+        now = now or datetime.utcnow()
+        if time.monotonic() >= self._next_refill:
+            self.refill(now)
+            self._next_refill = time.monotonic() + self.refill_interval
+        return self.tick(now)
+
+    def run(self, max_sleep=30, should_stop=lambda: False):
+        """Loop forever, sleeping until the next reminder or refill is due"""
+        logger.info(f"Reminder worker started (lead {self.lead}, window {self.window})")
+        while not should_stop():
+            self.run_once()
+            now = datetime.utcnow()
+            sleep_for = min(max_sleep, max(0.0, self._next_refill - time.monotonic()))
+            if self._heap:
+                sleep_for = min(sleep_for, max(0.0, (self._heap[0][0] - now).total_seconds()))
+            time.sleep(max(sleep_for, 0.1))
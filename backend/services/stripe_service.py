@@ -1,8 +1,15 @@
 """Stripe payment service"""
 import stripe
 import os
+import time
+import threading
 from dotenv import load_dotenv
 import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from backend.utils.metrics import Histogram
 
 # Load environment variables
 load_dotenv()
@@ -10,9 +17,18 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+
+def _is_outage(error):
+    """Whether a Stripe error says Stripe is unhealthy rather than the request being bad"""
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return (error.http_status or 0) >= 500
+
+
 class StripePaymentService:
-    def __init__(self):
-        """Initialize Stripe with configuration"""
+    def __init__(self, api_base=None, connect_timeout=None, read_timeout=None,
+                 max_network_retries=None, pool_size=None, breaker=None):
+        """Initialize the Stripe client, its connection pool and circuit breaker"""
         stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
         if not stripe.api_key:
             logger.error("STRIPE_SECRET_KEY not found in environment variables")
@@ -20,41 +36,119 @@ class StripePaymentService:
 
         self.currency = os.getenv('STRIPE_CURRENCY', 'usd')
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3001')
-        self.success_url = os.getenv('STRIPE_SUCCESS_URL', f'{frontend_url}/payment/success')
+        # Stripe fills in {CHECKOUT_SESSION_ID}; the success page polls the donation status with it
+        self.success_url = os.getenv(
+            'STRIPE_SUCCESS_URL', f'{frontend_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}'
+        )
         self.cancel_url = os.getenv('STRIPE_CANCEL_URL', f'{frontend_url}/payment/cancel')
-        
+
+        # One keep-alive session shared by every request thread, so calls reuse pooled connections
+        pool_size = pool_size or int(os.getenv('STRIPE_POOL_SIZE', 10))
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.timeout = (
+            connect_timeout or float(os.getenv('STRIPE_CONNECT_TIMEOUT', 3)),
+            read_timeout or float(os.getenv('STRIPE_READ_TIMEOUT', 10))
+        )
+
+        # Point the client at a local stand-in for testing
+        api_base = api_base or os.getenv('STRIPE_API_BASE')
+        self.client = stripe.StripeClient(
+            stripe.api_key,
+            base_addresses={'api': api_base} if api_base else {},
+            max_network_retries=max_network_retries if max_network_retries is not None else int(
+                os.getenv('STRIPE_MAX_NETWORK_RETRIES', 1)
+            ),
+            http_client=stripe.RequestsClient(timeout=self.timeout, session=session)
+        )
+
+        self.breaker = breaker or CircuitBreaker(
+            'Stripe',
+            failure_rate=float(os.getenv('STRIPE_BREAKER_FAILURE_RATE', 0.5)),
+            window=int(os.getenv('STRIPE_BREAKER_WINDOW', 20)),
+            min_calls=int(os.getenv('STRIPE_BREAKER_MIN_CALLS', 10)),
+            cooldown=float(os.getenv('STRIPE_BREAKER_COOLDOWN', 30))
+        )
+        self.latency = {}
+        self._lock = threading.Lock()
+
         logger.info(f"Stripe service initialized with success_url: {self.success_url}, cancel_url: {self.cancel_url}")
 
-    def create_checkout_session(self, amount: float, donation_id: str) -> dict:
-        """Create a Stripe checkout session for payment"""
+    def _call(self, operation, fn, *args, **kwargs):
+        """Call Stripe through the circuit breaker, recording the latency per operation"""
+        self.breaker.before_call()
+        started = time.perf_counter()
         try:
-            logger.info(f"Creating checkout session for amount: {amount}, donation_id: {donation_id}")
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
+            result = fn(*args, **kwargs)
+        except stripe.error.StripeError as e:
+            if _is_outage(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+            return result
+        finally:
+            self._observe(operation, time.perf_counter() - started)
+
+    def _observe(self, operation, elapsed):
+        with self._lock:
+            histogram = self.latency.get(operation)
+            if histogram is None:
+                histogram = self.latency[operation] = Histogram()
+        histogram.observe(elapsed)
+
+    def stats(self):
+        """Circuit breaker state and latency histograms per Stripe operation, served by GET /api/v1/metrics/"""
+        with self._lock:
+            latency = dict(self.latency)
+        return {
+            'breaker': self.breaker.snapshot(),
+            'latency': {operation: histogram.snapshot() for operation, histogram in latency.items()}
+        }
+
+    def create_checkout_session(self, amount_minor: int, donation_id: str, idempotency_key: str = None) -> dict:
+        """Create a Stripe checkout session for payment; Stripe replays the session for a repeated key"""
+        try:
+            logger.info(f"Creating checkout session for amount: {amount_minor / 100:.2f}, donation_id: {donation_id}")
+            session = self._call('checkout.sessions.create', self.client.checkout.sessions.create, params={
+                'payment_method_types': ['card'],
+                'line_items': [{
                     'price_data': {
                         'currency': self.currency,
                         'product_data': {
                             'name': 'Mind Wellness Donation',
                             'description': 'Thank you for your support!',
                         },
-                        'unit_amount': int(amount * 100),  # Convert to cents
+                        'unit_amount': amount_minor,
                     },
                     'quantity': 1,
                 }],
-                mode='payment',
-                success_url=self.success_url,
-                cancel_url=self.cancel_url,
-                metadata={
+                'mode': 'payment',
+                'success_url': self.success_url,
+                'cancel_url': self.cancel_url,
+                'metadata': {
                     'donation_id': donation_id,
                 },
-            )
+            }, options={'idempotency_key': idempotency_key} if idempotency_key else {})
             logger.info(f"Successfully created checkout session: {session.id}")
             return {
                 'session_id': session.id,
                 'url': session.url,
                 'success': True
             }
+        except CircuitOpen as e:
+            logger.warning(f"Stripe circuit open, not creating checkout session for donation_id: {donation_id}")
+            return {
+                'error': 'Payment provider is temporarily unavailable',
+                'retry_after': e.retry_after,
+                'success': False
+            }
         except stripe.error.StripeError as e:
             logger.error(f"Stripe error creating checkout session: {str(e)}")
             return {
@@ -68,17 +162,33 @@ class StripePaymentService:
                 'success': False
             }
 
+    def iter_checkout_sessions(self, created, page_size=100):
+        """Yield checkout sessions created in the (gte, lt) range, one guarded call per page"""
+        params = {'created': {'gte': created[0], 'lt': created[1]}, 'limit': page_size}
+        while True:
+            page = self._call('checkout.sessions.list', self.client.checkout.sessions.list, params=params)
+            for session in page.data:
+                yield session
+            if not page.has_more or not page.data:
+                return
+            params = dict(params, starting_after=page.data[-1].id)
+
+    def construct_event(self, payload: bytes, signature: str):
+        """Verify a webhook signature and parse the event
+
+        Raises ValueError when the secret is missing or the payload is malformed
+        and stripe.error.SignatureVerificationError when the signature is wrong.
+        """
+        webhook_secret = os.getenv('STRIPE_WEBHOOK_SECRET')
+        if not webhook_secret:
+            logger.error("STRIPE_WEBHOOK_SECRET not found in environment variables")
+            raise ValueError("Webhook secret not configured")
+        return stripe.Webhook.construct_event(payload, signature, webhook_secret)
+
     def handle_webhook(self, payload: bytes, signature: str) -> tuple:
         """Handle Stripe webhook events"""
         try:
-            webhook_secret = os.getenv('STRIPE_WEBHOOK_SECRET')
-            if not webhook_secret:
-                logger.error("STRIPE_WEBHOOK_SECRET not found in environment variables")
-                return False, "Webhook secret not configured"
-
-            event = stripe.Webhook.construct_event(
-                payload, signature, webhook_secret
-            )
+            event = self.construct_event(payload, signature)
             
             logger.info(f"Processing webhook event type: {event.type}")
             
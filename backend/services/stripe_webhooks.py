@@ -0,0 +1,177 @@
+"""Stripe webhook inbox and background processing"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import Donation, StripeEvent, db
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Donation status each checkout session event moves to
+SESSION_EVENT_STATUSES = {
+    'checkout.session.completed': 'completed',
+    'checkout.session.async_payment_succeeded': 'completed',
+    'checkout.session.async_payment_failed': 'failed',
+    'checkout.session.expired': 'expired'
+}
+
+# Statuses a donation may move out of; completed, failed and expired are final
+OPEN_STATUSES = ('pending', 'processing')
+
+
+def record_event(event, payload):
+    """Append a verified event to the inbox; returns False if it was already received"""
+    db.session.add(StripeEvent(
+        event_id=event['id'],
+        type=event['type'],
+        payload=payload.decode() if isinstance(payload, bytes) else payload
+    ))
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        logger.info(f"Ignoring duplicate Stripe event {event['id']}")
+        return False
+
+
+def _session_status(event_type, session):
+    """Target donation status for a checkout session event, or None to ignore it"""
+    if event_type == 'checkout.session.completed' and session.get('payment_status') not in ('paid', 'no_payment_required'):
+        # Delayed payment methods settle later via async_payment_* events
+        return 'processing'
+    return SESSION_EVENT_STATUSES.get(event_type)
+
+
+def apply_events(events):
+    """Apply a batch of inbox rows to their donations; the caller commits
+
+    Donations are loaded with one query per batch. Applying the same event twice
+    changes nothing, and a final status is never overwritten.
+    """
+    updates = []
+    for stripe_event in events:
+        data = json.loads(stripe_event.payload)
+        session = data.get('data', {}).get('object', {})
+        status = _session_status(stripe_event.type, session)
+        if status and session.get('id'):
+            updates.append((session['id'], status))
+
+    donations = {}
+    if updates:
+        donations = {
+            donation.transaction_id: donation
+            for donation in Donation.query.filter(
+                Donation.transaction_id.in_({session_id for session_id, _ in updates})
+            )
+        }
+
+    now = datetime.utcnow()
+    for session_id, status in updates:
+        donation = donations.get(session_id)
+        if donation is None:
+            logger.warning(f"No donation found for checkout session {session_id}")
+        elif donation.status in OPEN_STATUSES and donation.status != status:
+            logger.info(f"Donation {donation.id} {donation.status} -> {status}")
+            donation.status = status
+    for stripe_event in events:
+        stripe_event.processed_at = now
+        stripe_event.attempts += 1
+
+
+class WebhookProcessor:
+    """Drains the Stripe event inbox on a small thread pool"""
+
+    def __init__(self, max_workers=None, batch_size=None, max_attempts=None):
+        self.batch_size = batch_size or int(os.getenv('STRIPE_EVENT_BATCH_SIZE', 100))
+        self.max_attempts = max_attempts or int(os.getenv('STRIPE_EVENT_MAX_ATTEMPTS', 5))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('STRIPE_WEBHOOK_WORKERS', 2)),
+            thread_name_prefix='stripe-events'
+        )
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._rerun = False
+        self.last_future = None
+
+    def submit(self, app):
+        """Schedule a drain; bursts coalesce into the drain already queued or running"""
+        with self._lock:
+            if self._scheduled:
+                self._rerun = True
+                return self.last_future
+            self._scheduled = True
+            self.last_future = self._executor.submit(self._run, app)
+            return self.last_future
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    self.drain()
+                except Exception as e:
+                    logger.error(f"Error draining Stripe events: {str(e)}")
+                finally:
+                    db.session.remove()
+            with self._lock:
+                if not self._rerun:
+                    self._scheduled = False
+                    return
+                self._rerun = False
+
+    def _next_batch(self):
+        return (
+            StripeEvent.query
+            .filter(StripeEvent.processed_at.is_(None), StripeEvent.attempts < self.max_attempts)
+            .order_by(StripeEvent.received_at, StripeEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def drain(self):
+        """Process unprocessed events in batches until the inbox is empty; returns the count"""
+        processed = 0
+        while True:
+            events = self._next_batch()
+            if not events:
+                return processed
+            try:
+                apply_events(events)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Stripe event batch failed, retrying one by one: {str(e)}")
+                self._apply_individually([stripe_event.id for stripe_event in events])
+            processed += len(events)
+
+    def _apply_individually(self, event_ids):
+        """Isolate a poison event so the rest of its batch still goes through"""
+        for event_id in event_ids:
+            stripe_event = db.session.get(StripeEvent, event_id)
+            try:
+                apply_events([stripe_event])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                stripe_event = db.session.get(StripeEvent, event_id)
+                stripe_event.attempts += 1
+                stripe_event.last_error = str(e)
+                db.session.commit()
+                logger.error(f"Stripe event {stripe_event.event_id} failed: {str(e)}")
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+# Shared per-worker processor
+webhook_processor = WebhookProcessor()
@@ -0,0 +1,353 @@
+"""In-memory faceted index of the therapist directory"""
+import os
+import time
+import bisect
+import threading
+import logging
+from dotenv import load_dotenv
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from backend.models import User, db
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Columns held in memory for every therapist
+INDEX_FIELDS = (
+    'id', 'name', 'specialization', 'years_of_experience', 'hourly_rate',
+    'languages', 'qualifications', 'profile_image', 'is_verified', 'updated_at'
+)
+
+# Keys the directory can be sorted by, besides id
+SORT_FIELDS = ('hourly_rate', 'years_of_experience')
+
+# Facet families; languages and qualifications are matched case-insensitively
+FACETS = ('specialization', 'language', 'qualification')
+
+_SESSION_KEY = 'therapist_index_changes'
+
+
+def _facet_values(record):
+    """Return {family: [(key, label), ...]} for a therapist record"""
+    values = {family: [] for family in FACETS}
+    if record['specialization']:
+        values['specialization'].append((record['specialization'], record['specialization']))
+    for family, column in (('language', 'languages'), ('qualification', 'qualifications')):
+        seen = set()
+        for value in record[column] or []:
+            if isinstance(value, str) and value.strip():
+                label = value.strip()
+                key = label.lower()
+                if key not in seen:
+                    seen.add(key)
+                    values[family].append((key, label))
+    return values
+
+
+def _sort_key(value, therapist_id):
+    """Order by value with missing values last, then by id"""
+    return (value is None, value if value is not None else 0, therapist_id)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def valid_cursor(cursor, sort):
+    """True when cursor has the shape of a sort key for sort: (id,) or (is_none, value, id)"""
+    if sort == 'id':
+        return len(cursor) == 1 and _is_id(cursor[0])
+    return len(cursor) == 3 and isinstance(cursor[0], bool) and _is_number(cursor[1]) and _is_id(cursor[2])
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+class TherapistDirectoryIndex:
+    """Bitset and sorted-array index over therapist rows, held per worker"""
+
+    def __init__(self, refresh_interval=None, enabled=None):
+        self.refresh_interval = refresh_interval if refresh_interval is not None else int(
+            os.getenv('THERAPIST_INDEX_REFRESH', 300)
+        )
+        self.enabled = enabled if enabled is not None else (
+            os.getenv('THERAPIST_INDEX_ENABLED', 'true').lower() != 'false'
+        )
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._records = {}
+        self._bit_of = {}
+        self._id_at = {}
+        self._free_bits = []
+        self._next_bit = 0
+        self._verified = 0
+        self._facet_bits = {family: {} for family in FACETS}
+        self._facet_labels = {family: {} for family in FACETS}
+        self._sorted = {field: [] for field in SORT_FIELDS}
+        self._signature = None
+        self._loaded_at = None
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def _is_stale(self):
+        return (
+            self._loaded_at is None or
+            (self.refresh_interval and time.monotonic() - self._loaded_at > self.refresh_interval)
+        )
+
+    def rebuild(self):
+        """Load every therapist row from the database"""
+        columns = [getattr(User, field) for field in INDEX_FIELDS]
+        rows = db.session.query(*columns).filter(User.role == 'therapist').order_by(User.id).all()
+
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._insert(dict(row._mapping))
+            self._loaded_at = time.monotonic()
+        logger.info(f"Built therapist directory index with {len(rows)} therapists")
+
+    def _indexed_state(self):
+        """Therapist count and newest updated_at as held in the index"""
+        if self._signature is None:
+            self._signature = (len(self._records), max(
+                (record['updated_at'] for record in self._records.values() if record['updated_at'] is not None),
+                default=None
+            ))
+        return self._signature
+
+    @staticmethod
+    def _stored_state():
+        """Therapist count and newest updated_at in the database, from one aggregate query"""
+        return tuple(db.session.query(func.count(User.id), func.max(User.updated_at)).filter(
+            User.role == 'therapist'
+        ).one())
+
+    def ensure_loaded(self):
+        """Build the index on first use, and rebuild it when it is old or the table has moved on
+
+        Commits made by other workers never reach this worker's index, so every
+        use first compares the therapist count and newest updated_at.
+        """
+        stored = None if self._is_stale() else self._stored_state()
+        with self._lock:
+            if self._is_stale() or stored != self._indexed_state():
+                self.rebuild()
+
+    def clear(self):
+        """Forget everything so the next search rebuilds from the database"""
+        with self._lock:
+            self._reset()
+
+    def upsert(self, record):
+        """Insert or replace a therapist record"""
+        with self._lock:
+            if not self.loaded:
+                return
+            self._remove(record['id'])
+            self._insert(record)
+
+    def remove(self, therapist_id):
+        """Drop a therapist from the index"""
+        with self._lock:
+            if self.loaded:
+                self._remove(therapist_id)
+
+    def _insert(self, record):
+        therapist_id = record['id']
+        self._signature = None
+        bit_index = self._free_bits.pop() if self._free_bits else self._next_bit
+        if bit_index == self._next_bit:
+            self._next_bit += 1
+        bit = 1 << bit_index
+
+        self._records[therapist_id] = record
+        self._bit_of[therapist_id] = bit_index
+        self._id_at[bit_index] = therapist_id
+
+        if record['is_verified']:
+            self._verified |= bit
+        for family, values in _facet_values(record).items():
+            for key, label in values:
+                bits = self._facet_bits[family]
+                bits[key] = bits.get(key, 0) | bit
+                self._facet_labels[family].setdefault(key, label)
+        for field in SORT_FIELDS:
+            bisect.insort(self._sorted[field], _sort_key(record[field], therapist_id))
+
+    def _remove(self, therapist_id):
+        record = self._records.pop(therapist_id, None)
+        if record is None:
+            return
+        self._signature = None
+        bit_index = self._bit_of.pop(therapist_id)
+        del self._id_at[bit_index]
+        self._free_bits.append(bit_index)
+        bit = 1 << bit_index
+
+        self._verified &= ~bit
+        for family, values in _facet_values(record).items():
+            bits = self._facet_bits[family]
+            for key, _ in values:
+                remaining = bits.get(key, 0) & ~bit
+                if remaining:
+                    bits[key] = remaining
+                else:
+                    bits.pop(key, None)
+                    self._facet_labels[family].pop(key, None)
+        for field in SORT_FIELDS:
+            entries = self._sorted[field]
+            position = bisect.bisect_left(entries, _sort_key(record[field], therapist_id))
+            if position < len(entries) and entries[position][2] == therapist_id:
+                del entries[position]
+
+    def _range_mask(self, field, low=None, high=None):
+        """Bitset of therapists whose field lies within [low, high]"""
+        entries = self._sorted[field]
+        start = 0 if low is None else bisect.bisect_left(entries, (False, low, float('-inf')))
+        end = (
+            bisect.bisect_left(entries, (True, 0, float('-inf'))) if high is None
+            else bisect.bisect_right(entries, (False, high, float('inf')))
+        )
+        mask = 0
+        for _, _, therapist_id in entries[start:end]:
+            mask |= 1 << self._bit_of[therapist_id]
+        return mask
+
+    def _filter_mask(self, specialization=None, language=None, qualification=None,
+                     min_experience=None, max_rate=None, therapist_ids=None):
+        mask = self._verified
+        if therapist_ids is not None:
+            allowed = 0
+            for therapist_id in therapist_ids:
+                if therapist_id in self._bit_of:
+                    allowed |= 1 << self._bit_of[therapist_id]
+            mask &= allowed
+        if specialization:
+            mask &= self._facet_bits['specialization'].get(specialization, 0)
+        if language:
+            mask &= self._facet_bits['language'].get(language.strip().lower(), 0)
+        if qualification:
+            mask &= self._facet_bits['qualification'].get(qualification.strip().lower(), 0)
+        if min_experience:
+            mask &= self._range_mask('years_of_experience', low=min_experience)
+        if max_rate:
+            mask &= self._range_mask('hourly_rate', high=max_rate)
+        return mask
+
+    def _ordered_keys(self, mask, sort):
+        """Sort keys of every therapist in mask, in the requested order"""
+        if sort == 'id':
+            ids = [self._id_at[i] for i in range(mask.bit_length()) if mask >> i & 1]
+            return [(therapist_id,) for therapist_id in sorted(ids)]
+
+        field = sort.lstrip('-')
+        keys = [key for key in self._sorted[field] if mask >> self._bit_of[key[2]] & 1]
+        if sort.startswith('-'):
+            keys.reverse()
+        return keys
+
+    def _last_modified(self, mask):
+        """Newest updated_at among therapists in mask"""
+        timestamps = [
+            self._records[self._id_at[i]]['updated_at']
+            for i in range(mask.bit_length()) if mask >> i & 1
+        ]
+        return max((t for t in timestamps if t is not None), default=None)
+
+    def facet_counts(self, mask):
+        """Count matching therapists per facet value"""
+        counts = {}
+        for family in FACETS:
+            labels = self._facet_labels[family]
+            counts[family] = {
+                labels[key]: count
+                for key, bits in self._facet_bits[family].items()
+                for count in (_popcount(mask & bits),)
+                if count
+            }
+        return counts
+
+    def search(self, filters, sort='id', cursor=None, limit=20, facets=False):
+        """Filter, sort and page through the directory without touching the database"""
+        self.ensure_loaded()
+        with self._lock:
+            mask = self._filter_mask(**filters)
+            keys = self._ordered_keys(mask, sort)
+
+            if cursor:
+                if not valid_cursor(cursor, sort):
+                    raise ValueError('Invalid cursor')
+                after = tuple(cursor)
+                if sort.startswith('-'):
+                    keys = [key for key in keys if key < after]
+                else:
+                    keys = keys[bisect.bisect_right(keys, after):]
+
+            page = keys[:limit]
+            result = {
+                'records': [dict(self._records[key[-1]]) for key in page],
+                'next_cursor': list(page[-1]) if len(keys) > limit else None,
+                'total': _popcount(mask),
+                'last_modified': self._last_modified(mask)
+            }
+            if facets:
+                result['facets'] = self.facet_counts(mask)
+            return result
+
+
+def _record_from_user(user):
+    return {field: getattr(user, field) for field in INDEX_FIELDS}
+
+
+def _was_therapist(user):
+    """True when the user is, or was before this flush, a therapist"""
+    history = inspect(user).attrs.role.history
+    return user.role == 'therapist' or 'therapist' in (history.deleted or ())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_therapist_changes(session, flush_context):
+    """Snapshot therapist rows written in this flush for the index"""
+    for user in list(session.new) + list(session.dirty):
+        if isinstance(user, User) and _was_therapist(user):
+            record = _record_from_user(user) if user.role == 'therapist' else None
+            session.info.setdefault(_SESSION_KEY, {})[user.id] = record
+    for user in session.deleted:
+        if isinstance(user, User) and _was_therapist(user):
+            session.info.setdefault(_SESSION_KEY, {})[user.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_therapist_changes(session):
+    """Apply committed therapist changes to this worker's index"""
+    changes = session.info.pop(_SESSION_KEY, None)
+    if not changes:
+        return
+    for therapist_id, record in changes.items():
+        if record is None:
+            therapist_index.remove(therapist_id)
+        else:
+            therapist_index.upsert(record)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_therapist_changes(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+# Shared per-worker directory index
+therapist_index = TherapistDirectoryIndex()
@@ -0,0 +1,113 @@
+"""Full-text search over therapist profiles"""
+import re
+import logging
+import sqlalchemy as sa
+from sqlalchemy import event
+
+from backend.models import User
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Relative weights of name, specialization and bio when ranking matches
+WEIGHTS = (10.0, 5.0, 1.0)
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS therapist_search USING fts5(
+        name, specialization, bio,
+        content='users', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS therapist_search_ai AFTER INSERT ON users
+    WHEN new.role = 'therapist' BEGIN
+        INSERT INTO therapist_search(rowid, name, specialization, bio)
+        VALUES (new.id, new.name, new.specialization, new.bio);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS therapist_search_ad AFTER DELETE ON users
+    WHEN old.role = 'therapist' BEGIN
+        INSERT INTO therapist_search(therapist_search, rowid, name, specialization, bio)
+        VALUES ('delete', old.id, old.name, old.specialization, old.bio);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS therapist_search_au AFTER UPDATE OF name, specialization, bio, role ON users
+    BEGIN
+        INSERT INTO therapist_search(therapist_search, rowid, name, specialization, bio)
+        SELECT 'delete', old.id, old.name, old.specialization, old.bio WHERE old.role = 'therapist';
+        INSERT INTO therapist_search(rowid, name, specialization, bio)
+        SELECT new.id, new.name, new.specialization, new.bio WHERE new.role = 'therapist';
+    END
+    """,
+)
+
+POSTGRESQL_DDL = (
+    """
+    ALTER TABLE users ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(specialization, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(bio, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_users_search_vector ON users USING gin (search_vector)",
+)
+
+
+def install_search_index(connection):
+    """Create the full-text structures for the connection's dialect"""
+    statements = {
+        'sqlite': SQLITE_DDL,
+        'postgresql': POSTGRESQL_DDL
+    }.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(User.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+
+@event.listens_for(User.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS therapist_search')
+
+
+def _fts5_query(text):
+    """Turn free text into an FTS5 query of quoted prefix terms"""
+    terms = re.findall(r'\w+', text, re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_therapists(query, text, dialect_name):
+    """Restrict a query over users to matches for text, ordered by relevance"""
+    if dialect_name == 'sqlite':
+        match = _fts5_query(text)
+        if not match:
+            return query.filter(sa.false())
+        search = sa.table('therapist_search', sa.column('rowid'))
+        rank = sa.func.bm25(sa.literal_column('therapist_search'), *WEIGHTS)
+        return (
+            query.join(search, search.c.rowid == User.id)
+            .filter(sa.literal_column('therapist_search').op('MATCH')(match))
+            .order_by(rank, User.id)
+        )
+
+    if dialect_name == 'postgresql':
+        vector = sa.literal_column('users.search_vector')
+        tsquery = sa.func.websearch_to_tsquery('english', text)
+        return (
+            query.filter(vector.op('@@')(tsquery))
+            .order_by(sa.func.ts_rank_cd(vector, tsquery).desc(), User.id)
+        )
+
+    # No full-text support: fall back to substring matching without ranking
+    logger.warning(f"Full-text search not available for dialect {dialect_name}, using LIKE")
+    pattern = f'%{text}%'
+    return query.filter(sa.or_(
+        User.name.ilike(pattern), User.specialization.ilike(pattern), User.bio.ilike(pattern)
+    )).order_by(User.id)
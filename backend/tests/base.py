@@ -0,0 +1,47 @@
+"""Shared helpers for tests that exercise the Flask application"""
+import os
+import sys
+import unittest
+
+# Add the project root to the Python path so the backend package is importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# The donation blueprint builds a Stripe service at import time
+os.environ.setdefault('STRIPE_SECRET_KEY', 'sk_test_dummy')
+
+# Keep test processes from relaying appointment and donation events to each other
+os.environ.setdefault('APPOINTMENT_EVENTS_RELAY', 'false')
+os.environ.setdefault('DONATION_EVENTS_RELAY', 'false')
+
+from backend import create_app
+from backend.extensions import db
+from backend.services.therapist_index import therapist_index
+from backend.utils.auth import identity_cache
+
+
+class AppTestCase(unittest.TestCase):
+    """Base test case with an application and a fresh in-memory database"""
+
+    config = {}
+
+    def setUp(self):
+        config = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'JWT_SECRET_KEY': 'test-secret'
+        }
+        config.update(self.config)
+        self.app = create_app(config)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        # Per-worker caches outlive the in-memory database between tests
+        identity_cache.clear()
+        therapist_index.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
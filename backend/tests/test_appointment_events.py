@@ -0,0 +1,184 @@
+import os
+import json
+import queue
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from unittest import mock
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Appointment
+from backend.api.v1 import appointment as appointment_api
+from backend.services.appointment_events import broker, DatagramRelay
+from backend.utils.auth import create_user_token
+
+
+class TestAppointmentEvents(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        self.patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.therapist, self.patient])
+        db.session.flush()
+        self.appointment = Appointment(
+            therapist_id=self.therapist.id, patient_id=self.patient.id,
+            date=datetime(2026, 11, 2, 9), duration=60
+        )
+        db.session.add(self.appointment)
+        db.session.commit()
+
+    def _subscribe(self, user_id):
+        subscription = broker.subscribe(user_id)
+        self.addCleanup(broker.unsubscribe, user_id, subscription)
+        return subscription
+
+    def test_commits_notify_both_participants(self):
+        """Each participant's subscribers receive the committed change"""
+        patient_queue = self._subscribe(self.patient.id)
+        therapist_queue = self._subscribe(self.therapist.id)
+        outsider_queue = self._subscribe(12345)
+
+        self.appointment.status = 'accepted'
+        db.session.commit()
+
+        for subscription in (patient_queue, therapist_queue):
+            data = subscription.get_nowait()
+            self.assertEqual((data['id'], data['status']), (self.appointment.id, 'accepted'))
+        self.assertTrue(outsider_queue.empty())
+
+    def test_rollback_publishes_nothing(self):
+        """Uncommitted changes are never pushed"""
+        subscription = self._subscribe(self.patient.id)
+        self.appointment.status = 'declined'
+        db.session.flush()
+        db.session.rollback()
+        self.assertTrue(subscription.empty())
+
+    def test_bulk_update_is_published(self):
+        """Bulk status changes are pushed like single ones"""
+        subscription = self._subscribe(self.patient.id)
+        headers = {'Authorization': f'Bearer {create_user_token(self.therapist)}'}
+        self.client.put('/api/v1/appointments/status', json={
+            'updates': [{'id': self.appointment.id, 'status': 'declined'}]
+        }, headers=headers)
+        self.assertEqual(subscription.get_nowait()['status'], 'declined')
+
+    def _stream_url(self, user):
+        response = self.client.post('/api/v1/appointments/stream/token',
+                                    headers={'Authorization': f'Bearer {create_user_token(user)}'})
+        self.assertEqual(response.status_code, 200)
+        return f"/api/v1/appointments/stream?token={response.get_json()['token']}"
+
+    def test_stream(self):
+        """The SSE endpoint authenticates with a stream token and emits events"""
+        response = self.client.get(self._stream_url(self.patient), buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(broker.subscriber_count(), 1)
+
+        self.appointment.status = 'accepted'
+        db.session.commit()
+
+        chunks = (chunk.decode() for chunk in response.response)
+        self.assertTrue(next(chunks).startswith('retry:'))
+        message = next(chunks)
+        self.assertTrue(message.startswith('event: appointment\n'))
+        data = json.loads(message.split('data: ', 1)[1])
+        self.assertEqual(data['status'], 'accepted')
+
+        response.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_stream_requires_token(self):
+        self.assertEqual(self.client.get('/api/v1/appointments/stream').status_code, 401)
+        self.assertEqual(self.client.post('/api/v1/appointments/stream/token').status_code, 401)
+
+    def test_stream_tokens_are_scoped(self):
+        """Access tokens never work in the URL, and stream tokens work nowhere else"""
+        access_token = create_user_token(self.patient)
+        for query in (f'jwt={access_token}', f'token={access_token}'):
+            self.assertEqual(self.client.get(f'/api/v1/appointments/stream?{query}').status_code, 401)
+
+        stream_token = self._stream_url(self.patient).split('token=', 1)[1]
+        response = self.client.get('/api/v1/appointments', headers={'Authorization': f'Bearer {stream_token}'})
+        self.assertIn(response.status_code, (401, 422))
+
+    def test_stream_tokens_expire(self):
+        url = self._stream_url(self.patient)
+        with mock.patch.object(appointment_api, 'STREAM_TOKEN_TTL', -1):
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_stream_cap(self):
+        """Streams beyond the per-worker cap are refused until one closes"""
+        url = self._stream_url(self.patient)
+        with mock.patch.object(appointment_api, 'open_streams', threading.BoundedSemaphore(1)):
+            first = self.client.get(url, buffered=False)
+            self.assertEqual(first.status_code, 200)
+
+            refused = self.client.get(url, buffered=False)
+            self.assertEqual(refused.status_code, 503)
+            self.assertIn('Retry-After', refused.headers)
+            self.assertEqual(broker.subscriber_count(), 1)
+
+            # Closing before any chunk was read still frees the slot
+            first.close()
+            self.assertEqual(broker.subscriber_count(), 0)
+            second = self.client.get(url, buffered=False)
+            self.assertEqual(second.status_code, 200)
+            second.close()
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets required')
+class TestDatagramRelay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_events_reach_other_workers(self):
+        """Broadcasts arrive at other relays and stale sockets are pruned"""
+        received = queue.Queue()
+        listener = DatagramRelay(self.directory, received.put)
+        listener.start()
+        self.addCleanup(listener.stop)
+
+        # A socket left behind by a worker that has exited
+        stale_path = f'{self.directory}/99999999.sock'
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        DatagramRelay(self.directory, None).broadcast({'id': 1, 'status': 'accepted'})
+        self.assertEqual(received.get(timeout=2), {'id': 1, 'status': 'accepted'})
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_creates_private_directory(self):
+        directory = os.path.join(self.directory, 'events')
+        relay = DatagramRelay(directory, None)
+        relay.start()
+        self.addCleanup(relay.stop)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_refuses_shared_directory(self):
+        """A directory other users can write to is never bound to or sent into"""
+        os.chmod(self.directory, 0o777)
+        received = queue.Queue()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        listener.bind(f'{self.directory}/1.sock')
+        self.addCleanup(listener.close)
+
+        relay = DatagramRelay(self.directory, received.put)
+        relay.start()
+        relay.broadcast({'id': 1})
+        self.assertEqual(os.listdir(self.directory), ['1.sock'])
+        listener.setblocking(False)
+        self.assertRaises(BlockingIOError, listener.recv, 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
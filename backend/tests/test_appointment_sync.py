@@ -0,0 +1,91 @@
+import unittest
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Appointment
+from backend.utils.auth import create_user_token
+
+
+class TestAppointmentSync(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, patient])
+        db.session.commit()
+        self.therapist_id = therapist.id
+        self.patient = {'Authorization': f'Bearer {create_user_token(patient)}'}
+        self.therapist = {'Authorization': f'Bearer {create_user_token(therapist)}'}
+
+    def _book(self, day, **extra):
+        response = self.client.post('/api/v1/appointments', json=dict(
+            therapist_id=self.therapist_id, date=f'2026-11-{day:02d}T09:00', duration=60, **extra
+        ), headers=self.patient)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def _sync(self, cursor='', headers=None):
+        response = self.client.get(f'/api/v1/appointments/sync?cursor={cursor}', headers=headers or self.patient)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_only_changes_after_cursor(self):
+        """A sync after the last cursor returns just the new writes"""
+        first = self._book(2)['appointment']['id']
+        self._book(3)
+        data = self._sync()
+        self.assertEqual(len(data['changes']), 2)
+        cursor = data['cursor']
+
+        self.assertEqual(self._sync(cursor), {'changes': [], 'tombstones': [], 'cursor': cursor, 'has_more': False})
+
+        self.client.put(f'/api/v1/appointments/{first}/status', json={'status': 'accepted'}, headers=self.therapist)
+        data = self._sync(cursor)
+        self.assertEqual([(a['id'], a['status']) for a in data['changes']], [(first, 'accepted')])
+        self.assertGreater(int(data['cursor']), int(cursor))
+
+    def test_cancellations_are_tombstones(self):
+        """Cancelled and declined appointments come back as tombstones"""
+        first = self._book(2)['appointment']['id']
+        second = self._book(3)['appointment']['id']
+        cursor = self._sync()['cursor']
+
+        self.assertEqual(self.client.post(f'/api/v1/appointments/{first}/cancel', headers=self.patient).status_code, 200)
+        self.client.put('/api/v1/appointments/status', json={
+            'updates': [{'id': second, 'status': 'declined'}]
+        }, headers=self.therapist)
+
+        data = self._sync(cursor, headers=self.therapist)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual([(t['id'], t['status']) for t in data['tombstones']], [(first, 'cancelled'), (second, 'declined')])
+
+        # Cancelling twice is refused
+        self.assertEqual(self.client.post(f'/api/v1/appointments/{first}/cancel', headers=self.patient).status_code, 400)
+
+    def test_bulk_writes_advance_the_sequence(self):
+        """Series inserts get distinct, increasing sequence numbers"""
+        cursor = self._sync()['cursor']
+        self._book(2, recurrence={'frequency': 'weekly', 'count': 3})
+        data = self._sync(cursor)
+        sequence = [a['change_seq'] for a in data['changes']]
+        self.assertEqual(len(sequence), 3)
+        self.assertEqual(sequence, sorted(set(sequence)))
+        self.assertTrue(all(a['updated_at'] for a in data['changes']))
+
+    def test_unchanged_flush_does_not_bump(self):
+        """Touching a row without changing it leaves its sequence alone"""
+        appointment_id = self._book(2)['appointment']['id']
+        appointment = db.session.get(Appointment, appointment_id)
+        before = appointment.change_seq
+        appointment.status = appointment.status
+        db.session.commit()
+        self.assertEqual(db.session.get(Appointment, appointment_id).change_seq, before)
+
+    def test_invalid_cursor(self):
+        """Non-numeric cursors are rejected"""
+        response = self.client.get('/api/v1/appointments/sync?cursor=abc', headers=self.patient)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
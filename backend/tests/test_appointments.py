@@ -0,0 +1,445 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from tests.base import AppTestCase
+from backend.api.v1 import appointment as appointment_api
+from backend.extensions import db
+from backend.models import User, Appointment, SlotHold
+from backend.services.booking import reap_expired_holds, _serialize_bookings, BOOKING_LOCK_NAMESPACE
+from backend.utils.auth import create_user_token, identity_cache
+
+
+class TestAppointmentListing(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        db.session.add(self.therapist)
+        db.session.commit()
+        self.therapist_id = self.therapist.id
+        self.headers = {'Authorization': f'Bearer {create_user_token(self.therapist)}'}
+        self.patients = 0
+
+    def _book(self, count):
+        for _ in range(count):
+            self.patients += 1
+            patient = User(
+                name=f'Patient {self.patients}', email=f'patient{self.patients}@example.com',
+                password_hash='x', role='patient'
+            )
+            db.session.add(patient)
+            db.session.flush()
+            db.session.add(Appointment(
+                therapist_id=self.therapist_id, patient_id=patient.id,
+                date=datetime(2026, 1, 1, 9) + timedelta(days=self.patients), duration=60
+            ))
+        db.session.commit()
+
+    def _count_statements(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # Start from empty caches so nothing is served from earlier loads
+        db.session.expunge_all()
+        identity_cache.clear()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get('/api/v1/appointments', headers=self.headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        return len(response.get_json()['appointments']), len(statements)
+
+    def test_statement_count_is_constant(self):
+        """Listing more appointments does not issue more queries"""
+        self._book(2)
+        rows, few = self._count_statements()
+        self.assertEqual(rows, 2)
+
+        self._book(10)
+        rows, many = self._count_statements()
+        self.assertEqual(rows, 12)
+        self.assertEqual(many, few)
+
+
+class TestAppointmentFilters(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, patient])
+        db.session.flush()
+        statuses = ['pending', 'accepted', 'declined', 'accepted', 'completed']
+        db.session.add_all([
+            Appointment(
+                therapist_id=therapist.id, patient_id=patient.id,
+                date=datetime(2026, 3, 1 + i, 9), duration=60, status=status
+            )
+            for i, status in enumerate(statuses)
+        ])
+        # Two sessions at the same time exercise the id tie-breaker
+        db.session.add(Appointment(
+            therapist_id=therapist.id, patient_id=patient.id,
+            date=datetime(2026, 3, 3, 9), duration=60, status='pending'
+        ))
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_user_token(therapist)}'}
+
+    def _get(self, query=''):
+        response = self.client.get(f'/api/v1/appointments?{query}', headers=self.headers)
+        return response.status_code, response.get_json()
+
+    def test_keyset_pagination(self):
+        """Pages follow (date, id) order without gaps or repeats"""
+        seen, cursor = [], None
+        while True:
+            _, data = self._get('limit=2' + (f'&cursor={cursor}' if cursor else ''))
+            seen.extend((a['date'], a['id']) for a in data['appointments'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_date_range_and_status(self):
+        """from is inclusive, to is exclusive and status accepts a list"""
+        _, data = self._get('from=2026-03-02&to=2026-03-04')
+        self.assertEqual(len(data['appointments']), 3)
+
+        _, data = self._get('status=accepted,completed')
+        self.assertEqual(sorted(a['status'] for a in data['appointments']), ['accepted', 'accepted', 'completed'])
+
+    def test_invalid_filters(self):
+        """Malformed filters are rejected"""
+        for query in ('from=yesterday', 'status=lost', 'cursor=abc', 'limit=0'):
+            status, _ = self._get(query)
+            self.assertEqual(status, 400, query)
+
+
+class TestBooking(AppTestCase):
+    def setUp(self):
+        # Concurrent requests need a database shared across connections
+        self.tmpdir = tempfile.mkdtemp()
+        self.config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(self.tmpdir, "booking.db")}'}
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        super().setUp()
+
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        patients = [
+            User(name=f'Patient {i}', email=f'patient{i}@example.com', password_hash='x', role='patient')
+            for i in range(8)
+        ]
+        db.session.add_all([therapist] + patients)
+        db.session.commit()
+        self.therapist_id = therapist.id
+        self.tokens = [create_user_token(patient) for patient in patients]
+
+    def _book(self, token, date, duration=60, client=None):
+        return (client or self.client).post(
+            '/api/v1/appointments',
+            json={'therapist_id': self.therapist_id, 'date': date, 'duration': duration},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+
+    def test_overlaps_are_rejected(self):
+        """Overlapping sessions conflict; adjacent and cancelled ones do not"""
+        self.assertEqual(self._book(self.tokens[0], '2026-11-02T09:00').status_code, 201)
+        self.assertEqual(self._book(self.tokens[1], '2026-11-02T09:30').status_code, 409)
+        self.assertEqual(self._book(self.tokens[1], '2026-11-02T08:30').status_code, 409)
+        self.assertEqual(self._book(self.tokens[1], '2026-11-02T10:00').status_code, 201)
+
+        Appointment.query.filter_by(date=datetime(2026, 11, 2, 9)).update({'status': 'cancelled'})
+        db.session.commit()
+        self.assertEqual(self._book(self.tokens[2], '2026-11-02T09:00').status_code, 201)
+
+    def test_invalid_booking(self):
+        """Malformed dates and durations are rejected"""
+        self.assertEqual(self._book(self.tokens[0], 'tomorrow').status_code, 400)
+        self.assertEqual(self._book(self.tokens[0], '2026-11-02T09:00', duration=0).status_code, 400)
+        # Too long, including durations that would overflow datetime
+        self.assertEqual(self._book(self.tokens[0], '2026-11-02T09:00', duration=481).status_code, 400)
+        self.assertEqual(self._book(self.tokens[0], '2026-11-02T09:00', duration=10 ** 12).status_code, 400)
+
+    def test_parallel_bookings_for_one_slot(self):
+        """Exactly one of many simultaneous requests for a slot succeeds"""
+        barrier = threading.Barrier(len(self.tokens))
+
+        def attempt(token):
+            client = self.app.test_client()
+            barrier.wait()
+            return self._book(token, '2026-11-03T14:00', client=client).status_code
+
+        with ThreadPoolExecutor(max_workers=len(self.tokens)) as executor:
+            statuses = list(executor.map(attempt, self.tokens))
+
+        self.assertEqual(sorted(statuses), [201] + [409] * (len(self.tokens) - 1))
+        db.session.expire_all()
+        self.assertEqual(Appointment.query.count(), 1)
+
+
+class TestBookingLocks(unittest.TestCase):
+    def _session(self, dialect):
+        session = mock.Mock()
+        session.connection.return_value.dialect.name = dialect
+        return session, session.connection.return_value
+
+    def test_postgresql_locks_the_therapist(self):
+        """Holds and bookings for one therapist queue on an advisory lock"""
+        session, connection = self._session('postgresql')
+        _serialize_bookings(session, 42)
+        statement, params = connection.execute.call_args[0]
+        self.assertIn('pg_advisory_xact_lock', str(statement))
+        self.assertEqual(params, {'namespace': BOOKING_LOCK_NAMESPACE, 'therapist_id': 42})
+
+    def test_other_databases_lock_the_therapist_row(self):
+        session, connection = self._session('mysql')
+        _serialize_bookings(session, 42)
+        self.assertIn('FOR UPDATE', str(connection.execute.call_args[0][0]))
+
+
+class TestRecurringSeries(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, patient])
+        db.session.flush()
+        # Existing session clashing with the third weekly occurrence
+        db.session.add(Appointment(
+            therapist_id=therapist.id, patient_id=patient.id, date=datetime(2026, 11, 16, 9, 30), duration=60
+        ))
+        db.session.commit()
+        self.therapist_id = therapist.id
+        self.headers = {'Authorization': f'Bearer {create_user_token(patient)}'}
+
+    def _book_series(self, frequency='weekly', count=4, **extra):
+        return self.client.post('/api/v1/appointments', json=dict(
+            therapist_id=self.therapist_id, date='2026-11-02T09:00', duration=60,
+            recurrence={'frequency': frequency, 'count': count}, **extra
+        ), headers=self.headers)
+
+    def test_conflicts_reject_the_series(self):
+        """Clashing occurrences are reported and nothing is booked"""
+        response = self._book_series()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['conflicts'], ['2026-11-16T09:00:00'])
+        self.assertEqual(Appointment.query.count(), 1)
+
+    def test_skip_conflicts(self):
+        """Free occurrences are booked in one INSERT when conflicts are skipped"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self._book_series(skip_conflicts=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertEqual(
+            [a['date'] for a in data['appointments']],
+            ['2026-11-02T09:00:00', '2026-11-09T09:00:00', '2026-11-23T09:00:00']
+        )
+        self.assertEqual(data['conflicts'], ['2026-11-16T09:00:00'])
+        self.assertEqual({a['series_id'] for a in data['appointments']}, {data['series_id']})
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO appointments')]), 1)
+
+    def test_biweekly(self):
+        """Biweekly series skip every other week"""
+        Appointment.query.update({'status': 'cancelled'})
+        db.session.commit()
+        response = self._book_series('biweekly', 3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [a['date'][:10] for a in response.get_json()['appointments']],
+            ['2026-11-02', '2026-11-16', '2026-11-30']
+        )
+        self.assertTrue(all(a.ends_at for a in Appointment.query))
+
+    def test_invalid_recurrence(self):
+        """Unknown rules and out-of-range counts are rejected"""
+        self.assertEqual(self._book_series('daily').status_code, 400)
+        self.assertEqual(self._book_series(count=0).status_code, 400)
+        self.assertEqual(self._book_series(count=53).status_code, 400)
+
+    def test_occurrences_cannot_overlap_each_other(self):
+        """A series is refused when each occurrence would run into the next"""
+        before = Appointment.query.count()
+        with mock.patch.object(appointment_api, 'MAX_DURATION_MINUTES', 10 ** 6):
+            response = self.client.post('/api/v1/appointments', json=dict(
+                therapist_id=self.therapist_id, date='2026-11-02T09:00', duration=7 * 24 * 60,
+                recurrence={'frequency': 'weekly', 'count': 2}
+            ), headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('interval', response.get_json()['error'])
+        self.assertEqual(Appointment.query.count(), before)
+
+
+class TestBulkStatusUpdate(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        other = User(name='Dr Olu', email='olu@example.com', password_hash='x', role='therapist')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, other, patient])
+        db.session.flush()
+        appointments = [
+            Appointment(therapist_id=owner.id, patient_id=patient.id, date=datetime(2026, 11, day, 9), duration=60)
+            for day, owner in ((2, therapist), (3, therapist), (4, therapist), (5, other))
+        ]
+        db.session.add_all(appointments)
+        db.session.commit()
+        self.ids = [appointment.id for appointment in appointments]
+        self.headers = {'Authorization': f'Bearer {create_user_token(therapist)}'}
+
+    def test_results_per_id(self):
+        """Owned appointments are updated; others are reported, not touched"""
+        mine, also_mine, bad_status, theirs = self.ids
+        response = self.client.put('/api/v1/appointments/status', json={'updates': [
+            {'id': mine, 'status': 'accepted'},
+            {'id': also_mine, 'status': 'declined'},
+            {'id': bad_status, 'status': 'completed'},
+            {'id': theirs, 'status': 'accepted'},
+            {'id': 9999, 'status': 'accepted'},
+        ]}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        results = {r['id']: r['result'] for r in response.get_json()['results']}
+        self.assertEqual(results, {
+            mine: 'updated', also_mine: 'updated', bad_status: 'invalid_status',
+            theirs: 'not_found', 9999: 'not_found'
+        })
+
+        db.session.expire_all()
+        statuses = {a.id: a.status for a in Appointment.query}
+        self.assertEqual(
+            [statuses[i] for i in self.ids], ['accepted', 'declined', 'pending', 'pending']
+        )
+
+    def test_only_pending_appointments_change(self):
+        """Declined or cancelled appointments cannot be made active again"""
+        declined, cancelled = self.ids[:2]
+        self.client.put(f'/api/v1/appointments/{declined}/status', json={'status': 'declined'}, headers=self.headers)
+        db.session.get(Appointment, cancelled).status = 'cancelled'
+        db.session.commit()
+
+        response = self.client.put(f'/api/v1/appointments/{declined}/status', json={'status': 'accepted'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.put('/api/v1/appointments/status', json={'updates': [
+            {'id': declined, 'status': 'accepted'},
+            {'id': cancelled, 'status': 'accepted'},
+        ]}, headers=self.headers)
+        self.assertEqual(
+            {(r['id'], r['result'], r['status']) for r in response.get_json()['results']},
+            {(declined, 'not_pending', 'declined'), (cancelled, 'not_pending', 'cancelled')}
+        )
+
+        db.session.expire_all()
+        self.assertEqual([db.session.get(Appointment, i).status for i in (declined, cancelled)], ['declined', 'cancelled'])
+
+    def test_single_update_statement(self):
+        """The batch costs one ownership query and one UPDATE"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.put('/api/v1/appointments/status', json={
+                'updates': [{'id': i, 'status': 'accepted'} for i in self.ids[:3]]
+            }, headers=self.headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len([s for s in statements if s.startswith('UPDATE appointments')]), 1)
+        self.assertEqual(len([s for s in statements if 'FROM appointments' in s]), 1)
+
+    def test_invalid_payload(self):
+        """Missing or malformed update lists are rejected"""
+        for payload in ({}, {'updates': []}, {'updates': [{'status': 'accepted'}]}):
+            response = self.client.put('/api/v1/appointments/status', json=payload, headers=self.headers)
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class TestSlotHolds(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        alice = User(name='Alice', email='alice@example.com', password_hash='x', role='patient')
+        bob = User(name='Bob', email='bob@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, alice, bob])
+        db.session.commit()
+        self.therapist_id = therapist.id
+        self.alice = {'Authorization': f'Bearer {create_user_token(alice)}'}
+        self.bob = {'Authorization': f'Bearer {create_user_token(bob)}'}
+
+    def _hold(self, headers, date='2026-11-02T09:00'):
+        return self.client.post(
+            '/api/v1/appointments/holds',
+            json={'therapist_id': self.therapist_id, 'date': date, 'duration': 60},
+            headers=headers
+        )
+
+    def test_hold_blocks_others_until_confirmed(self):
+        """A held slot cannot be held or booked by another patient"""
+        response = self._hold(self.alice)
+        self.assertEqual(response.status_code, 201)
+        hold_id = response.get_json()['hold']['id']
+
+        self.assertEqual(self._hold(self.bob, '2026-11-02T09:30').status_code, 409)
+        booking = self.client.post(
+            '/api/v1/appointments',
+            json={'therapist_id': self.therapist_id, 'date': '2026-11-02T09:00', 'duration': 60},
+            headers=self.bob
+        )
+        self.assertEqual(booking.status_code, 409)
+
+        # Only the holder can confirm
+        self.assertEqual(self.client.post(f'/api/v1/appointments/holds/{hold_id}/confirm', headers=self.bob).status_code, 404)
+        response = self.client.post(f'/api/v1/appointments/holds/{hold_id}/confirm', headers=self.alice)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['appointment']['date'], '2026-11-02T09:00:00')
+        self.assertEqual(SlotHold.query.count(), 0)
+
+    def test_release_frees_the_slot(self):
+        """Released holds no longer block the slot"""
+        hold_id = self._hold(self.alice).get_json()['hold']['id']
+        self.assertEqual(self.client.delete(f'/api/v1/appointments/holds/{hold_id}', headers=self.alice).status_code, 200)
+        self.assertEqual(self._hold(self.bob).status_code, 201)
+
+    def test_expired_holds(self):
+        """Expired holds cannot be confirmed, do not block and are reaped in batches"""
+        hold_id = self._hold(self.alice).get_json()['hold']['id']
+        SlotHold.query.update({'expires_at': datetime.utcnow() - timedelta(minutes=1)})
+        db.session.commit()
+
+        self.assertEqual(self.client.post(f'/api/v1/appointments/holds/{hold_id}/confirm', headers=self.alice).status_code, 404)
+        self.assertEqual(self._hold(self.bob, '2026-11-02T09:00').status_code, 201)
+        for hour in (11, 12, 13):
+            self._hold(self.bob, f'2026-11-02T{hour}:00')
+
+        SlotHold.query.update({'expires_at': datetime.utcnow() - timedelta(minutes=1)})
+        db.session.commit()
+        self.assertEqual(reap_expired_holds(batch_size=2), 5)
+        self.assertEqual(SlotHold.query.count(), 0)
+
+    def test_reap_command(self):
+        """The CLI reaper is registered on the app"""
+        result = self.app.test_cli_runner().invoke(args=['reap-holds', '--batch-size', '10'])
+        self.assertIn('Removed 0 expired holds', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
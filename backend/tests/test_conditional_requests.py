@@ -0,0 +1,75 @@
+import unittest
+
+from tests.base import AppTestCase
+from tests.test_therapist_directory import make_therapist
+from backend.extensions import db
+from backend.models import User
+from backend.utils.auth import create_user_token
+
+
+class TestTherapistProfileETags(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = make_therapist(1)
+        db.session.add(self.therapist)
+        db.session.commit()
+        self.url = f'/api/v1/therapist/therapist/{self.therapist.id}'
+        self.auth = {'Authorization': f'Bearer {create_user_token(self.therapist)}'}
+
+    def test_profile_not_modified(self):
+        """A matching If-None-Match returns 304 with no body"""
+        first = self.client.get(self.url)
+        etag = first.headers['ETag']
+
+        second = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+    def test_etag_changes_on_update(self):
+        """Updating the row bumps its version and therefore its ETag"""
+        etag = self.client.get(self.url).headers['ETag']
+        self.therapist.bio = 'Updated'
+        db.session.commit()
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_put_with_stale_if_match_fails(self):
+        """Concurrent edits based on an old version are rejected"""
+        etag = self.client.get('/api/v1/therapist/therapist/profile', headers=self.auth).headers['ETag']
+
+        ok = self.client.put('/api/v1/therapist/therapist/profile', json={'bio': 'First'},
+                             headers={**self.auth, 'If-Match': etag})
+        stale = self.client.put('/api/v1/therapist/therapist/profile', json={'bio': 'Second'},
+                                headers={**self.auth, 'If-Match': etag})
+
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(db.session.get(User, self.therapist.id).bio, 'First')
+
+
+class TestDirectoryETags(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([make_therapist(1), make_therapist(2)])
+        db.session.commit()
+
+    def _assert_revalidates(self, url):
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        therapist = User.query.filter_by(email='therapist2@example.com').first()
+        therapist.hourly_rate = 10.0
+        db.session.commit()
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_indexed_listing(self):
+        self._assert_revalidates('/api/v1/therapist/therapists')
+
+    def test_search_listing(self):
+        self._assert_revalidates('/api/v1/therapist/therapists?q=therapist')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import csv
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from datetime import datetime
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Donation
+from backend.services.donation_export import export_rows, generate_receipts, iter_csv
+from backend.utils.auth import create_user_token
+
+
+class TestDonationExport(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User(name='Ada', email='ada@example.com', password_hash='x', role='admin')
+        self.pat = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        self.sam = User(name='Sam', email='sam@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.admin, self.pat, self.sam])
+        db.session.flush()
+        for user, amount, status, created_at in (
+            (self.pat, 10, 'completed', datetime(2025, 3, 1)),
+            (self.pat, 1234.5, 'completed', datetime(2025, 12, 31, 23)),
+            (self.pat, 99, 'expired', datetime(2025, 6, 1)),
+            (self.sam, 5, 'completed', datetime(2025, 7, 4)),
+            (self.sam, 7, 'completed', datetime(2026, 1, 1)),
+        ):
+            db.session.add(Donation(amount=amount, user_id=user.id, status=status, created_at=created_at,
+                                    transaction_id=f'cs_{user.id}_{created_at:%Y%m%d}'))
+        db.session.commit()
+
+    def test_export_endpoint_streams_csv(self):
+        """Admins get a streamed CSV; other users are refused"""
+        response = self.client.get('/api/v1/donation/donation/export',
+                                   headers={'Authorization': f'Bearer {create_user_token(self.pat)}'})
+        self.assertEqual(response.status_code, 403)
+
+        headers = {'Authorization': f'Bearer {create_user_token(self.admin)}'}
+        response = self.client.get('/api/v1/donation/donation/export?status=completed&to=2026-01-01',
+                                   headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['amount'] for row in rows], ['10.00', '1234.50', '5.00'])
+        self.assertEqual(rows[0]['email'], 'pat@example.com')
+
+        response = self.client.get('/api/v1/donation/donation/export?from=yesterday', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_formulas_are_neutralized(self):
+        """Free-text cells that a spreadsheet would evaluate are prefixed with a quote"""
+        self.sam.name = '=HYPERLINK("http://evil.example","x")'
+        self.pat.name = '-2+3'
+        db.session.commit()
+        names = {row[3] for row in export_rows()}
+        self.assertEqual(names, {"'=HYPERLINK(\"http://evil.example\",\"x\")", "'-2+3"})
+
+    def test_csv_is_chunked(self):
+        """Rows are encoded a batch at a time rather than as one string"""
+        chunks = list(iter_csv(export_rows(batch_size=2), chunk_rows=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(list(csv.reader(io.StringIO(''.join(chunks))))), 6)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'donations.csv')
+            result = self.app.test_cli_runner().invoke(args=['export-donations', '--output', path, '--status', 'expired'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(path) as f:
+                self.assertEqual([row['amount_minor'] for row in csv.DictReader(f)], ['9900'])
+
+    def test_create_admin_command(self):
+        """Admins are created or promoted from the CLI; therapists are not promoted"""
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['create-admin', '--email', 'root@example.com'], input='s3cret\ns3cret\n')
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(User.query.filter_by(email='root@example.com').one().role, 'admin')
+
+        result = runner.invoke(args=['create-admin', '--email', 'sam@example.com'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        response = self.client.get('/api/v1/donation/donation/export',
+                                   headers={'Authorization': f'Bearer {create_user_token(self.sam)}'})
+        self.assertEqual(response.status_code, 200)
+
+        db.session.add(User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist'))
+        db.session.commit()
+        result = runner.invoke(args=['create-admin', '--email', 'tess@example.com'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertEqual(User.query.filter_by(email='tess@example.com').one().role, 'therapist')
+
+    def test_receipts(self):
+        """One receipt per donor with completed donations in the year, totalled"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'receipts.zip')
+            self.assertEqual(generate_receipts(2025, path, workers=2, max_pending=1), 2)
+            with zipfile.ZipFile(path) as archive:
+                self.assertEqual(sorted(archive.namelist()), [
+                    f'receipt-2025-{self.pat.id}.txt', f'receipt-2025-{self.sam.id}.txt'
+                ])
+                receipt = archive.read(f'receipt-2025-{self.pat.id}.txt').decode()
+        self.assertIn('Donor: Pat <pat@example.com>', receipt)
+        self.assertIn('1,244.50', receipt)
+        self.assertNotIn('99.00', receipt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import threading
+import unittest
+
+from tests.base import AppTestCase
+from tests.test_stripe_client import CheckoutStandIn, stripe_stand_in
+from backend.api.v1 import donation as donation_api
+from backend.extensions import db
+from backend.models import User, Donation
+from backend.utils.auth import create_user_token
+from backend.utils.idempotency import IdempotencyCache, IdempotencyKeyInUse
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    def test_concurrent_duplicates_wait_for_the_first(self):
+        """A duplicate arriving mid-flight replays the first response instead of redoing the work"""
+        cache = IdempotencyCache(wait=5)
+        self.assertIsNone(cache.claim('k', 10))
+        replayed = []
+        waiter = threading.Thread(target=lambda: replayed.append(cache.claim('k', 10)))
+        waiter.start()
+        cache.release('k', 10, {'checkout_url': 'u'})
+        waiter.join()
+        self.assertEqual(replayed, [{'checkout_url': 'u'}])
+
+    def test_failed_attempt_is_not_cached(self):
+        """Releasing without a response lets the next request retry"""
+        cache = IdempotencyCache(wait=0.05)
+        self.assertIsNone(cache.claim('k', 10))
+        with self.assertRaises(IdempotencyKeyInUse):
+            cache.claim('k', 10)
+        cache.release('k', 10)
+        self.assertIsNone(cache.claim('k', 10))
+
+
+class TestDonationIdempotency(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = stripe_stand_in(self)
+        original = donation_api.stripe_service
+        donation_api.stripe_service = self.service
+        self.addCleanup(setattr, donation_api, 'stripe_service', original)
+        donation_api.idempotent_donations.clear()
+
+        self.user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        self.other = User(name='Sam', email='sam@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.user, self.other])
+        db.session.commit()
+
+    def donate(self, user, amount=25, key='attempt-1'):
+        headers = {'Authorization': f'Bearer {create_user_token(user)}'}
+        if key:
+            headers['Idempotency-Key'] = key
+        return self.client.post('/api/v1/donation/donation/', json={'amount': amount}, headers=headers)
+
+    def test_replay_skips_stripe_and_database(self):
+        """A repeated key returns the original checkout URL without a new session or row"""
+        first = self.donate(self.user)
+        second = self.donate(self.user)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json()['checkout_url'], first.get_json()['checkout_url'])
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(CheckoutStandIn.clients), 1)
+        self.assertEqual(list(CheckoutStandIn.sessions), [donation_api.stripe_idempotency_key(self.user.id, 'attempt-1')])
+        self.assertEqual(Donation.query.count(), 1)
+
+    def test_replay_in_another_worker(self):
+        """Without the local entry Stripe replays the session and no second row is written"""
+        first = self.donate(self.user)
+        donation_api.idempotent_donations.clear()
+        second = self.donate(self.user)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json()['checkout_url'], first.get_json()['checkout_url'])
+        self.assertEqual(len(CheckoutStandIn.clients), 2)
+        self.assertEqual(Donation.query.count(), 1)
+
+    def test_keys_are_scoped(self):
+        """Keys are per user, a different amount is rejected and requests without a key are not cached"""
+        self.assertEqual(self.donate(self.user).status_code, 200)
+        self.assertEqual(self.donate(self.other).status_code, 200)
+        self.assertEqual(self.donate(self.user, amount=50).status_code, 422)
+        self.assertEqual(self.donate(self.user, key=None).status_code, 200)
+        self.assertEqual(self.donate(self.user, key=None).status_code, 200)
+        self.assertEqual(Donation.query.count(), 4)
+        self.assertEqual(self.donate(self.user, key='x' * 256).status_code, 400)
+
+    def test_longest_key_fits_stripe(self):
+        """The longest accepted key still produces a key Stripe accepts"""
+        key = 'k' * donation_api.MAX_IDEMPOTENCY_KEY_LENGTH
+        first = self.donate(self.user, key=key)
+        self.assertEqual(first.status_code, 200, first.get_json())
+        donation_api.idempotent_donations.clear()
+        self.assertEqual(self.donate(self.user, key=key).get_json()['checkout_url'], first.get_json()['checkout_url'])
+        self.assertEqual(Donation.query.count(), 1)
+
+    def test_failures_are_retried(self):
+        """A failed attempt is not replayed"""
+        CheckoutStandIn.status = 500
+        self.assertEqual(self.donate(self.user).status_code, 400)
+        CheckoutStandIn.status = 200
+        self.assertEqual(self.donate(self.user).status_code, 200)
+        self.assertEqual(Donation.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
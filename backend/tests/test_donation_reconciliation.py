@@ -0,0 +1,167 @@
+import json
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Donation, DonationRollup
+from backend.services.donation_reconciliation import reconcile_pending_donations
+from backend.services.donation_rollups import rebuild_donation_rollups
+from backend.services.stripe_service import StripePaymentService
+from backend.utils.circuit_breaker import CircuitOpen
+
+
+class StripeStandIn(BaseHTTPRequestHandler):
+    """Serves GET /v1/checkout/sessions with Stripe's list pagination"""
+
+    sessions = []
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests.append(query)
+        gte = int(query['created[gte]'][0])
+        lt = int(query['created[lt]'][0])
+        limit = int(query['limit'][0])
+        matching = [s for s in self.sessions if gte <= s['created'] < lt]
+        if 'starting_after' in query:
+            ids = [s['id'] for s in matching]
+            matching = matching[ids.index(query['starting_after'][0]) + 1:]
+
+        body = json.dumps({
+            'object': 'list',
+            'url': url.path,
+            'data': matching[:limit],
+            'has_more': len(matching) > limit
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDonationReconciliation(AppTestCase):
+    NOW = datetime(2026, 10, 18, 12, 0)
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStandIn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.stripe_service = StripePaymentService(api_base=f'http://127.0.0.1:{self.server.server_port}')
+
+        user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add(user)
+        db.session.flush()
+
+        def donate(session_id, minutes_ago, status='pending'):
+            created = self.NOW - timedelta(minutes=minutes_ago)
+            db.session.add(Donation(
+                amount=10, user_id=user.id, status=status, transaction_id=session_id, created_at=created
+            ))
+            return created
+
+        sessions = []
+        for session_id, minutes_ago, stripe_status, payment_status, status in (
+            ('cs_paid', 120, 'complete', 'paid', 'pending'),
+            ('cs_expired', 90, 'expired', 'unpaid', 'pending'),
+            ('cs_open', 60, 'open', 'unpaid', 'pending'),
+            ('cs_recent', 5, 'complete', 'paid', 'pending'),
+            ('cs_done', 100, 'complete', 'paid', 'completed'),
+        ):
+            created = donate(session_id, minutes_ago, status)
+            sessions.append({
+                'id': session_id, 'object': 'checkout.session', 'status': stripe_status,
+                'payment_status': payment_status,
+                'created': int(created.replace(tzinfo=timezone.utc).timestamp()) - 1
+            })
+        # Sessions from other integrations on the same account are ignored
+        sessions += [
+            {'id': f'cs_other_{i}', 'object': 'checkout.session', 'status': 'complete', 'payment_status': 'paid',
+             'created': sessions[0]['created'] + i}
+            for i in range(4)
+        ]
+        db.session.commit()
+        StripeStandIn.sessions = sorted(sessions, key=lambda s: -s['created'])
+        StripeStandIn.requests = []
+
+    def test_reconciles_stale_pending_donations(self):
+        """Stale pending donations take the status of their sessions"""
+        summary = reconcile_pending_donations(
+            older_than=timedelta(minutes=30), concurrency=3, page_size=2, now=self.NOW,
+            stripe_service=self.stripe_service
+        )
+        self.assertEqual(summary, {'completed': 1, 'expired': 1})
+
+        db.session.expire_all()
+        statuses = {d.transaction_id: d.status for d in Donation.query}
+        self.assertEqual(statuses, {
+            'cs_paid': 'completed', 'cs_expired': 'expired', 'cs_open': 'pending',
+            'cs_recent': 'pending', 'cs_done': 'completed'
+        })
+        # The bulk update moves the rollups exactly as a rebuild would
+        rollups = {(r.period, r.period_start, r.status): (r.total_minor, r.count)
+                   for r in DonationRollup.query if r.count}
+        rebuild_donation_rollups()
+        self.assertEqual(rollups, {(r.period, r.period_start, r.status): (r.total_minor, r.count)
+                                   for r in DonationRollup.query})
+        # Small pages force several requests per time slice
+        self.assertGreater(len(StripeStandIn.requests), 3)
+        self.assertTrue(any('starting_after' in query for query in StripeStandIn.requests))
+
+    def test_batches(self):
+        """Reading pending donations one at a time gives the same result"""
+        summary = reconcile_pending_donations(
+            older_than=timedelta(minutes=30), concurrency=2, now=self.NOW,
+            stripe_service=self.stripe_service, batch_size=1
+        )
+        self.assertEqual(summary, {'completed': 1, 'expired': 1})
+
+    def test_failed_slices_are_reported(self):
+        """A slice whose listing fails is counted, and the other slices still apply"""
+        service = self.stripe_service
+        paid_at = next(s['created'] for s in StripeStandIn.sessions if s['id'] == 'cs_paid')
+
+        class FailingNearPaid:
+            def iter_checkout_sessions(self, created, page_size=100):
+                if created[0] <= paid_at < created[1]:
+                    raise CircuitOpen('stripe', 30)
+                return service.iter_checkout_sessions(created, page_size)
+
+        summary = reconcile_pending_donations(
+            older_than=timedelta(minutes=30), concurrency=2, now=self.NOW,
+            stripe_service=FailingNearPaid(), batch_size=1
+        )
+        self.assertGreater(summary.pop('failed_slices'), 0)
+        self.assertEqual(summary, {'expired': 1})
+        db.session.expire_all()
+        self.assertEqual(Donation.query.filter_by(transaction_id='cs_paid').one().status, 'pending')
+
+    def test_nothing_pending(self):
+        """No Stripe calls are made when nothing is stale"""
+        self.assertEqual(reconcile_pending_donations(
+            older_than=timedelta(days=1), now=self.NOW, stripe_service=self.stripe_service
+        ), {})
+        self.assertEqual(StripeStandIn.requests, [])
+
+    def test_unique_transaction_id(self):
+        """Session ids cannot be recorded twice"""
+        from sqlalchemy.exc import IntegrityError
+        db.session.add(Donation(amount=5, user_id=1, status='pending', transaction_id='cs_paid'))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+from tests.base import AppTestCase
+from backend.api.v1 import donation as donation_api
+from backend.extensions import db
+from backend.models import User, Donation, DonationRollup
+from backend.models.donation_rollup import ALL_TIME
+from backend.services.donation_rollups import campaign_progress, rebuild_donation_rollups
+
+
+def rollup_snapshot():
+    """Non-empty rollup rows keyed by (period, period_start, status)"""
+    return {
+        (r.period, r.period_start, r.status): (r.total_minor, r.count)
+        for r in DonationRollup.query if r.total_minor or r.count
+    }
+
+
+class TestDonationRollups(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        donation_api.campaign_cache.clear()
+        self.user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add(self.user)
+        db.session.flush()
+        self.donations = [
+            Donation(amount=amount, user_id=self.user.id, status=status, created_at=created_at)
+            for amount, status, created_at in (
+                (10, 'completed', datetime(2026, 9, 30, 23, 59)),
+                (20.5, 'completed', datetime(2026, 10, 18, 9)),
+                (30, 'pending', datetime(2026, 10, 18, 10)),
+                (40, 'pending', datetime(2026, 10, 17)),
+            )
+        ]
+        db.session.add_all(self.donations)
+        db.session.commit()
+
+    def test_rollups_follow_every_write(self):
+        """Inserts, status changes and deletes keep the rollups equal to a full rebuild"""
+        snapshot = rollup_snapshot()
+        self.assertEqual(snapshot[('all', ALL_TIME, 'completed')], (3050, 2))
+        self.assertEqual(snapshot[('month', date(2026, 10, 1), 'completed')], (2050, 1))
+        self.assertEqual(snapshot[('day', date(2026, 9, 30), 'completed')], (1000, 1))
+        self.assertEqual(snapshot[('all', ALL_TIME, 'pending')], (7000, 2))
+
+        self.donations[2].status = 'completed'
+        self.donations[3].status = 'expired'
+        db.session.delete(self.donations[0])
+        db.session.commit()
+        snapshot = rollup_snapshot()
+        self.assertEqual(snapshot[('all', ALL_TIME, 'completed')], (5050, 2))
+        self.assertEqual(snapshot[('day', date(2026, 10, 18), 'completed')], (5050, 2))
+        self.assertNotIn(('all', ALL_TIME, 'pending'), snapshot)
+
+        rebuild_donation_rollups()
+        self.assertEqual(rollup_snapshot(), snapshot)
+
+    def test_rolled_back_writes_are_not_counted(self):
+        """Rollups change in the same transaction as the donation"""
+        before = rollup_snapshot()
+        self.donations[2].status = 'completed'
+        db.session.flush()
+        self.assertNotEqual(rollup_snapshot(), before)
+        db.session.rollback()
+        self.assertEqual(rollup_snapshot(), before)
+
+    def test_campaign_progress(self):
+        with mock.patch.dict(os.environ, {'DONATION_CAMPAIGN_GOAL_MINOR': '10000'}):
+            progress = campaign_progress(today=date(2026, 10, 18))
+        self.assertEqual(progress['raised_minor'], 3050)
+        self.assertEqual(progress['donations'], 2)
+        self.assertEqual(progress['today_minor'], 2050)
+        self.assertEqual(progress['this_month_minor'], 2050)
+        self.assertEqual(progress['progress'], 0.305)
+        self.assertIsNone(campaign_progress()['goal_minor'])
+
+    def test_campaign_endpoint_is_micro_cached(self):
+        """Repeated reads within the TTL are served from the worker's cache"""
+        first = self.client.get('/api/v1/donation/donation/campaign')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_json()['raised_minor'], 3050)
+        self.assertIn('max-age', first.headers['Cache-Control'])
+
+        self.donations[2].status = 'completed'
+        db.session.commit()
+        self.assertEqual(self.client.get('/api/v1/donation/donation/campaign').get_json()['raised_minor'], 3050)
+        donation_api.campaign_cache.clear()
+        self.assertEqual(self.client.get('/api/v1/donation/donation/campaign').get_json()['raised_minor'], 6050)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import time
+import threading
+import unittest
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Donation
+from backend.services.donation_status import listen, stage_donation_status_changes, waiters
+from backend.utils.auth import create_user_token
+
+
+class TestDonationStatus(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        other = User(name='Sam', email='sam@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.user, other])
+        db.session.flush()
+        db.session.add_all([
+            Donation(amount=10, user_id=self.user.id, status='pending', transaction_id='cs_pending'),
+            Donation(amount=10, user_id=self.user.id, status='completed', transaction_id='cs_done'),
+            Donation(amount=10, user_id=other.id, status='pending', transaction_id='cs_other'),
+        ])
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_user_token(self.user)}'}
+
+    def status(self, session_id, query=''):
+        return self.client.get(f'/api/v1/donation/donation/status/{session_id}{query}', headers=self.headers)
+
+    def test_final_status_returns_immediately(self):
+        started = time.monotonic()
+        response = self.status('cs_done', '?wait=5')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.get_json()['status'], 'completed')
+        self.assertTrue(response.get_json()['final'])
+        self.assertEqual(self.status('cs_other').status_code, 404)
+        self.assertEqual(self.status('cs_done', '?wait=600').status_code, 400)
+
+    def test_times_out_with_current_status(self):
+        started = time.monotonic()
+        response = self.status('cs_pending', '?wait=0.2')
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(response.get_json()['status'], 'pending')
+        self.assertFalse(response.get_json()['final'])
+        self.assertEqual(waiters.waiting_count(), 0)
+
+    def test_wakes_when_status_commits(self):
+        """A waiting request returns as soon as the webhook's update commits"""
+        results = []
+        poller = threading.Thread(target=lambda: results.append(self.status('cs_pending', '?wait=5')))
+        started = time.monotonic()
+        poller.start()
+        while waiters.waiting_count() == 0:
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+        donation = Donation.query.filter_by(transaction_id='cs_pending').one()
+        donation.status = 'completed'
+        db.session.commit()
+        poller.join(5)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(results[0].get_json()['status'], 'completed')
+
+    def test_bulk_changes_wake_after_commit_only(self):
+        waiter = listen('cs_pending')
+        self.addCleanup(waiters.unregister, 'cs_pending', waiter)
+        stage_donation_status_changes(db.session, ['cs_pending'])
+        db.session.rollback()
+        self.assertFalse(waiter.is_set())
+        stage_donation_status_changes(db.session, ['cs_pending'])
+        db.session.commit()
+        self.assertTrue(waiter.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
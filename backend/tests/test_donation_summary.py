@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+
+from tests.base import AppTestCase
+from backend.api.v1.donation import parse_amount
+from backend.extensions import db
+from backend.models import User, Donation
+from backend.services.donation_summary import donation_summary
+from backend.utils.auth import create_user_token
+
+
+class TestDonationSummary(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        other = User(name='Sam', email='sam@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.user, other])
+        db.session.flush()
+
+        for amount, status, created_at in (
+            (10.10, 'completed', datetime(2026, 8, 3)),
+            (20.20, 'completed', datetime(2026, 8, 20)),
+            (19.99, 'completed', datetime(2026, 10, 1)),
+            (99, 'pending', datetime(2026, 10, 2)),
+            (5, 'completed', datetime(2024, 1, 1)),
+        ):
+            db.session.add(Donation(amount=amount, user_id=self.user.id, status=status, created_at=created_at))
+        db.session.add(Donation(amount=1000, user_id=other.id, status='completed', created_at=datetime(2026, 10, 1)))
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_user_token(self.user)}'}
+
+    def test_amounts_are_exact_minor_units(self):
+        """Amounts are stored as cents without float drift"""
+        self.assertEqual(parse_amount('19.99'), 1999)
+        self.assertEqual(parse_amount(0.29), 29)
+        self.assertEqual(parse_amount('10.005'), 1001)
+        for invalid in ('abc', '0', '-1', 'NaN', 'Infinity', '0.001'):
+            with self.assertRaises(ValueError):
+                parse_amount(invalid)
+        self.assertEqual(Donation.query.filter_by(status='pending').one().amount_minor, 9900)
+
+    def test_summary(self):
+        """Only the donor's completed donations count, grouped by month within the window"""
+        summary = donation_summary(self.user.id, months=12, now=datetime(2026, 10, 18))
+        self.assertEqual(summary['total_minor'], 1010 + 2020 + 1999 + 500)
+        self.assertEqual(summary['total'], 55.29)
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['last_donation']['amount_minor'], 1999)
+        self.assertEqual(summary['monthly'], [
+            {'month': '2026-08', 'total_minor': 3030, 'total': 30.3, 'count': 2},
+            {'month': '2026-10', 'total_minor': 1999, 'total': 19.99, 'count': 1},
+        ])
+
+    def test_summary_endpoint(self):
+        response = self.client.get('/api/v1/donation/donation/summary?months=1000', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/v1/donation/donation/summary', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 4)
+
+    def test_list_is_paginated(self):
+        """The list endpoint pages through the donor's donations newest first"""
+        seen = []
+        cursor = ''
+        while True:
+            response = self.client.get(f'/api/v1/donation/donation/?limit=2&cursor={cursor}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            self.assertLessEqual(len(body['donations']), 2)
+            seen += [d['id'] for d in body['donations']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+        response = self.client.get('/api/v1/donation/donation/?status=pending', headers=self.headers)
+        self.assertEqual([d['amount'] for d in response.get_json()['donations']], [99])
+        response = self.client.get('/api/v1/donation/donation/?cursor=bogus', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
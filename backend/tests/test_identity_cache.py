@@ -0,0 +1,92 @@
+import unittest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User
+from backend.utils.auth import create_user_token, identity_cache
+
+
+class TestIdentityCache(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add(self.user)
+        db.session.commit()
+        self.headers = {'Authorization': f'Bearer {create_user_token(self.user)}'}
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        super().tearDown()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_token_carries_id_and_role(self):
+        """Access tokens include id and role claims"""
+        from flask_jwt_extended import decode_token
+        claims = decode_token(self.headers['Authorization'].split()[1])
+
+        self.assertEqual(claims['id'], self.user.id)
+        self.assertEqual(claims['role'], 'patient')
+
+    def test_me_is_served_from_cache(self):
+        """Only the first request resolves the user from the database"""
+        first = self.client.get('/api/v1/auth/me', headers=self.headers)
+        queries_after_first = len(self.statements)
+        second = self.client.get('/api/v1/auth/me', headers=self.headers)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.get_json()['name'], 'Pat')
+        self.assertEqual(queries_after_first, 1)
+        self.assertEqual(len(self.statements), 1)
+
+    def test_update_invalidates_cache(self):
+        """Changing the user row evicts the cached identity"""
+        self.client.get('/api/v1/auth/me', headers=self.headers)
+        self.user.name = 'Patricia'
+        db.session.commit()
+
+        response = self.client.get('/api/v1/auth/me', headers=self.headers)
+        self.assertEqual(response.get_json()['name'], 'Patricia')
+
+    def test_role_change_is_seen(self):
+        """The identity comes from the user row, not the role claim in the token"""
+        self.client.get('/api/v1/auth/me', headers=self.headers)
+        self.user.role = 'therapist'
+        db.session.commit()
+
+        response = self.client.get('/api/v1/auth/me', headers=self.headers)
+        self.assertEqual(response.get_json()['role'], 'therapist')
+
+    def test_email_change_revokes_old_tokens(self):
+        """A token names the email it was issued for; after a change it no longer resolves"""
+        self.user.email = 'patricia@example.com'
+        db.session.commit()
+
+        self.assertEqual(self.client.get('/api/v1/auth/me', headers=self.headers).status_code, 404)
+        fresh = {'Authorization': f'Bearer {create_user_token(self.user)}'}
+        self.assertEqual(self.client.get('/api/v1/auth/me', headers=fresh).status_code, 200)
+
+    def test_tokens_without_claims(self):
+        """Tokens issued before the id claim still resolve by email"""
+        with self.app.app_context():
+            token = create_access_token(identity=self.user.email)
+        response = self.client.get('/api/v1/auth/me', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.get_json()['name'], 'Pat')
+
+    def test_deleted_user_is_not_found(self):
+        """Tokens for users that no longer exist are rejected"""
+        db.session.delete(self.user)
+        db.session.commit()
+
+        response = self.client.get('/api/v1/auth/me', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import time
+import unittest
+from unittest import mock
+
+from tests.base import AppTestCase
+from backend.models import User
+from backend.extensions import db
+from backend.utils.auth import create_user_token
+from backend.services.password_service import (
+    PasswordHashingService, HashingQueueFull, password_hasher
+)
+
+
+class TestPasswordHashingService(unittest.TestCase):
+    def setUp(self):
+        self.service = PasswordHashingService(max_workers=1, max_queue=0, retry_after=3)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_hash_and_verify_in_pool(self):
+        """Hashes computed in the pool verify and record metrics"""
+        password_hash = self.service.hash_password('s3cret')
+
+        self.assertTrue(self.service.verify_password(password_hash, 's3cret'))
+        self.assertFalse(self.service.verify_password(password_hash, 'wrong'))
+
+        stats = self.service.stats()
+        self.assertEqual(stats['hash_time']['count'], 3)
+        self.assertEqual(stats['queue_wait']['count'], 3)
+        self.assertEqual(stats['rejected'], 0)
+
+    def test_rejects_when_queue_full(self):
+        """A full queue fails fast instead of waiting"""
+        self.service._slots.acquire()
+        try:
+            with self.assertRaises(HashingQueueFull) as ctx:
+                self.service.hash_password('s3cret')
+        finally:
+            self.service._slots.release()
+
+        self.assertEqual(ctx.exception.retry_after, 3)
+        self.assertEqual(self.service.stats()['rejected'], 1)
+
+
+    def test_timed_out_jobs_keep_their_slot(self):
+        """A job that times out still counts against the bound until it finishes"""
+        service = PasswordHashingService(max_workers=1, max_queue=0, retry_after=3, timeout=0.2)
+        self.addCleanup(service.shutdown)
+        service._run(time.sleep, 0)  # start the pool
+
+        with self.assertRaises(HashingQueueFull):
+            service._run(time.sleep, 1)
+        self.assertEqual(service.stats()['in_flight'], 1)
+        with self.assertRaises(HashingQueueFull):
+            service._run(time.sleep, 0)
+        self.assertEqual(service.stats()['rejected'], 1)
+
+        deadline = time.monotonic() + 5
+        while service.stats()['in_flight'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        service._run(time.sleep, 0)
+        self.assertEqual(service.stats()['timed_out'], 1)
+
+
+class TestAuthBackpressure(AppTestCase):
+    def test_register_returns_503_when_busy(self):
+        """Registration surfaces backpressure as 503 with Retry-After"""
+        with mock.patch.object(password_hasher, 'hash_password', side_effect=HashingQueueFull(2)):
+            response = self.client.post('/api/v1/auth/register', json={
+                'name': 'Busy', 'email': 'busy@example.com', 'password': 'pw123456'
+            })
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '2')
+
+    def test_register_and_login(self):
+        """Passwords hashed in the pool can be used to log in"""
+        response = self.client.post('/api/v1/auth/register', json={
+            'name': 'Pat', 'email': 'pat@example.com', 'password': 'pw123456'
+        })
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post('/api/v1/auth/login', json={
+            'email': 'pat@example.com', 'password': 'pw123456'
+        })
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/api/v1/auth/login', json={
+            'email': 'pat@example.com', 'password': 'nope'
+        })
+        self.assertEqual(response.status_code, 401)
+
+
+class TestMetricsEndpoint(AppTestCase):
+    def test_admins_read_pool_metrics(self):
+        admin = User(name='Ada', email='ada@example.com', password_hash='x', role='admin')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([admin, patient])
+        db.session.commit()
+
+        response = self.client.get('/api/v1/metrics/', headers={'Authorization': f'Bearer {create_user_token(patient)}'})
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get('/api/v1/metrics/', headers={'Authorization': f'Bearer {create_user_token(admin)}'})
+        self.assertEqual(response.status_code, 200)
+        hashing = response.get_json()['password_hashing']
+        self.assertEqual(hashing['max_workers'], password_hasher.max_workers)
+        self.assertIn('in_flight', hashing)
+        self.assertIn('count', hashing['queue_wait'])
+        self.assertEqual(response.get_json()['stripe']['breaker']['state'], 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime, timedelta
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Appointment, AppointmentReminder
+from backend.services.reminders import ReminderScheduler, load_sink, LogSink
+
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminder):
+        self.sent.append(reminder)
+
+
+class TestReminderScheduler(AppTestCase):
+    NOW = datetime(2026, 11, 2, 8, 0)
+
+    def setUp(self):
+        super().setUp()
+        therapist = User(name='Dr Tess', email='tess@example.com', password_hash='x', role='therapist')
+        patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([therapist, patient])
+        db.session.flush()
+
+        def book(hours, status='accepted'):
+            appointment = Appointment(
+                therapist_id=therapist.id, patient_id=patient.id,
+                date=self.NOW + timedelta(hours=hours), duration=60, status=status
+            )
+            db.session.add(appointment)
+            return appointment
+
+        self.soon = book(1.5)
+        self.later = book(5)
+        self.pending = book(2, status='pending')
+        self.next_week = book(24 * 7)
+        db.session.commit()
+
+        self.sink = ListSink()
+        self.scheduler = ReminderScheduler(
+            self.sink, lead=timedelta(hours=1), window=timedelta(hours=24), refill_interval=0
+        )
+
+    def test_refill_scans_only_the_window(self):
+        """Only accepted appointments inside the window are queued"""
+        self.assertEqual(self.scheduler.refill(self.NOW), 2)
+        self.assertEqual(self.scheduler.refill(self.NOW), 0)
+
+    def test_fires_when_due(self):
+        """Reminders go out lead time before the session, once"""
+        self.scheduler.refill(self.NOW)
+        self.assertEqual(self.scheduler.tick(self.NOW), 0)
+        self.assertEqual(self.scheduler.tick(self.NOW + timedelta(minutes=30)), 1)
+        self.assertEqual(self.sink.sent[0]['appointment_id'], self.soon.id)
+        self.assertEqual(self.sink.sent[0]['patient_email'], 'pat@example.com')
+
+        # A fresh worker does not resend what was already recorded
+        other = ReminderScheduler(self.sink, lead=timedelta(hours=1), refill_interval=0)
+        other.refill(self.NOW + timedelta(minutes=30))
+        self.assertEqual(len(other), 1)
+        self.assertEqual(AppointmentReminder.query.count(), 1)
+
+    def test_cancelled_after_queueing(self):
+        """Appointments cancelled before the reminder is due are skipped"""
+        self.scheduler.refill(self.NOW)
+        self.soon.status = 'cancelled'
+        db.session.commit()
+        self.assertEqual(self.scheduler.tick(self.NOW + timedelta(hours=4, minutes=30)), 1)
+        self.assertEqual([r['appointment_id'] for r in self.sink.sent], [self.later.id])
+
+    def test_failed_delivery_is_retried(self):
+        """A sink error leaves no record and requeues the reminder"""
+        class FlakySink(ListSink):
+            def send(self, reminder):
+                if not self.sent:
+                    self.sent.append(None)
+                    raise RuntimeError('down')
+                super().send(reminder)
+
+        sink = FlakySink()
+        scheduler = ReminderScheduler(sink, lead=timedelta(hours=1), refill_interval=0, retry_delay=60)
+        scheduler.refill(self.NOW)
+        due = self.NOW + timedelta(minutes=30)
+        self.assertEqual(scheduler.tick(due), 0)
+        self.assertEqual(AppointmentReminder.query.count(), 0)
+        self.assertEqual(scheduler.tick(due + timedelta(minutes=1)), 1)
+        self.assertEqual(AppointmentReminder.query.count(), 1)
+
+    def test_load_sink(self):
+        """Sinks are chosen by name, file path or import path"""
+        self.assertIsInstance(load_sink('log'), LogSink)
+        self.assertEqual(load_sink('file:/tmp/reminders.jsonl').path, '/tmp/reminders.jsonl')
+        self.assertEqual(type(load_sink('tests.test_reminders:ListSink')).__name__, 'ListSink')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import json
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tests.base import AppTestCase
+from backend.api.v1 import donation as donation_api
+from backend.extensions import db
+from backend.models import User, Donation
+from backend.services.stripe_service import StripePaymentService
+from backend.utils.auth import create_user_token
+from backend.utils.circuit_breaker import CircuitBreaker, CircuitOpen, CLOSED, OPEN, HALF_OPEN
+
+
+class CheckoutStandIn(BaseHTTPRequestHandler):
+    """Serves POST /v1/checkout/sessions over keep-alive connections
+
+    Like Stripe, a repeated Idempotency-Key gets the session first created for it.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    status = 200
+    clients = []
+    sessions = {}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.clients.append(self.client_address)
+        time.sleep(self.delay)
+        key = self.headers.get('Idempotency-Key')
+        if key and len(key) > 255:
+            self._respond(400, {'error': {'type': 'invalid_request_error', 'message': 'Idempotency key too long'}})
+            return
+        if self.status == 200:
+            body = self.sessions.get(key) or {
+                'id': f'cs_test_{len(self.clients)}', 'object': 'checkout.session',
+                'url': f'https://checkout.example/pay/{len(self.clients)}'
+            }
+            self.sessions[key] = body
+        else:
+            body = {'error': {'type': 'api_error', 'message': 'Stripe is having a bad day'}}
+        self._respond(self.status, body)
+
+    def _respond(self, status, body):
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker('Test', failure_rate=0.5, window=4, min_calls=4, cooldown=10,
+                                      clock=lambda: self.now)
+
+    def test_opens_on_error_rate(self):
+        """The breaker opens once half of a full window failed"""
+        for failed in (False, True, False):
+            self.breaker.before_call()
+            self.breaker.record_failure() if failed else self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 10)
+
+    def test_half_open_trial(self):
+        """After the cooldown one trial call decides whether the breaker closes"""
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.now = 10
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpen):
+            self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.now = 20
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.before_call()
+
+
+def stripe_stand_in(test):
+    """Serve CheckoutStandIn for the test and return a service pointed at it"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CheckoutStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    CheckoutStandIn.delay = 0
+    CheckoutStandIn.status = 200
+    CheckoutStandIn.clients = []
+    CheckoutStandIn.sessions = {}
+
+    return StripePaymentService(
+        api_base=f'http://127.0.0.1:{server.server_port}',
+        read_timeout=0.3,
+        max_network_retries=0,
+        breaker=CircuitBreaker('Stripe', failure_rate=0.5, window=4, min_calls=2, cooldown=30)
+    )
+
+
+class TestStripeClient(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = stripe_stand_in(self)
+
+    def test_reuses_connections_and_records_latency(self):
+        """Sequential calls share one pooled connection and feed the operation histogram"""
+        for _ in range(3):
+            result = self.service.create_checkout_session(1000, donation_id='1')
+            self.assertTrue(result['success'])
+
+        self.assertEqual(len({port for _, port in CheckoutStandIn.clients}), 1)
+        stats = self.service.stats()
+        self.assertEqual(stats['latency']['checkout.sessions.create']['count'], 3)
+        self.assertEqual(stats['breaker']['state'], CLOSED)
+
+    def test_read_timeout_opens_breaker(self):
+        """Slow responses time out, then the breaker fails fast without calling Stripe"""
+        CheckoutStandIn.delay = 1
+        started = time.monotonic()
+        for _ in range(2):
+            self.assertFalse(self.service.create_checkout_session(1000, donation_id='1')['success'])
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(self.service.breaker.state, OPEN)
+
+        calls = len(CheckoutStandIn.clients)
+        result = self.service.create_checkout_session(1000, donation_id='1')
+        self.assertEqual(result['retry_after'], 30)
+        self.assertEqual(len(CheckoutStandIn.clients), calls)
+        self.assertEqual(self.service.stats()['breaker']['rejected'], 1)
+
+    def test_client_errors_do_not_trip_breaker(self):
+        """Only connection failures and 5xx responses count against Stripe"""
+        CheckoutStandIn.status = 400
+        for _ in range(3):
+            self.assertFalse(self.service.create_checkout_session(1000, donation_id='1')['success'])
+        self.assertEqual(self.service.breaker.state, CLOSED)
+
+        CheckoutStandIn.status = 500
+        for _ in range(2):
+            self.service.create_checkout_session(1000, donation_id='1')
+        self.assertEqual(self.service.breaker.state, OPEN)
+
+    def test_open_breaker_returns_503(self):
+        """Donations are refused with Retry-After while Stripe is failing"""
+        user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add(user)
+        db.session.commit()
+        original = donation_api.stripe_service
+        donation_api.stripe_service = self.service
+        self.addCleanup(setattr, donation_api, 'stripe_service', original)
+
+        CheckoutStandIn.status = 503
+        for _ in range(2):
+            self.service.create_checkout_session(1000, donation_id='1')
+
+        response = self.client.post(
+            '/api/v1/donation/donation/', json={'amount': 10},
+            headers={'Authorization': f'Bearer {create_user_token(user)}'}
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertEqual(Donation.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
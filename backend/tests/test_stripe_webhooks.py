@@ -0,0 +1,112 @@
+import hmac
+import json
+import time
+import hashlib
+import unittest
+from unittest import mock
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Donation, StripeEvent
+from backend.services.stripe_webhooks import webhook_processor
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def signed(payload, secret=WEBHOOK_SECRET):
+    """Build a Stripe-Signature header for payload"""
+    timestamp = int(time.time())
+    digest = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def session_event(event_id, event_type, session_id, payment_status='paid'):
+    return json.dumps({
+        'id': event_id,
+        'object': 'event',
+        'type': event_type,
+        'data': {'object': {'id': session_id, 'object': 'checkout.session', 'payment_status': payment_status}}
+    })
+
+
+class TestStripeWebhooks(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict('os.environ', {'STRIPE_WEBHOOK_SECRET': WEBHOOK_SECRET})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Donation(amount=10, user_id=user.id, status='pending', transaction_id='cs_one'),
+            Donation(amount=20, user_id=user.id, status='pending', transaction_id='cs_two')
+        ])
+        db.session.commit()
+
+    def _post(self, payload, signature=None):
+        response = self.client.post(
+            '/api/v1/donation/donation/webhook', data=payload,
+            headers={'Stripe-Signature': signature or signed(payload), 'Content-Type': 'application/json'}
+        )
+        if webhook_processor.last_future:
+            webhook_processor.last_future.result(timeout=5)
+        return response
+
+    def _statuses(self):
+        db.session.expire_all()
+        return {d.transaction_id: d.status for d in Donation.query}
+
+    def test_completed_session_marks_donation(self):
+        """Verified events are stored, acknowledged and applied in the background"""
+        response = self._post(session_event('evt_1', 'checkout.session.completed', 'cs_one'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], 'received')
+        self.assertEqual(self._statuses(), {'cs_one': 'completed', 'cs_two': 'pending'})
+        self.assertIsNotNone(StripeEvent.query.one().processed_at)
+
+    def test_duplicate_events_are_ignored(self):
+        """Redelivered events are deduplicated by Stripe event id"""
+        payload = session_event('evt_1', 'checkout.session.completed', 'cs_one')
+        self._post(payload)
+        response = self._post(payload)
+        self.assertEqual(response.get_json()['status'], 'duplicate')
+        self.assertEqual(StripeEvent.query.count(), 1)
+
+    def test_final_status_is_kept(self):
+        """A late expiry does not undo a completed payment"""
+        self._post(session_event('evt_1', 'checkout.session.completed', 'cs_one'))
+        self._post(session_event('evt_2', 'checkout.session.expired', 'cs_one'))
+        self._post(session_event('evt_3', 'checkout.session.async_payment_failed', 'cs_two'))
+        self.assertEqual(self._statuses(), {'cs_one': 'completed', 'cs_two': 'failed'})
+
+    def test_delayed_payment(self):
+        """Unpaid completions wait for the async payment result"""
+        self._post(session_event('evt_1', 'checkout.session.completed', 'cs_one', payment_status='unpaid'))
+        self.assertEqual(self._statuses()['cs_one'], 'processing')
+        self._post(session_event('evt_2', 'checkout.session.async_payment_succeeded', 'cs_one'))
+        self.assertEqual(self._statuses()['cs_one'], 'completed')
+
+    def test_invalid_signature(self):
+        """Unsigned or tampered payloads are rejected before storage"""
+        payload = session_event('evt_1', 'checkout.session.completed', 'cs_one')
+        response = self._post(payload, signature=signed(payload, secret='whsec_wrong'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(StripeEvent.query.count(), 0)
+
+    def test_batch_drain(self):
+        """Queued events are applied together by a single drain"""
+        for i, session_id in enumerate(['cs_one', 'cs_two']):
+            db.session.add(StripeEvent(
+                event_id=f'evt_{i}', type='checkout.session.completed',
+                payload=session_event(f'evt_{i}', 'checkout.session.completed', session_id)
+            ))
+        db.session.commit()
+        self.assertEqual(webhook_processor.drain(), 2)
+        self.assertEqual(self._statuses(), {'cs_one': 'completed', 'cs_two': 'completed'})
+        self.assertEqual(webhook_processor.drain(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,318 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import event, update
+
+from tests.base import AppTestCase
+from backend.extensions import db
+from backend.models import User, Appointment, TherapistAvailability
+from backend.services.therapist_index import therapist_index
+
+
+def make_therapist(index, **overrides):
+    data = dict(
+        name=f'Therapist {index}',
+        email=f'therapist{index}@example.com',
+        password_hash='x',
+        role='therapist',
+        specialization='Anxiety',
+        bio='A long biography ' * 20,
+        years_of_experience=index,
+        hourly_rate=50.0 + index,
+        languages=['English'],
+        qualifications=['MSc'],
+        is_verified=True
+    )
+    data.update(overrides)
+    return User(**data)
+
+
+class TestTherapistListing(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([make_therapist(i) for i in range(5)])
+        db.session.add(make_therapist(99, is_verified=False))
+        db.session.add(User(name='Pat', email='pat@example.com', password_hash='x', role='patient'))
+        db.session.commit()
+
+    def test_keyset_pagination(self):
+        """Pages follow next_cursor until exhausted without repeats"""
+        seen = []
+        url = '/api/v1/therapist/therapists?limit=2'
+        while url:
+            data = self.client.get(url).get_json()
+            seen.extend(t['id'] for t in data['therapists'])
+            cursor = data['next_cursor']
+            url = f'/api/v1/therapist/therapists?limit=2&cursor={cursor}' if cursor else None
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_limit_is_clamped(self):
+        """Requested page sizes above the maximum are clamped"""
+        data = self.client.get('/api/v1/therapist/therapists?limit=100000').get_json()
+        self.assertEqual(data['limit'], 100)
+
+    def test_sparse_fields_skip_large_columns(self):
+        """Only requested columns are selected"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            data = self.client.get('/api/v1/therapist/therapists?fields=name,hourly_rate').get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(set(data['therapists'][0]), {'id', 'name', 'hourly_rate'})
+        self.assertNotIn('bio', statements[0])
+
+    def test_invalid_parameters(self):
+        """Malformed cursors and unknown fields are rejected"""
+        self.assertEqual(self.client.get('/api/v1/therapist/therapists?cursor=%%%').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/therapist/therapists?fields=password_hash').status_code, 400)
+
+
+class TestTherapistLookups(AppTestCase):
+    """Exercises the SQL path used when the in-memory index is disabled"""
+
+    def setUp(self):
+        super().setUp()
+        therapist_index.enabled = False
+        self.addCleanup(setattr, therapist_index, 'enabled', True)
+        self.swahili = make_therapist(1, languages=['English', 'Swahili'], qualifications=['PhD'])
+        db.session.add_all([self.swahili, make_therapist(2)])
+        db.session.commit()
+
+    def _names(self, query):
+        data = self.client.get(f'/api/v1/therapist/therapists?{query}').get_json()
+        return [t['name'] for t in data['therapists']]
+
+    def test_language_filter_uses_lookup_table(self):
+        """Language filtering is case-insensitive and served by the lookup table"""
+        self.assertEqual(self._names('language=swahili'), ['Therapist 1'])
+        self.assertEqual(len(self._names('language=English')), 2)
+
+    def test_qualification_filter(self):
+        """Qualifications are filterable the same way"""
+        self.assertEqual(self._names('qualification=PhD'), ['Therapist 1'])
+
+    def test_lookups_follow_profile_updates(self):
+        """Replacing the JSON column resynchronizes the lookup rows"""
+        self.swahili.languages = ['French']
+        db.session.commit()
+
+        self.assertEqual(self._names('language=swahili'), [])
+        self.assertEqual(self._names('language=french'), ['Therapist 1'])
+
+    def test_resubmitting_unchanged_profile(self):
+        """PUTting the same languages and qualifications keeps the existing lookup rows"""
+        from backend.models import TherapistLanguage
+        from backend.utils.auth import create_user_token
+        headers = {'Authorization': f'Bearer {create_user_token(self.swahili)}'}
+        before = {row.id for row in TherapistLanguage.query.filter_by(user_id=self.swahili.id)}
+
+        for languages in (['English', 'Swahili'], ['english', 'Swahili', 'Zulu']):
+            response = self.client.put('/api/v1/therapist/therapist/profile', headers=headers, json={
+                'languages': languages, 'qualifications': ['PhD']
+            })
+            self.assertEqual(response.status_code, 200, response.get_json())
+
+        rows = {row.name_key: row for row in TherapistLanguage.query.filter_by(user_id=self.swahili.id)}
+        self.assertEqual(sorted(rows), ['english', 'swahili', 'zulu'])
+        self.assertTrue(before <= {row.id for row in rows.values()})
+        self.assertEqual(rows['english'].name, 'english')
+        self.assertEqual(self._names('qualification=PhD'), ['Therapist 1'])
+
+
+
+class TestDirectoryIndex(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            make_therapist(1, specialization='Anxiety', hourly_rate=80.0, languages=['English', 'Swahili']),
+            make_therapist(2, specialization='Depression', hourly_rate=40.0),
+            make_therapist(3, specialization='Anxiety', hourly_rate=60.0),
+        ])
+        db.session.commit()
+
+    def _get(self, query):
+        return self.client.get(f'/api/v1/therapist/therapists?{query}').get_json()
+
+    def test_sort_and_facets_from_memory(self):
+        """Sorted pages and facet counts are computed in memory behind one freshness probe"""
+        self._get('limit=1')  # warm the index
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            data = self._get('sort=-hourly_rate&facets=1&fields=name,hourly_rate')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(len(statements), 1)
+        self.assertIn('max(users.updated_at)', statements[0])
+        self.assertEqual([t['hourly_rate'] for t in data['therapists']], [80.0, 60.0, 40.0])
+        self.assertEqual(data['facets']['specialization'], {'Anxiety': 2, 'Depression': 1})
+        self.assertEqual(data['facets']['language'], {'English': 3, 'Swahili': 1})
+
+    def test_sorted_cursor_pagination(self):
+        """Cursors continue a sorted listing where the previous page stopped"""
+        first = self._get('sort=hourly_rate&limit=2&fields=hourly_rate')
+        second = self._get(f"sort=hourly_rate&limit=2&fields=hourly_rate&cursor={first['next_cursor']}")
+
+        self.assertEqual([t['hourly_rate'] for t in first['therapists']], [40.0, 60.0])
+        self.assertEqual([t['hourly_rate'] for t in second['therapists']], [80.0])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_commits_refresh_the_index(self):
+        """Committed therapist changes are applied incrementally"""
+        self.assertEqual(self._get('max_rate=50')['total'], 1)
+
+        therapist = User.query.filter_by(email='therapist3@example.com').first()
+        therapist.hourly_rate = 45.0
+        db.session.add(make_therapist(4, hourly_rate=30.0))
+        db.session.commit()
+
+        self.assertEqual(self._get('max_rate=50')['total'], 3)
+
+        db.session.delete(therapist)
+        db.session.commit()
+        self.assertEqual(self._get('max_rate=50')['total'], 2)
+
+    def test_writes_from_other_workers_are_seen(self):
+        """Changes that bypassed this worker's session hooks trigger a rebuild"""
+        self.assertEqual(self._get('max_rate=50')['total'], 1)
+
+        # A bulk UPDATE never reaches the index, like a commit made in another worker
+        db.session.execute(
+            update(User).where(User.email == 'therapist3@example.com')
+            .values(hourly_rate=45.0, updated_at=datetime(2030, 1, 1))
+        )
+        db.session.commit()
+        self.assertEqual(self._get('max_rate=50')['total'], 2)
+
+    def test_malformed_cursors(self):
+        """Cursors of the wrong shape are rejected on the index and SQL paths"""
+        for query in ('cursor=WyJ4Il0', 'sort=hourly_rate&cursor=WyJ4Il0', 'sort=hourly_rate&cursor=WzFd'):
+            self.assertEqual(self.client.get(f'/api/v1/therapist/therapists?{query}').status_code, 400, query)
+
+        therapist_index.enabled = False
+        self.addCleanup(setattr, therapist_index, 'enabled', True)
+        self.assertEqual(self.client.get('/api/v1/therapist/therapists?cursor=WyJ4Il0').status_code, 400)
+
+
+
+class TestTherapistSearch(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            make_therapist(1, name='Grace Wanjiru', specialization='Trauma', bio='EMDR for survivors of trauma.'),
+            make_therapist(2, name='Trauma Informed Care Ltd', specialization='Couples', bio='Relationship counselling.'),
+            make_therapist(3, name='Omar Said', specialization='Addiction', bio='Recovery and relapse prevention.'),
+            make_therapist(4, name='Hidden', specialization='Trauma', bio='Unverified.', is_verified=False),
+        ])
+        db.session.commit()
+
+    def _search(self, query):
+        data = self.client.get(f'/api/v1/therapist/therapists?fields=name&{query}').get_json()
+        return [t['name'] for t in data['therapists']]
+
+    def test_ranked_search(self):
+        """Name matches outrank specialization matches; unverified profiles are excluded"""
+        self.assertEqual(self._search('q=trauma'), ['Trauma Informed Care Ltd', 'Grace Wanjiru'])
+
+    def test_prefix_and_bio_matches(self):
+        """Terms match word prefixes across the bio"""
+        self.assertEqual(self._search('q=relaps'), ['Omar Said'])
+
+    def test_index_follows_updates(self):
+        """Profile edits are reflected in search results"""
+        therapist = User.query.filter_by(name='Omar Said').first()
+        therapist.bio = 'Mindfulness based stress reduction.'
+        db.session.commit()
+
+        self.assertEqual(self._search('q=relapse'), [])
+        self.assertEqual(self._search('q=mindfulness'), ['Omar Said'])
+
+    def test_search_respects_filters(self):
+        """Directory filters still apply to search results"""
+        self.assertEqual(self._search('q=trauma&specialization=Couples'), ['Trauma Informed Care Ltd'])
+
+
+class TestAvailability(AppTestCase):
+    # Monday 2026-10-19
+    HOURS = {'monday': [{'start': '09:00', 'end': '12:00'}], 'wednesday': {'start': '14:00', 'end': '18:00'}}
+
+    def setUp(self):
+        super().setUp()
+        self.morning = make_therapist(1, availability=self.HOURS)
+        self.evening = make_therapist(2, availability=[{'day': 'Mon', 'start': '17:00', 'end': '20:00'}])
+        self.patient = User(name='Pat', email='pat@example.com', password_hash='x', role='patient')
+        db.session.add_all([self.morning, self.evening, self.patient])
+        db.session.commit()
+
+    def _ids(self, query):
+        response = self.client.get(f'/api/v1/therapist/therapists?fields=id&{query}')
+        self.assertEqual(response.status_code, 200)
+        return [t['id'] for t in response.get_json()['therapists']]
+
+    def test_slots_follow_json_column(self):
+        """Weekly slots are parsed from either availability format"""
+        self.assertEqual(
+            sorted((s.weekday, s.start_minute, s.end_minute) for s in self.morning.availability_slots),
+            [(0, 540, 720), (2, 840, 1080)]
+        )
+        self.morning.availability = {'friday': [{'start': '10:00', 'end': '11:00'}]}
+        db.session.commit()
+        self.assertEqual(TherapistAvailability.query.filter_by(therapist_id=self.morning.id).count(), 1)
+
+    def test_available_at(self):
+        """Only therapists whose hours cover the whole session match"""
+        self.assertEqual(self._ids('available_at=2026-10-19T09:30'), [self.morning.id])
+        self.assertEqual(self._ids('available_at=2026-10-19T11:30'), [])
+        self.assertEqual(self._ids('available_at=2026-10-19T11:30&duration=30'), [self.morning.id])
+        self.assertEqual(self._ids('available_at=2026-10-19T18:00'), [self.evening.id])
+
+    def test_bookings_block_slots(self):
+        """Active appointments overlapping the slot exclude the therapist"""
+        db.session.add(Appointment(
+            patient_id=self.patient.id, therapist_id=self.morning.id,
+            date=datetime(2026, 10, 19, 9, 0), duration=60, status='accepted'
+        ))
+        db.session.commit()
+        self.assertEqual(self._ids('available_at=2026-10-19T09:30'), [])
+        self.assertEqual(self._ids('available_at=2026-10-19T10:00'), [self.morning.id])
+
+        Appointment.query.update({'status': 'cancelled'})
+        db.session.commit()
+        self.assertEqual(self._ids('available_at=2026-10-19T09:30'), [self.morning.id])
+
+    def test_available_between(self):
+        """A window matches therapists with any free slot inside it"""
+        self.assertEqual(
+            self._ids('available_between=2026-10-19T08:00,2026-10-19T21:00'),
+            [self.morning.id, self.evening.id]
+        )
+        self.assertEqual(self._ids('available_between=2026-10-21T14:00,2026-10-21T16:00'), [self.morning.id])
+
+    def test_availability_uses_sql_fallback_too(self):
+        """The filter applies when the in-memory index is disabled"""
+        therapist_index.enabled = False
+        self.addCleanup(setattr, therapist_index, 'enabled', True)
+        self.assertEqual(self._ids('available_at=2026-10-19T18:00'), [self.evening.id])
+
+    def test_invalid_availability(self):
+        """Malformed times, windows and durations are rejected"""
+        for query in ('available_at=soon', 'available_between=2026-10-19T08:00',
+                      'available_between=2026-10-19T08:00,2026-10-22T08:00', 'available_at=2026-10-19T08:00&duration=0'):
+            response = self.client.get(f'/api/v1/therapist/therapists?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -53,3 +53,10 @@ def validate_required_fields(data, required_fields):
     if missing_fields:
         raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
     return True
+
+def service_unavailable(message, retry_after):
+    """Build a 503 response telling the client when to retry"""
+    response = jsonify({'error': message})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
@@ -1 +1,109 @@
- 
\ No newline at end of file
+"""JWT identity helpers"""
+import os
+from collections import namedtuple
+from datetime import timedelta
+from flask import current_app, jsonify
+from flask_jwt_extended import create_access_token
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event, inspect
+
+from backend.models import User
+from backend.utils.cache import TTLCache
+
+# Lightweight identity resolved from the JWT; enough for role and ownership checks
+CurrentUser = namedtuple('CurrentUser', ['id', 'email', 'name', 'role'])
+
+# Per-worker cache of identities keyed by the token's id claim. Writes evict entries only in the
+# worker that made them, so other workers keep serving a changed role or a deleted user for up to
+# IDENTITY_CACHE_TTL seconds; 0 resolves every request from the database.
+identity_cache = TTLCache(
+    maxsize=int(os.getenv('IDENTITY_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('IDENTITY_CACHE_TTL', 300))
+)
+
+
+def identity_from_user(user):
+    """Build the cached identity for a user row"""
+    return CurrentUser(id=user.id, email=user.email, name=user.name, role=user.role)
+
+
+def create_user_token(user, expires_delta=timedelta(days=1)):
+    """Create an access token carrying the user's id and role as claims
+
+    The server resolves identities by id; the role claim is for clients, and
+    authorization always uses the stored role.
+    """
+    return create_access_token(
+        identity=user.email,
+        additional_claims={'id': user.id, 'role': user.role},
+        expires_delta=expires_delta
+    )
+
+
+def _stream_serializer():
+    return URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'], salt='appointment-stream')
+
+
+def create_stream_token(user):
+    """Short-lived token for opening an event stream, which EventSource can only pass in the URL
+
+    It is signed separately from access tokens, so it is refused by every other endpoint.
+    """
+    return _stream_serializer().dumps({'sub': user.email, 'id': user.id})
+
+
+def load_stream_token(token, max_age):
+    """Resolve a stream token issued within max_age seconds to a CurrentUser, or None"""
+    try:
+        claims = _stream_serializer().loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+    return load_current_user(None, claims)
+
+
+def load_current_user(jwt_header, jwt_data):
+    """Resolve the token to a CurrentUser, hitting the database only on a cache miss
+
+    Misses are looked up by the id claim's primary key; tokens issued before the
+    claims existed fall back to the email subject.
+    """
+    email = jwt_data['sub']
+    user_id = jwt_data.get('id')
+    key = email if user_id is None else user_id
+    identity = identity_cache.get(key)
+    if identity is None:
+        if user_id is None:
+            user = User.query.filter_by(email=email).first()
+        else:
+            user = User.query.filter_by(id=user_id).first()
+        if not user:
+            return None
+        identity = identity_from_user(user)
+        identity_cache.set(key, identity)
+
+    # Tokens issued before an email change no longer identify the user
+    if identity.email != email:
+        return None
+    return identity
+
+
+def user_lookup_error(jwt_header, jwt_data):
+    """Respond like the endpoints did before identities were resolved from the token"""
+    return jsonify({'error': 'User not found'}), 404
+
+
+def register_jwt_callbacks(jwt):
+    """Attach the identity loader to the JWT manager"""
+    jwt.user_lookup_loader(load_current_user)
+    jwt.user_lookup_error_loader(user_lookup_error)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_identity(mapper, connection, target):
+    """Evict cached identities when a user row changes"""
+    identity_cache.pop(target.id)
+    identity_cache.pop(target.email)
+    history = inspect(target).attrs.email.history
+    for email in history.deleted or ():
+        identity_cache.pop(email)
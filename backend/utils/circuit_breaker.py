@@ -0,0 +1,92 @@
+"""Circuit breaker for calls to external services"""
+import math
+import time
+import threading
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency while its breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is temporarily unavailable')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Rolling error-rate circuit breaker
+
+    The breaker opens once at least min_calls of the last window calls were
+    recorded and the share of failures among them reaches failure_rate. While
+    open every call fails fast; after cooldown seconds a single trial call is
+    let through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=10, cooldown=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through right now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            remaining = self.cooldown - (self._clock() - self._opened_at)
+            if self._state == OPEN and remaining <= 0:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpen(self.name, max(1, math.ceil(remaining)))
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._trial_in_flight = False
+                self._outcomes.clear()
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(True)
+            if self._state == HALF_OPEN:
+                self._open()
+            elif (self._state == CLOSED and len(self._outcomes) >= self.min_calls and
+                    sum(self._outcomes) / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trial_in_flight = False
+        self._outcomes.clear()
+
+    def snapshot(self):
+        """Return the current state as a plain dictionary"""
+        state = self.state
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(self._outcomes)
+        return {'state': state, 'calls': calls, 'failures': failures, 'rejected': self.rejected}
@@ -0,0 +1,52 @@
+"""Conditional request helpers (ETag / Last-Modified)"""
+import hashlib
+import json
+from flask import request, jsonify, make_response
+
+
+def version_etag(resource_id, version):
+    """Strong ETag for a single versioned row"""
+    return f'{resource_id}-{version}'
+
+
+def collection_etag(params, count, last_modified, extra=None):
+    """Strong ETag for a filtered collection, derived from its size and newest change"""
+    payload = json.dumps({
+        'params': sorted(params.items(multi=True)) if hasattr(params, 'items') else params,
+        'count': count,
+        'last_modified': last_modified.isoformat() if last_modified else None,
+        'extra': extra
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response when the client's cached copy is current, else None"""
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        matched = False
+
+    if not matched:
+        return None
+    response = make_response('', 304)
+    return with_validators(response, etag, last_modified)
+
+
+def precondition_failed(etag):
+    """Return a 412 response when an If-Match header does not match etag, else None"""
+    if not request.if_match or request.if_match.contains(etag):
+        return None
+    response = jsonify({'error': 'Resource has been modified'})
+    response.status_code = 412
+    return with_validators(response, etag)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag and Last-Modified headers to a response"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
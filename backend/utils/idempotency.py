@@ -0,0 +1,58 @@
+"""Idempotency-Key handling for endpoints with side effects"""
+import threading
+
+from backend.utils.cache import TTLCache
+
+
+class IdempotencyKeyInUse(Exception):
+    """Raised when another request with the same key is still being processed"""
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key is replayed with a different request body"""
+
+
+class IdempotencyCache:
+    """Per-worker cache of responses for requests carrying an Idempotency-Key
+
+    The first request for a key claims it; concurrent duplicates wait for it to
+    finish and then replay its response. Only completed responses are cached,
+    so a failed attempt can be retried with the same key.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, wait=15):
+        self.wait = wait
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, fingerprint):
+        """Return the cached response for key, or None once the caller owns the key
+
+        A caller that gets None must call release() when it is done.
+        """
+        while True:
+            with self._lock:
+                cached = self._responses.get(key)
+                if cached is not None:
+                    if cached[0] != fingerprint:
+                        raise IdempotencyKeyReused()
+                    return cached[1]
+                done = self._in_flight.get(key)
+                if done is None:
+                    self._in_flight[key] = threading.Event()
+                    return None
+            if not done.wait(self.wait):
+                raise IdempotencyKeyInUse()
+
+    def release(self, key, fingerprint, response=None):
+        """Give up ownership of key, caching response for replays when given"""
+        with self._lock:
+            if response is not None:
+                self._responses.set(key, (fingerprint, response))
+            done = self._in_flight.pop(key, None)
+        if done is not None:
+            done.set()
+
+    def clear(self):
+        self._responses.clear()
@@ -0,0 +1,54 @@
+"""Lightweight in-process metrics"""
+import bisect
+import threading
+
+# Upper bounds (in seconds) for latency buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Thread-safe cumulative histogram of observed values"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record a single observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    @property
+    def count(self):
+        """Number of observations recorded so far"""
+        return self._count
+
+    def snapshot(self):
+        """Return the current state as a plain dictionary"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self._count, self._sum, self._max
+
+        buckets = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            buckets[f'le_{bound}'] = running
+        buckets['le_inf'] = count
+
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'avg': round(total / count, 6) if count else 0.0,
+            'max': round(maximum, 6),
+            'buckets': buckets
+        }
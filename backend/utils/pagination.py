@@ -0,0 +1,36 @@
+"""Keyset pagination helpers"""
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last returned row as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """Parse a page size, clamping it to the server-side maximum"""
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid limit') from e
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return min(limit, maximum)
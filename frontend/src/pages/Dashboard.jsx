@@ -18,14 +18,20 @@ import { donationService } from '../services/api'
 function Dashboard() {
   const { user } = useAuth()
   const [donations, setDonations] = useState([])
+  const [summary, setSummary] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
 
   useEffect(() => {
     const fetchDonations = async () => {
       try {
-        const response = await donationService.getDonations()
-        setDonations(response.data)
+        // Totals come from the server; only the most recent page of donations is fetched
+        const [page, totals] = await Promise.all([
+          donationService.getDonations({ limit: 5 }),
+          donationService.getSummary(),
+        ])
+        setDonations(page.donations)
+        setSummary(totals)
       } catch (err) {
         setError('Failed to fetch donations')
         console.error('Error fetching donations:', err)
@@ -37,7 +43,7 @@ function Dashboard() {
     fetchDonations()
   }, [])
 
-  const totalDonated = donations.reduce((sum, donation) => sum + donation.amount, 0)
+  const totalDonated = (summary?.total_minor ?? 0) / 100
 
   return (
     <Container maxWidth="lg" sx={{ mt: 4, mb: 4 }}>
@@ -98,7 +104,7 @@ function Dashboard() {
                       <ListItem>
                         <ListItemText
                           primary={`$${donation.amount.toFixed(2)}`}
-                          secondary={new Date(donation.createdAt).toLocaleDateString()}
+                          secondary={new Date(donation.created_at).toLocaleDateString()}
                         />
                       </ListItem>
                       <Divider />
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useRef, useState } from 'react'
 import {
   Container,
   Paper,
@@ -17,6 +17,8 @@ function Donate() {
   const [amount, setAmount] = useState('')
   const [error, setError] = useState('')
   const [loading, setLoading] = useState(false)
+  // One key per amount, so double submits and retries reuse the same checkout session
+  const attempt = useRef(null)
 
   const handleSubmit = async (e) => {
     e.preventDefault()
@@ -30,7 +32,10 @@ function Donate() {
         throw new Error('Please enter a valid positive amount')
       }
 
-      const response = await donationService.createDonation(numAmount)
+      if (!attempt.current || attempt.current.amount !== numAmount) {
+        attempt.current = { amount: numAmount, key: crypto.randomUUID() }
+      }
+      const response = await donationService.createDonation(numAmount, attempt.current.key)
       
       if (response.checkout_url) {
         window.location.href = response.checkout_url
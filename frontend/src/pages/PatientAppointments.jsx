@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
-import api from '../services/api';
+import api, { appointmentService } from '../services/api';
 import {
   Box,
   Container,
@@ -12,6 +12,7 @@ import {
   TableContainer,
   TableHead,
   TableRow,
+  Button,
   Chip,
   Alert,
 } from '@mui/material';
@@ -19,6 +20,7 @@ import {
 const PatientAppointments = () => {
   const { user } = useAuth();
   const [appointments, setAppointments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(true);
 
@@ -26,10 +28,30 @@ const PatientAppointments = () => {
     fetchAppointments();
   }, []);
 
-  const fetchAppointments = async () => {
+  // Apply status changes pushed by the server instead of polling
+  useEffect(() => {
+    if (!localStorage.getItem('token')) return undefined;
+
+    return appointmentService.openStream((change) => {
+      setAppointments((previous) => {
+        if (!previous.some((appointment) => appointment.id === change.id)) {
+          fetchAppointments(); // New appointment: reload to get the full record
+          return previous;
+        }
+        return previous.map((appointment) =>
+          appointment.id === change.id ? { ...appointment, ...change } : appointment
+        );
+      });
+    });
+  }, []);
+
+  const fetchAppointments = async (cursor = null) => {
     try {
-      const response = await api.get('/appointments');
-      setAppointments(response.data.appointments);
+      const response = await api.get('/appointments', { params: cursor ? { cursor } : {} });
+      setAppointments((previous) =>
+        cursor ? [...previous, ...response.data.appointments] : response.data.appointments
+      );
+      setNextCursor(response.data.next_cursor);
       setError('');
     } catch (err) {
       setError('Failed to fetch appointments');
@@ -109,6 +131,14 @@ const PatientAppointments = () => {
           </TableBody>
         </Table>
       </TableContainer>
+
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => fetchAppointments(nextCursor)}>
+            Load more
+          </Button>
+        </Box>
+      )}
     </Container>
   );
 };
@@ -2,6 +2,10 @@ import { useEffect, useState } from 'react';
 import { Container, Paper, Typography, Button, Box, CircularProgress, Alert } from '@mui/material';
 import { useNavigate, useSearchParams, Navigate } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
+import { donationService } from '../services/api';
+
+// Long-poll rounds before giving up on the webhook; each round waits up to 25 seconds
+const MAX_STATUS_POLLS = 5;
 
 function PaymentSuccess() {
   const navigate = useNavigate();
@@ -15,13 +19,42 @@ function PaymentSuccess() {
     const sessionId = searchParams.get('session_id');
     if (!sessionId) {
       setError('Invalid payment session');
+      setLoading(false);
+      return undefined;
     }
 
-    const timer = setTimeout(() => {
-      setLoading(false);
-    }, 2000);
+    // Each request blocks server-side until the webhook settles the donation
+    let cancelled = false;
+    const waitForPayment = async () => {
+      try {
+        let donation = null;
+        for (let attempt = 0; attempt < MAX_STATUS_POLLS && !cancelled; attempt += 1) {
+          donation = await donationService.getStatus(sessionId, { status: donation?.status });
+          if (donation.final) {
+            break;
+          }
+        }
+        if (cancelled) {
+          return;
+        }
+        if (donation?.status === 'failed' || donation?.status === 'expired') {
+          setError('Your payment could not be completed. Please try again.');
+        }
+      } catch (err) {
+        if (!cancelled) {
+          setError(typeof err === 'string' ? err : 'Could not confirm your payment');
+        }
+      } finally {
+        if (!cancelled) {
+          setLoading(false);
+        }
+      }
+    };
 
-    return () => clearTimeout(timer);
+    waitForPayment();
+    return () => {
+      cancelled = true;
+    };
   }, [searchParams]);
 
   // Redirect to home if not logged in
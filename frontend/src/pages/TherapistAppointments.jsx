@@ -15,11 +15,14 @@ import {
   Button,
   Chip,
   Alert,
+  Checkbox,
 } from '@mui/material';
 
 const TherapistAppointments = () => {
   const { user } = useAuth();
   const [appointments, setAppointments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [selected, setSelected] = useState([]);
   const [error, setError] = useState('');
   const [loading, setLoading] = useState(true);
 
@@ -27,10 +30,13 @@ const TherapistAppointments = () => {
     fetchAppointments();
   }, []);
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (cursor = null) => {
     try {
-      const response = await api.get('/appointments');
-      setAppointments(response.data.appointments);
+      const response = await api.get('/appointments', { params: cursor ? { cursor } : {} });
+      setAppointments((previous) =>
+        cursor ? [...previous, ...response.data.appointments] : response.data.appointments
+      );
+      setNextCursor(response.data.next_cursor);
       setError('');
     } catch (err) {
       setError('Failed to fetch appointments');
@@ -50,6 +56,27 @@ const TherapistAppointments = () => {
     }
   };
 
+  const handleBulkStatusUpdate = async (status) => {
+    try {
+      await api.put('/appointments/status', {
+        updates: selected.map((id) => ({ id, status })),
+      });
+      setSelected([]);
+      fetchAppointments(); // Refresh the list
+    } catch (err) {
+      setError('Failed to update appointment status');
+      console.error('Error updating appointment statuses:', err);
+    }
+  };
+
+  const toggleSelected = (appointmentId) => {
+    setSelected((previous) =>
+      previous.includes(appointmentId)
+        ? previous.filter((id) => id !== appointmentId)
+        : [...previous, appointmentId]
+    );
+  };
+
   const getStatusColor = (status) => {
     const colors = {
       pending: 'warning',
@@ -81,10 +108,22 @@ const TherapistAppointments = () => {
         </Alert>
       )}
 
+      {selected.length > 0 && (
+        <Box sx={{ display: 'flex', gap: 1, mb: 2 }}>
+          <Button variant="contained" color="success" onClick={() => handleBulkStatusUpdate('accepted')}>
+            Accept selected ({selected.length})
+          </Button>
+          <Button variant="contained" color="error" onClick={() => handleBulkStatusUpdate('declined')}>
+            Decline selected ({selected.length})
+          </Button>
+        </Box>
+      )}
+
       <TableContainer component={Paper}>
         <Table>
           <TableHead>
             <TableRow>
+              <TableCell padding="checkbox" />
               <TableCell>Patient Name</TableCell>
               <TableCell>Date</TableCell>
               <TableCell>Duration</TableCell>
@@ -96,6 +135,14 @@ const TherapistAppointments = () => {
           <TableBody>
             {appointments.map((appointment) => (
               <TableRow key={appointment.id}>
+                <TableCell padding="checkbox">
+                  {appointment.status === 'pending' && (
+                    <Checkbox
+                      checked={selected.includes(appointment.id)}
+                      onChange={() => toggleSelected(appointment.id)}
+                    />
+                  )}
+                </TableCell>
                 <TableCell>{appointment.patient.name}</TableCell>
                 <TableCell>
                   {new Date(appointment.date).toLocaleString()}
@@ -135,7 +182,7 @@ const TherapistAppointments = () => {
             ))}
             {appointments.length === 0 && (
               <TableRow>
-                <TableCell colSpan={6} align="center">
+                <TableCell colSpan={7} align="center">
                   No appointments found
                 </TableCell>
               </TableRow>
@@ -143,6 +190,14 @@ const TherapistAppointments = () => {
           </TableBody>
         </Table>
       </TableContainer>
+
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => fetchAppointments(nextCursor)}>
+            Load more
+          </Button>
+        </Box>
+      )}
     </Container>
   );
 };
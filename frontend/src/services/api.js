@@ -115,10 +115,49 @@ export const authService = {
   },
 };
 
+export const appointmentService = {
+  // Calls onChange with each pushed appointment change; returns a function that closes the stream.
+  // EventSource can only authenticate through the URL, so each connection uses a short-lived stream token.
+  openStream: (onChange) => {
+    let source = null;
+    let retry = null;
+    let closed = false;
+
+    const connect = async () => {
+      try {
+        const response = await api.post('/appointments/stream/token');
+        if (closed) return;
+        source = new EventSource(
+          `${api.defaults.baseURL}/appointments/stream?token=${encodeURIComponent(response.data.token)}`
+        );
+        source.addEventListener('appointment', (event) => onChange(JSON.parse(event.data)));
+        source.onerror = () => {
+          // The token has expired by the time EventSource reconnects, so reconnect with a fresh one
+          source.close();
+          if (!closed) retry = setTimeout(connect, 3000);
+        };
+      } catch (error) {
+        console.error('Appointment stream error:', error);
+        if (!closed) retry = setTimeout(connect, 3000);
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  },
+};
+
 export const donationService = {
-  createDonation: async (amount) => {
+  // Reusing idempotencyKey for retries of the same attempt replays the original checkout session
+  createDonation: async (amount, idempotencyKey) => {
     try {
-      const response = await api.post('/donation/', { amount });
+      const response = await api.post('/donation/', { amount }, {
+        headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}
+      });
       if (response.data.checkout_url) {
         return response.data;
       } else {
@@ -130,15 +169,38 @@ export const donationService = {
     }
   },
 
-  getDonations: async () => {
+  getDonations: async ({ cursor, limit } = {}) => {
     try {
-      const response = await api.get('/donation/');
+      const response = await api.get('/donation/', { params: { cursor, limit } });
       return response.data;
     } catch (error) {
       console.error('Get donations error:', error);
       throw error.error || error.message || 'Failed to fetch donations';
     }
   },
+
+  // Resolves once the status differs from `status` (or stops being pending), or after `wait` seconds
+  getStatus: async (sessionId, { wait = 25, status } = {}) => {
+    try {
+      const response = await api.get(`/donation/status/${encodeURIComponent(sessionId)}`, {
+        params: { wait, status }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Get donation status error:', error);
+      throw error.error || error.message || 'Failed to fetch donation status';
+    }
+  },
+
+  getSummary: async () => {
+    try {
+      const response = await api.get('/donation/summary');
+      return response.data;
+    } catch (error) {
+      console.error('Get donation summary error:', error);
+      throw error.error || error.message || 'Failed to fetch donation summary';
+    }
+  },
 };
 
 export default api; 
\ No newline at end of file